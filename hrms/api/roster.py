@@ -1,11 +1,32 @@
+import hashlib
+
 import frappe
 from frappe import _
-from frappe.utils import add_days, date_diff
-
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+from frappe.query_builder.functions import Count, Max
+from frappe.utils import add_days, add_to_date, date_diff, now
 
-from hrms.hr.doctype.shift_assignment.shift_assignment import ShiftAssignment
+from hrms.hr.doctype.shift_assignment.shift_assignment import ShiftAssignment, clear_shift_assignment_index
 from hrms.hr.doctype.shift_assignment_tool.shift_assignment_tool import create_shift_assignment
+from hrms.utils.holiday_list import resolve_holiday_lists
+
+ROSTER_MONTH_SNAPSHOT = "roster_month_snapshot"
+ROSTER_MONTH_SNAPSHOT_EXPIRY = 60 * 60
+# changes committed after the cursor was issued may carry an earlier modified timestamp
+ROSTER_CHANGES_CURSOR_LAG = 10
+
+HOLIDAY_FIELDS = ["holiday", "holiday_date", "description", "weekly_off"]
+LEAVE_FIELDS = ["employee", "leave", "leave_type", "from_date", "to_date"]
+SHIFT_FIELDS = [
+	"employee",
+	"name",
+	"shift_type",
+	"start_date",
+	"end_date",
+	"status",
+	"start_time",
+	"end_time",
+	"color",
+]
 
 
 @frappe.whitelist()
@@ -31,6 +52,176 @@ def get_events(
 	return events
 
 
+@frappe.whitelist()
+def get_month_snapshot(
+	month_start: str,
+	month_end: str,
+	employee_filters: dict[str, str],
+	shift_filters: dict[str, str],
+	etag: str | None = None,
+) -> dict:
+	"""Returns the roster events of the month in one payload.
+
+	Holidays are sent once per holiday list along with the holiday list of each employee,
+	and leaves and shifts as columns. The snapshot is tagged with an ETag derived from the
+	records it is built from; if the client sends the current ETag, only the ETag is returned."""
+	current_etag = get_month_snapshot_etag(month_start, month_end, employee_filters, shift_filters)
+	if etag == current_etag:
+		return {"etag": current_etag, "not_modified": 1}
+
+	cache_key = f"{ROSTER_MONTH_SNAPSHOT}:{current_etag}"
+	if snapshot := frappe.cache().get_value(cache_key):
+		return snapshot
+
+	cursor = get_changes_cursor()
+	holiday_list_for_employee, holidays_by_list = get_holidays_by_list(
+		month_start, month_end, employee_filters
+	)
+	snapshot = {
+		"etag": current_etag,
+		"cursor": cursor,
+		"employee_holiday_list": holiday_list_for_employee,
+		"holidays": {
+			holiday_list: to_columns(holidays, HOLIDAY_FIELDS)
+			for holiday_list, holidays in holidays_by_list.items()
+		},
+		"leaves": to_columns(get_leave_records(month_start, month_end, employee_filters), LEAVE_FIELDS),
+		"shifts": to_columns(
+			get_shift_records(month_start, month_end, employee_filters, shift_filters), SHIFT_FIELDS
+		),
+	}
+	frappe.cache().set_value(cache_key, snapshot, expires_in_sec=ROSTER_MONTH_SNAPSHOT_EXPIRY)
+
+	return snapshot
+
+
+@frappe.whitelist()
+def get_changes(
+	month_start: str,
+	month_end: str,
+	employee_filters: dict[str, str],
+	shift_filters: dict[str, str],
+	cursor: str,
+) -> dict:
+	"""Returns shift assignments and leaves changed since the cursor
+	returned by `get_month_snapshot` or a previous call, for patching the roster of the month.
+
+	Records that still belong on the roster are returned as columns like in the snapshot,
+	and the names of ones that were deleted, cancelled or moved out of the month under `removed`."""
+	new_cursor = get_changes_cursor()
+
+	shifts = get_shift_records(month_start, month_end, employee_filters, shift_filters, modified_since=cursor)
+	leaves = get_leave_records(month_start, month_end, employee_filters, modified_since=cursor)
+
+	removed_shifts = get_changed_records("Shift Assignment", employee_filters, cursor) - {
+		d.name for d in shifts
+	}
+	removed_leaves = get_changed_records("Leave Application", employee_filters, cursor) - {
+		d.leave for d in leaves
+	}
+
+	return {
+		"cursor": new_cursor,
+		"shifts": to_columns(shifts, SHIFT_FIELDS),
+		"leaves": to_columns(leaves, LEAVE_FIELDS),
+		"removed": {
+			"shifts": list(removed_shifts | get_deleted_records("Shift Assignment", cursor)),
+			"leaves": list(removed_leaves | get_deleted_records("Leave Application", cursor)),
+		},
+	}
+
+
+def get_changes_cursor() -> str:
+	return str(add_to_date(now(), seconds=-ROSTER_CHANGES_CURSOR_LAG))
+
+
+def get_changed_records(doctype: str, employee_filters: dict[str, str], modified_since: str) -> set[str]:
+	table = frappe.qb.DocType(doctype)
+	Employee = frappe.qb.DocType("Employee")
+
+	query = (
+		frappe.qb.from_(table)
+		.left_join(Employee)
+		.on(table.employee == Employee.name)
+		.select(table.name)
+		.where(table.modified >= modified_since)
+	)
+	for filter in employee_filters:
+		query = query.where(Employee[filter] == employee_filters[filter])
+
+	return set(query.run(pluck=True))
+
+
+def get_deleted_records(doctype: str, deleted_since: str) -> set[str]:
+	return set(
+		frappe.get_all(
+			"Deleted Document",
+			filters={"deleted_doctype": doctype, "creation": (">=", deleted_since)},
+			pluck="deleted_name",
+		)
+	)
+
+
+def get_month_snapshot_etag(
+	month_start: str, month_end: str, employee_filters: dict[str, str], shift_filters: dict[str, str]
+) -> str:
+	"""Fingerprints the records a month snapshot is built from by their count and last modified time.
+	Deleted records change the count and inserted or updated ones the last modified time."""
+	Employee = frappe.qb.DocType("Employee")
+	ShiftAssignment = frappe.qb.DocType("Shift Assignment")
+	LeaveApplication = frappe.qb.DocType("Leave Application")
+
+	def fingerprint(query, doctype):
+		return query.select(Count(doctype.name), Max(doctype.modified)).run()[0]
+
+	employees = frappe.qb.from_(Employee)
+	for filter in employee_filters:
+		employees = employees.where(Employee[filter] == employee_filters[filter])
+
+	shift_assignments = (
+		frappe.qb.from_(ShiftAssignment)
+		.left_join(Employee)
+		.on(ShiftAssignment.employee == Employee.name)
+		.where(
+			(ShiftAssignment.start_date <= month_end)
+			& ((ShiftAssignment.end_date >= month_start) | (ShiftAssignment.end_date.isnull()))
+		)
+	)
+	for filter in employee_filters:
+		shift_assignments = shift_assignments.where(Employee[filter] == employee_filters[filter])
+	for filter in shift_filters:
+		shift_assignments = shift_assignments.where(ShiftAssignment[filter] == shift_filters[filter])
+
+	leave_applications = (
+		frappe.qb.from_(LeaveApplication)
+		.left_join(Employee)
+		.on(LeaveApplication.employee == Employee.name)
+		.where((LeaveApplication.from_date <= month_end) & (LeaveApplication.to_date >= month_start))
+	)
+	for filter in employee_filters:
+		leave_applications = leave_applications.where(Employee[filter] == employee_filters[filter])
+
+	state = [
+		frappe.session.user,
+		month_start,
+		month_end,
+		employee_filters,
+		shift_filters,
+		fingerprint(employees, Employee),
+		fingerprint(shift_assignments, ShiftAssignment),
+		fingerprint(leave_applications, LeaveApplication),
+	]
+	for doctype in ("Shift Type", "Holiday List", "Company", "User Permission"):
+		table = frappe.qb.DocType(doctype)
+		state.append(fingerprint(frappe.qb.from_(table), table))
+
+	return hashlib.sha256(frappe.as_json(state).encode()).hexdigest()
+
+
+def to_columns(records: list[dict], fields: list[str]) -> dict[str, list]:
+	return {field: [record[field] for record in records] for field in fields}
+
+
 @frappe.whitelist()
 def create_shift_assignment_schedule(
 	employee: str,
@@ -157,27 +348,59 @@ def insert_shift(
 
 	else:
 		create_shift_assignment(employee, company, shift_type, start_date, end_date, status)
+		return
+
+	clear_shift_assignment_index(employee)
 
 
 def get_holidays(month_start: str, month_end: str, employee_filters: dict[str, str]) -> dict[str, list[dict]]:
-	holidays = {}
-	holiday_lists = {}
+	holiday_list_for_employee, holidays_by_list = get_holidays_by_list(
+		month_start, month_end, employee_filters
+	)
+
+	return {
+		employee: holidays_by_list.get(holiday_list, []).copy()
+		for employee, holiday_list in holiday_list_for_employee.items()
+		if holiday_list
+	}
 
-	for employee in frappe.get_list("Employee", filters=employee_filters, pluck="name"):
-		if not (holiday_list := get_holiday_list_for_employee(employee, raise_exception=False)):
-			continue
-		if holiday_list not in holiday_lists:
-			holiday_lists[holiday_list] = frappe.get_all(
-				"Holiday",
-				filters={"parent": holiday_list, "holiday_date": ["between", [month_start, month_end]]},
-				fields=["name as holiday", "holiday_date", "description", "weekly_off"],
-			)
-		holidays[employee] = holiday_lists[holiday_list].copy()
 
-	return holidays
+def get_holidays_by_list(
+	month_start: str, month_end: str, employee_filters: dict[str, str]
+) -> tuple[dict[str, str], dict[str, list[dict]]]:
+	"""Returns the holiday list of each employee and the holidays of the month in each holiday list"""
+	holiday_list_for_employee = {
+		employee: holiday_list
+		for employee, holiday_list in resolve_holiday_lists(
+			frappe.get_list("Employee", filters=employee_filters, pluck="name")
+		).items()
+		if holiday_list
+	}
+	if not holiday_list_for_employee:
+		return {}, {}
+
+	holidays_by_list = {}
+	for holiday in frappe.get_all(
+		"Holiday",
+		filters={
+			"parent": ("in", list(set(holiday_list_for_employee.values()))),
+			"holiday_date": ["between", [month_start, month_end]],
+		},
+		fields=["parent", "name as holiday", "holiday_date", "description", "weekly_off"],
+		order_by="holiday_date",
+	):
+		holidays_by_list.setdefault(holiday.pop("parent"), []).append(holiday)
+
+	return holiday_list_for_employee, holidays_by_list
 
 
 def get_leaves(month_start: str, month_end: str, employee_filters: dict[str, str]) -> dict[str, list[dict]]:
+	return group_by_employee(get_leave_records(month_start, month_end, employee_filters))
+
+
+def get_leave_records(
+	month_start: str, month_end: str, employee_filters: dict[str, str], modified_since: str | None = None
+) -> list[dict]:
 	LeaveApplication = frappe.qb.DocType("Leave Application")
 	Employee = frappe.qb.DocType("Employee")
 
@@ -203,12 +426,25 @@ def get_leaves(month_start: str, month_end: str, employee_filters: dict[str, str
 	for filter in employee_filters:
 		query = query.where(Employee[filter] == employee_filters[filter])
 
-	return group_by_employee(query.run(as_dict=True))
+	if modified_since:
+		query = query.where(LeaveApplication.modified >= modified_since)
+
+	return query.run(as_dict=True)
 
 
 def get_shifts(
 	month_start: str, month_end: str, employee_filters: dict[str, str], shift_filters: dict[str, str]
 ) -> dict[str, list[dict]]:
+	return group_by_employee(get_shift_records(month_start, month_end, employee_filters, shift_filters))
+
+
+def get_shift_records(
+	month_start: str,
+	month_end: str,
+	employee_filters: dict[str, str],
+	shift_filters: dict[str, str],
+	modified_since: str | None = None,
+) -> list[dict]:
 	ShiftAssignment = frappe.qb.DocType("Shift Assignment")
 	ShiftType = frappe.qb.DocType("Shift Type")
 	Employee = frappe.qb.DocType("Employee")
@@ -243,7 +479,10 @@ def get_shifts(
 	for filter in shift_filters:
 		query = query.where(ShiftAssignment[filter] == shift_filters[filter])
 
-	return group_by_employee(query.run(as_dict=True))
+	if modified_since:
+		query = query.where(ShiftAssignment.modified >= modified_since)
+
+	return query.run(as_dict=True)
 
 
 def group_by_employee(events: list[dict]) -> dict[str, list[dict]]:
@@ -0,0 +1,133 @@
+# Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_to_date, now
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+
+from hrms.api.roster import (
+	ROSTER_MONTH_SNAPSHOT,
+	get_changes,
+	get_month_snapshot,
+	get_month_snapshot_etag,
+)
+from hrms.hr.doctype.leave_type.test_leave_type import create_leave_type
+from hrms.hr.doctype.shift_assignment.shift_assignment import clear_shift_assignment_index
+from hrms.hr.doctype.shift_type.test_shift_type import make_shift_assignment, setup_shift_type
+from hrms.payroll.doctype.salary_slip.test_salary_slip import make_leave_application
+
+MONTH_START = "2024-01-01"
+MONTH_END = "2024-01-31"
+
+
+class TestRoster(IntegrationTestCase):
+	def setUp(self):
+		for doctype in ["Shift Assignment", "Leave Application"]:
+			frappe.db.delete(doctype)
+		clear_shift_assignment_index()
+		frappe.cache().delete_keys(ROSTER_MONTH_SNAPSHOT)
+
+		self.employee = make_employee("test_roster@example.com", company="_Test Company")
+		self.employee_filters = {"name": self.employee}
+		self.shift_type = setup_shift_type(shift_type="Day Shift").name
+		self.leave_type = create_leave_type(leave_type_name="_Test Roster Leave", is_lwp=1).name
+
+	def tearDown(self):
+		frappe.set_user("Administrator")
+
+	def get_etag(self):
+		return get_month_snapshot_etag(MONTH_START, MONTH_END, self.employee_filters, {})
+
+	def test_month_snapshot_etag(self):
+		shift = make_shift_assignment(self.shift_type, self.employee, "2024-01-02", "2024-01-05")
+		leave = make_leave_application(self.employee, "2024-01-10", "2024-01-10", self.leave_type)
+
+		etag = self.get_etag()
+		self.assertEqual(self.get_etag(), etag)
+
+		snapshot = get_month_snapshot(MONTH_START, MONTH_END, self.employee_filters, {})
+		self.assertEqual(snapshot["etag"], etag)
+		self.assertEqual(snapshot["shifts"]["name"], [shift.name])
+		self.assertEqual(snapshot["leaves"]["leave"], [leave.name])
+		self.assertEqual(
+			get_month_snapshot(MONTH_START, MONTH_END, self.employee_filters, {}, etag=etag),
+			{"etag": etag, "not_modified": 1},
+		)
+
+		# modifying a shift assignment
+		frappe.db.set_value("Shift Assignment", shift.name, "end_date", "2024-01-06")
+		shift_etag = self.get_etag()
+		self.assertNotEqual(shift_etag, etag)
+
+		# modifying a leave application
+		frappe.db.set_value("Leave Application", leave.name, "description", "Roster")
+		leave_etag = self.get_etag()
+		self.assertNotEqual(leave_etag, shift_etag)
+
+		# same records for another user
+		frappe.set_user("test@example.com")
+		self.assertNotEqual(self.get_etag(), leave_etag)
+
+	def test_cached_month_snapshot(self):
+		make_shift_assignment(self.shift_type, self.employee, "2024-01-02", "2024-01-05")
+		snapshot = get_month_snapshot(MONTH_START, MONTH_END, self.employee_filters, {})
+
+		# served from the cache while the etag matches
+		with patch("hrms.api.roster.get_shift_records") as get_shift_records:
+			self.assertEqual(get_month_snapshot(MONTH_START, MONTH_END, self.employee_filters, {}), snapshot)
+		get_shift_records.assert_not_called()
+
+		# rebuilt once the records change
+		shift = make_shift_assignment(self.shift_type, self.employee, "2024-01-08", "2024-01-08")
+		new_snapshot = get_month_snapshot(MONTH_START, MONTH_END, self.employee_filters, {})
+		self.assertNotEqual(new_snapshot["etag"], snapshot["etag"])
+		self.assertIn(shift.name, new_snapshot["shifts"]["name"])
+
+	def test_get_changes(self):
+		unchanged = make_shift_assignment(self.shift_type, self.employee, "2024-01-02", "2024-01-02")
+		modified = make_shift_assignment(self.shift_type, self.employee, "2024-01-03", "2024-01-03")
+		cancelled = make_shift_assignment(self.shift_type, self.employee, "2024-01-04", "2024-01-04")
+		moved = make_shift_assignment(self.shift_type, self.employee, "2024-01-05", "2024-01-05")
+		deleted = make_shift_assignment(self.shift_type, self.employee, "2024-01-08", "2024-01-08")
+		unchanged_leave = make_leave_application(self.employee, "2024-01-15", "2024-01-15", self.leave_type)
+		modified_leave = make_leave_application(self.employee, "2024-01-16", "2024-01-16", self.leave_type)
+		cancelled_leave = make_leave_application(self.employee, "2024-01-17", "2024-01-17", self.leave_type)
+
+		# records as of before the cursor
+		for doctype, records in {
+			"Shift Assignment": [unchanged, modified, cancelled, moved, deleted],
+			"Leave Application": [unchanged_leave, modified_leave, cancelled_leave],
+		}.items():
+			for record in records:
+				frappe.db.set_value(doctype, record.name, "modified", "2023-12-01", update_modified=False)
+		cursor = str(add_to_date(now(), minutes=-1))
+
+		frappe.db.set_value("Shift Assignment", modified.name, "status", "Inactive")
+		cancelled.reload()
+		cancelled.cancel()
+		frappe.db.set_value(
+			"Shift Assignment", moved.name, {"start_date": "2024-02-05", "end_date": "2024-02-05"}
+		)
+		deleted.reload()
+		deleted.cancel()
+		frappe.delete_doc("Shift Assignment", deleted.name)
+		frappe.db.set_value("Leave Application", modified_leave.name, "description", "Roster")
+		cancelled_leave.reload()
+		cancelled_leave.cancel()
+
+		changes = get_changes(MONTH_START, MONTH_END, self.employee_filters, {}, cursor)
+
+		self.assertGreater(changes["cursor"], cursor)
+		self.assertEqual(changes["shifts"]["name"], [modified.name])
+		self.assertEqual(changes["shifts"]["status"], ["Inactive"])
+		self.assertEqual(changes["leaves"]["leave"], [modified_leave.name])
+		# deleted documents are not filtered by employee
+		removed_shifts = set(changes["removed"]["shifts"])
+		self.assertTrue({cancelled.name, moved.name, deleted.name} <= removed_shifts)
+		self.assertFalse({unchanged.name, modified.name} & removed_shifts)
+		self.assertIn(cancelled_leave.name, changes["removed"]["leaves"])
+		self.assertNotIn(unchanged_leave.name, changes["removed"]["leaves"])
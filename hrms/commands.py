@@ -0,0 +1,57 @@
+import click
+
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-leave-balances")
+@click.option("--employee", multiple=True, help="Employee to rebuild leave balances for, all if not set")
+@click.option("--leave-type", help="Leave Type to rebuild leave balances for, all if not set")
+@pass_context
+def rebuild_leave_balances(context, employee=None, leave_type=None):
+	"""Rebuild leave balance snapshots from the Leave Ledger"""
+	from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+		rebuild_leave_balance_snapshots,
+	)
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		count = rebuild_leave_balance_snapshots(list(employee), leave_type)
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Rebuilt {count} leave balance snapshots")
+
+
+@click.command("verify-leave-balances")
+@click.option("--employee", multiple=True, help="Employee to verify leave balances for, all if not set")
+@click.option("--leave-type", help="Leave Type to verify leave balances for, all if not set")
+@pass_context
+def verify_leave_balances(context, employee=None, leave_type=None):
+	"""Compare leave balance snapshots with the balances computed from the Leave Ledger"""
+	from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+		verify_leave_balance_snapshots,
+	)
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		mismatches = verify_leave_balance_snapshots(list(employee), leave_type)
+	finally:
+		frappe.destroy()
+
+	for d in mismatches:
+		status = "stale" if d.stored and d.expected else "missing" if d.expected else "orphaned"
+		click.echo(f"{d.employee}, {d.leave_type}, {d.leave_allocation}: {status}")
+
+	if mismatches:
+		click.secho(f"{len(mismatches)} leave balance snapshots are out of date", fg="red")
+		click.echo("Run `bench rebuild-leave-balances` to rebuild them")
+		raise SystemExit(1)
+
+	click.secho("Leave balance snapshots match the Leave Ledger", fg="green")
+
+
+commands = [rebuild_leave_balances, verify_leave_balances]
@@ -7,8 +7,7 @@ from frappe.desk.form import assign_to
 from frappe.model.document import Document
 from frappe.utils import add_days, flt, unique
 
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
-from erpnext.setup.doctype.holiday_list.holiday_list import is_holiday
+from hrms.utils.holiday_list import get_holiday_list_for_employee, is_holiday
 
 
 class EmployeeBoardingController(Document):
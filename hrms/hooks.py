@@ -169,11 +169,20 @@ doc_events = {
 		"on_update": [
 			"hrms.overrides.company.make_company_fixtures",
 			"hrms.overrides.company.set_default_hr_accounts",
+			"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.invalidate_leave_balance_snapshots",
+			"hrms.hr.doctype.shift_type.shift_type.invalidate_high_water_marks_for_holidays",
 		],
 	},
 	"Holiday List": {
-		"on_update": "hrms.utils.holiday_list.invalidate_cache",
-		"on_trash": "hrms.utils.holiday_list.invalidate_cache",
+		"on_update": [
+			"hrms.utils.holiday_list.invalidate_cache",
+			"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.invalidate_leave_balance_snapshots",
+			"hrms.hr.doctype.shift_type.shift_type.invalidate_high_water_marks_for_holidays",
+		],
+		"on_trash": [
+			"hrms.utils.holiday_list.invalidate_cache",
+			"hrms.hr.doctype.shift_type.shift_type.invalidate_high_water_marks_for_holidays",
+		],
 	},
 	"Timesheet": {"validate": "hrms.hr.utils.validate_active_employee"},
 	"Payment Entry": {
@@ -202,6 +211,8 @@ doc_events = {
 		"on_update": [
 			"hrms.overrides.employee_master.update_approver_role",
 			"hrms.overrides.employee_master.publish_update",
+			"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.invalidate_leave_balance_snapshots",
+			"hrms.hr.doctype.shift_type.shift_type.invalidate_high_water_marks_for_holidays",
 		],
 		"after_insert": "hrms.overrides.employee_master.update_job_applicant_and_offer",
 		"on_trash": "hrms.overrides.employee_master.update_employee_transfer",
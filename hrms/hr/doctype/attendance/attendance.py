@@ -2,17 +2,23 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import json
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.model.naming import get_default_naming_series
+from frappe.query_builder import Case
 from frappe.utils import (
 	add_days,
 	cint,
+	create_batch,
 	cstr,
 	format_date,
 	get_datetime,
 	get_link_to_form,
 	getdate,
+	now_datetime,
 	nowdate,
 )
 
@@ -22,6 +28,7 @@ from hrms.hr.utils import (
 	get_holidays_for_employee,
 	validate_active_employee,
 )
+from hrms.utils import get_names_from_series, release_names_from_series
 
 
 class DuplicateAttendanceError(frappe.ValidationError):
@@ -37,7 +44,9 @@ class Attendance(Document):
 		from erpnext.controllers.status_updater import validate_status
 
 		validate_status(self.status, ["Present", "Absent", "On Leave", "Half Day", "Work From Home"])
-		validate_active_employee(self.employee)
+		bulk_attendance = self.get_bulk_attendance()
+		if not bulk_attendance or bulk_attendance.get_employee(self.employee).status == "Inactive":
+			validate_active_employee(self.employee)
 		self.validate_attendance_date()
 		self.validate_duplicate_record()
 		self.validate_overlapping_shift_attendance()
@@ -47,8 +56,15 @@ class Attendance(Document):
 	def on_cancel(self):
 		self.unlink_attendance_from_checkins()
 
+	def get_bulk_attendance(self) -> "BulkAttendance | None":
+		"""Returns the batch this attendance is being validated in by `BulkAttendance`, if any"""
+		return getattr(self, "_bulk_attendance", None)
+
 	def validate_attendance_date(self):
-		date_of_joining = frappe.db.get_value("Employee", self.employee, "date_of_joining")
+		if bulk_attendance := self.get_bulk_attendance():
+			date_of_joining = bulk_attendance.get_employee(self.employee).date_of_joining
+		else:
+			date_of_joining = frappe.db.get_value("Employee", self.employee, "date_of_joining")
 
 		# leaves can be marked for future dates
 		if (
@@ -85,6 +101,9 @@ class Attendance(Document):
 			)
 
 	def get_duplicate_attendance_record(self) -> str | None:
+		if bulk_attendance := self.get_bulk_attendance():
+			return bulk_attendance.get_duplicate_attendance_record(self)
+
 		Attendance = frappe.qb.DocType("Attendance")
 		query = (
 			frappe.qb.from_(Attendance)
@@ -129,6 +148,9 @@ class Attendance(Document):
 		if not self.shift:
 			return {}
 
+		if bulk_attendance := self.get_bulk_attendance():
+			return bulk_attendance.get_overlapping_shift_attendance(self)
+
 		Attendance = frappe.qb.DocType("Attendance")
 		same_date_attendance = (
 			frappe.qb.from_(Attendance)
@@ -149,27 +171,16 @@ class Attendance(Document):
 		return {}
 
 	def validate_employee_status(self):
-		if frappe.db.get_value("Employee", self.employee, "status") == "Inactive":
+		if bulk_attendance := self.get_bulk_attendance():
+			status = bulk_attendance.get_employee(self.employee).status
+		else:
+			status = frappe.db.get_value("Employee", self.employee, "status")
+
+		if status == "Inactive":
 			frappe.throw(_("Cannot mark attendance for an Inactive employee {0}").format(self.employee))
 
 	def check_leave_record(self):
-		LeaveApplication = frappe.qb.DocType("Leave Application")
-		leave_record = (
-			frappe.qb.from_(LeaveApplication)
-			.select(
-				LeaveApplication.leave_type,
-				LeaveApplication.half_day,
-				LeaveApplication.half_day_date,
-				LeaveApplication.name,
-			)
-			.where(
-				(LeaveApplication.employee == self.employee)
-				& (self.attendance_date >= LeaveApplication.from_date)
-				& (self.attendance_date <= LeaveApplication.to_date)
-				& (LeaveApplication.status == "Approved")
-				& (LeaveApplication.docstatus == 1)
-			)
-		).run(as_dict=True)
+		leave_record = self.get_leave_record()
 
 		if leave_record:
 			for d in leave_record:
@@ -202,6 +213,28 @@ class Attendance(Document):
 			self.leave_type = None
 			self.leave_application = None
 
+	def get_leave_record(self) -> list[dict]:
+		if bulk_attendance := self.get_bulk_attendance():
+			return bulk_attendance.get_leave_applications(self.employee, self.attendance_date)
+
+		LeaveApplication = frappe.qb.DocType("Leave Application")
+		return (
+			frappe.qb.from_(LeaveApplication)
+			.select(
+				LeaveApplication.leave_type,
+				LeaveApplication.half_day,
+				LeaveApplication.half_day_date,
+				LeaveApplication.name,
+			)
+			.where(
+				(LeaveApplication.employee == self.employee)
+				& (self.attendance_date >= LeaveApplication.from_date)
+				& (self.attendance_date <= LeaveApplication.to_date)
+				& (LeaveApplication.status == "Approved")
+				& (LeaveApplication.docstatus == 1)
+			)
+		).run(as_dict=True)
+
 	def validate_employee(self):
 		emp = frappe.db.sql(
 			"select name from `tabEmployee` where name = %s and status = 'Active'", self.employee
@@ -220,9 +253,11 @@ class Attendance(Document):
 		)
 
 		if linked_logs:
+			# bump modified so that auto attendance picks up the unlinked logs again
 			(
 				frappe.qb.update(EmployeeCheckin)
 				.set("attendance", "")
+				.set("modified", now_datetime())
 				.where(EmployeeCheckin.attendance == self.name)
 			).run()
 
@@ -330,6 +365,259 @@ def mark_attendance(
 	return attendance.name
 
 
+ATTENDANCE_FIELDS = (
+	"naming_series",
+	"employee",
+	"employee_name",
+	"company",
+	"department",
+	"attendance_date",
+	"status",
+	"working_hours",
+	"leave_type",
+	"leave_application",
+	"shift",
+	"late_entry",
+	"early_exit",
+	"in_time",
+	"out_time",
+)
+
+
+class BulkAttendance:
+	"""Validates and submits system-generated attendance records in bulk.
+
+	Each record is validated by `Attendance.validate`, with the employee, duplicate, overlapping shift
+	and leave checks answered from data fetched for the whole batch in a few queries. Records are
+	validated in order and a valid record is visible to the ones after it, so the outcome is the same
+	as submitting them one at a time. Valid records are then inserted with multi-row inserts,
+	without running the document lifecycle.
+
+	Besides the Attendance fields, a record can have:
+	- `checkins`: names of Employee Checkins to be linked to the attendance
+	- `comment`: a comment to be added to the attendance
+	"""
+
+	def __init__(self, records: list[dict]):
+		self.records = [frappe._dict(record) for record in records]
+		self.naming_series = get_default_naming_series("Attendance")
+
+	def submit(self, batch_size: int = 1000) -> list[frappe._dict]:
+		"""Returns the `name` of the attendance created for each record,
+		or the `error` the record failed validation with"""
+		if not self.records:
+			return []
+
+		self.prefetch()
+		names = get_names_from_series(self.naming_series, len(self.records))
+
+		results, attendance = [], []
+		for record in self.records:
+			try:
+				doc = self.get_attendance_doc(record)
+				doc.validate()
+			except frappe.ValidationError as e:
+				results.append(frappe._dict(name=None, error=e))
+				continue
+
+			doc.name = names[len(attendance)]
+			self.add_attendance(doc)
+			attendance.append((doc, record))
+			results.append(frappe._dict(name=doc.name, error=None))
+
+		release_names_from_series(self.naming_series, len(names) - len(attendance))
+		self.insert_attendance(attendance, batch_size)
+		self.link_checkins(attendance, batch_size)
+
+		return results
+
+	def prefetch(self):
+		employees = list({record.employee for record in self.records})
+		dates = [getdate(record.attendance_date) for record in self.records]
+		from_date, to_date = min(dates), max(dates)
+
+		self.employees = {
+			employee.name: employee
+			for employee in frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "employee_name", "company", "department", "date_of_joining", "status"],
+			)
+		}
+
+		Attendance = frappe.qb.DocType("Attendance")
+		attendance = (
+			frappe.qb.from_(Attendance)
+			.select(Attendance.name, Attendance.employee, Attendance.attendance_date, Attendance.shift)
+			.where(
+				(Attendance.employee.isin(employees))
+				& (Attendance.docstatus < 2)
+				& (Attendance.attendance_date.between(from_date, to_date))
+			)
+			.for_update()
+		).run(as_dict=True)
+
+		self.attendance = {}
+		for d in attendance:
+			self.attendance.setdefault((d.employee, getdate(d.attendance_date)), []).append(d)
+
+		LeaveApplication = frappe.qb.DocType("Leave Application")
+		leave_applications = (
+			frappe.qb.from_(LeaveApplication)
+			.select(
+				LeaveApplication.employee,
+				LeaveApplication.leave_type,
+				LeaveApplication.half_day,
+				LeaveApplication.half_day_date,
+				LeaveApplication.name,
+				LeaveApplication.from_date,
+				LeaveApplication.to_date,
+			)
+			.where(
+				(LeaveApplication.employee.isin(employees))
+				& (LeaveApplication.from_date <= to_date)
+				& (LeaveApplication.to_date >= from_date)
+				& (LeaveApplication.status == "Approved")
+				& (LeaveApplication.docstatus == 1)
+			)
+		).run(as_dict=True)
+
+		self.leave_applications = {}
+		for d in leave_applications:
+			self.leave_applications.setdefault(d.employee, []).append(d)
+
+		self.overlapping_timings = {}
+
+	def get_attendance_doc(self, record: dict) -> Attendance:
+		doc = frappe.new_doc("Attendance")
+		doc.update({key: value for key, value in record.items() if key not in ("checkins", "comment")})
+
+		employee = self.get_employee(doc.employee)
+		doc.update(
+			{
+				"naming_series": self.naming_series,
+				"employee_name": employee.employee_name,
+				"company": employee.company,
+				"department": employee.department,
+			}
+		)
+		doc._bulk_attendance = self
+		return doc
+
+	def add_attendance(self, doc: Attendance):
+		self.attendance.setdefault((doc.employee, getdate(doc.attendance_date)), []).append(
+			frappe._dict(
+				name=doc.name, employee=doc.employee, attendance_date=doc.attendance_date, shift=doc.shift
+			)
+		)
+
+	def get_employee(self, employee: str) -> frappe._dict:
+		if employee not in self.employees:
+			frappe.throw(_("Employee {0} not found").format(employee), frappe.DoesNotExistError)
+
+		return self.employees[employee]
+
+	def get_duplicate_attendance_record(self, doc: Attendance) -> str | None:
+		for d in self.attendance.get((doc.employee, getdate(doc.attendance_date)), []):
+			if not doc.shift or not d.shift or d.shift == doc.shift:
+				return d.name
+
+		return None
+
+	def get_overlapping_shift_attendance(self, doc: Attendance) -> dict:
+		for d in self.attendance.get((doc.employee, getdate(doc.attendance_date)), []):
+			if not d.shift or d.shift == doc.shift:
+				continue
+
+			if (doc.shift, d.shift) not in self.overlapping_timings:
+				self.overlapping_timings[(doc.shift, d.shift)] = has_overlapping_timings(doc.shift, d.shift)
+
+			if self.overlapping_timings[(doc.shift, d.shift)]:
+				return d
+
+		return {}
+
+	def get_leave_applications(self, employee: str, attendance_date) -> list[dict]:
+		attendance_date = getdate(attendance_date)
+		return [
+			d
+			for d in self.leave_applications.get(employee, [])
+			if getdate(d.from_date) <= attendance_date <= getdate(d.to_date)
+		]
+
+	def insert_attendance(self, attendance: list[tuple], batch_size: int):
+		now, user = now_datetime(), frappe.session.user
+		values, comments = [], []
+
+		for doc, record in attendance:
+			_comments = None
+			if record.comment:
+				comment = frappe.generate_hash(length=10)
+				comments.append(
+					(
+						comment,
+						user,
+						user,
+						now,
+						now,
+						0,
+						"Comment",
+						user,
+						"Attendance",
+						doc.name,
+						record.comment,
+					)
+				)
+				# same as the comment cache set on the reference document when a comment is inserted
+				_comments = json.dumps(
+					[{"comment": get_truncated(record.comment), "by": user, "name": comment}]
+				)
+
+			values.append(
+				(doc.name, user, user, now, now, 1, _comments, *(doc.get(f) for f in ATTENDANCE_FIELDS))
+			)
+
+		fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus", "_comments"]
+		fields.extend(ATTENDANCE_FIELDS)
+		for batch in create_batch(values, batch_size):
+			frappe.db.bulk_insert("Attendance", fields, batch)
+
+		comment_fields = [
+			"name",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+			"docstatus",
+			"comment_type",
+			"comment_email",
+			"reference_doctype",
+			"reference_name",
+			"content",
+		]
+		for batch in create_batch(comments, batch_size):
+			frappe.db.bulk_insert("Comment", comment_fields, batch)
+
+	def link_checkins(self, attendance: list[tuple], batch_size: int):
+		checkins = [(log, doc.name) for doc, record in attendance for log in record.checkins or []]
+		EmployeeCheckin = frappe.qb.DocType("Employee Checkin")
+
+		for batch in create_batch(checkins, batch_size):
+			attendance_for_log = Case()
+			for log, name in batch:
+				attendance_for_log = attendance_for_log.when(EmployeeCheckin.name == log, name)
+
+			(
+				frappe.qb.update(EmployeeCheckin)
+				.set(EmployeeCheckin.attendance, attendance_for_log)
+				.where(EmployeeCheckin.name.isin([log for log, name in batch]))
+			).run()
+
+
+def get_truncated(content: str) -> str:
+	return (content[:97] + "...") if len(content) > 100 else content
+
+
 @frappe.whitelist()
 def mark_bulk_attendance(data):
 	import json
@@ -17,6 +17,7 @@ from frappe.utils import (
 from erpnext.setup.doctype.employee.test_employee import make_employee
 
 from hrms.hr.doctype.attendance.attendance import (
+	BulkAttendance,
 	DuplicateAttendanceError,
 	OverlappingShiftAttendanceError,
 	get_unmarked_days,
@@ -146,6 +147,53 @@ class TestAttendance(IntegrationTestCase):
 		)
 		self.assertEqual(attendance, fetch_attendance)
 
+	def test_bulk_attendance(self):
+		from hrms.hr.doctype.shift_type.test_shift_type import setup_shift_type
+
+		employee = make_employee("test_bulk_attendance@example.com", company="_Test Company")
+		date = getdate()
+
+		shift_1 = setup_shift_type(shift_type="Shift 1", start_time="08:00:00", end_time="10:00:00")
+		shift_2 = setup_shift_type(shift_type="Shift 2", start_time="09:30:00", end_time="11:00:00")
+		shift_3 = setup_shift_type(shift_type="Shift 3", start_time="11:00:00", end_time="12:00:00")
+
+		existing = mark_attendance(employee, add_days(date, -1), "Present")
+		results = BulkAttendance(
+			[
+				{"employee": employee, "attendance_date": date, "status": "Present", "shift": shift_1.name},
+				# overlaps with the record before it in the same batch
+				{"employee": employee, "attendance_date": date, "status": "Present", "shift": shift_2.name},
+				{
+					"employee": employee,
+					"attendance_date": date,
+					"status": "Absent",
+					"shift": shift_3.name,
+					"comment": "Marked Absent",
+				},
+				{"employee": employee, "attendance_date": add_days(date, -1), "status": "Absent"},
+				{"employee": employee, "attendance_date": add_days(date, 1), "status": "Present"},
+			]
+		).submit()
+
+		self.assertIsInstance(results[1].error, OverlappingShiftAttendanceError)
+		self.assertIn(results[0].name, str(results[1].error))
+		self.assertIsInstance(results[3].error, DuplicateAttendanceError)
+		self.assertIn(existing, str(results[3].error))
+		# future date
+		self.assertIsInstance(results[4].error, frappe.ValidationError)
+
+		for result, shift, status in ((results[0], shift_1, "Present"), (results[2], shift_3, "Absent")):
+			attendance = frappe.get_doc("Attendance", result.name)
+			self.assertEqual(attendance.docstatus, 1)
+			self.assertEqual(attendance.status, status)
+			self.assertEqual(attendance.shift, shift.name)
+			self.assertEqual(attendance.company, "_Test Company")
+
+		comment = frappe.db.get_value(
+			"Comment", {"reference_doctype": "Attendance", "reference_name": results[2].name}, "content"
+		)
+		self.assertEqual(comment, "Marked Absent")
+
 	def test_unmarked_days(self):
 		first_sunday = get_first_sunday(self.holiday_list, for_date=get_last_day(add_months(getdate(), -1)))
 		attendance_date = add_days(first_sunday, 1)
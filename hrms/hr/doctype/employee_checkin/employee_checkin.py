@@ -5,14 +5,19 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cint, get_datetime
+from frappe.utils import cint, create_batch, cstr, get_datetime, get_link_to_form, now_datetime
 
-from hrms.hr.doctype.shift_assignment.shift_assignment import get_actual_start_end_datetime_of_shift
+from hrms.hr.doctype.attendance.attendance import BulkAttendance
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	ShiftAssignmentIndex,
+	get_actual_start_end_datetime_of_shift,
+)
 from hrms.hr.utils import (
 	get_distance_between_coordinates,
 	set_geolocation_from_coordinates,
 	validate_active_employee,
 )
+from hrms.utils import get_names_from_series, has_doc_events
 
 
 class CheckinRadiusExceededError(frappe.ValidationError):
@@ -57,17 +62,7 @@ class EmployeeCheckin(Document):
 			self.shift = None
 			return
 
-		if (
-			shift_actual_timings.shift_type.determine_check_in_and_check_out
-			== "Strictly based on Log Type in Employee Checkin"
-			and not self.log_type
-			and not self.skip_auto_attendance
-		):
-			frappe.throw(
-				_("Log Type is required for check-ins falling in the shift: {0}.").format(
-					shift_actual_timings.shift_type.name
-				)
-			)
+		validate_log_type_for_shift(self, shift_actual_timings.shift_type)
 		if not self.attendance:
 			self.shift = shift_actual_timings.shift_type.name
 			self.shift_actual_start = shift_actual_timings.actual_start
@@ -161,6 +156,246 @@ def add_log_based_on_employee_field(
 	return doc
 
 
+def validate_log_type_for_shift(log, shift_type):
+	if (
+		shift_type.determine_check_in_and_check_out == "Strictly based on Log Type in Employee Checkin"
+		and not log.log_type
+		and not log.skip_auto_attendance
+	):
+		frappe.throw(
+			_("Log Type is required for check-ins falling in the shift: {0}.").format(shift_type.name)
+		)
+
+
+@frappe.whitelist(methods=["POST"])
+def add_logs_based_on_employee_field(
+	logs: list[dict] | str, employee_fieldname: str = "attendance_device_id"
+) -> dict:
+	"""Creates Employee Checkins for many punches at once, eg: punches pushed by biometric devices.
+
+	Employees are looked up for all the punches in one query, shifts are resolved from shift assignments
+	loaded in one query and the checkins are inserted in batches. Punches are validated the same way as
+	`add_log_based_on_employee_field`, and invalid punches are returned with their errors instead of failing the request.
+
+	Checkins are inserted with multi-row inserts, without running the document lifecycle or hooks registered
+	for all doctypes. If any app hooks into the document events of Employee Checkin, or geolocation tracking
+	is enabled, punches are added one document at a time instead.
+
+	:param logs: List of punches, each a dict with `employee_field_value`, `timestamp` and optionally `device_id`,
+	        `log_type` and `skip_auto_attendance` (see `add_log_based_on_employee_field`).
+	:param employee_fieldname: (Default: attendance_device_id)Name of the field in Employee DocType based on which employee lookup will happen.
+	"""
+	frappe.has_permission("Employee Checkin", "create", throw=True)
+	if isinstance(logs, str):
+		logs = frappe.parse_json(logs)
+
+	logs = [frappe._dict(log) for log in logs]
+	if has_doc_events("Employee Checkin") or frappe.db.get_single_value(
+		"HR Settings", "allow_geolocation_tracking"
+	):
+		# hooks of other apps and the shift location check need the full document lifecycle
+		return add_logs_individually(logs, employee_fieldname)
+
+	result = frappe._dict(checkins=[], failed=[])
+	employees = get_employees_by_field(
+		employee_fieldname, {log.employee_field_value for log in logs if log.employee_field_value}
+	)
+
+	valid_logs = []
+	for idx, log in enumerate(logs):
+		log.idx = idx
+		if not log.employee_field_value or not log.timestamp:
+			add_failed_log(result, log, _("'employee_field_value' and 'timestamp' are required."))
+			continue
+
+		employee = employees.get(cstr(log.employee_field_value))
+		if not employee:
+			add_failed_log(
+				result,
+				log,
+				_("No Employee found for the given employee field value. '{}': {}").format(
+					employee_fieldname, log.employee_field_value
+				),
+			)
+			continue
+
+		if employee.status == "Inactive":
+			add_failed_log(
+				result,
+				log,
+				_("Transactions cannot be created for an Inactive Employee {0}.").format(
+					get_link_to_form("Employee", employee.name)
+				),
+			)
+			continue
+
+		log.update(
+			{
+				"employee": employee.name,
+				"employee_name": employee.employee_name,
+				"time": get_datetime(log.timestamp),
+				"log_type": log.log_type or None,
+				"skip_auto_attendance": 1 if cint(log.skip_auto_attendance) == 1 else 0,
+			}
+		)
+		valid_logs.append(log)
+
+	valid_logs = remove_duplicate_logs(valid_logs, result)
+	set_shifts_for_logs(valid_logs, result)
+	result.checkins = insert_checkins([log for log in valid_logs if not log.error])
+
+	return result
+
+
+def add_logs_individually(logs: list[dict], employee_fieldname: str) -> dict:
+	result = frappe._dict(checkins=[], failed=[])
+	for idx, log in enumerate(logs):
+		log.idx = idx
+		try:
+			frappe.db.savepoint("employee_checkin")
+			doc = add_log_based_on_employee_field(
+				log.employee_field_value,
+				log.timestamp,
+				log.device_id,
+				log.log_type,
+				log.skip_auto_attendance or 0,
+				employee_fieldname,
+			)
+			result.checkins.append(doc.name)
+		except frappe.ValidationError as e:
+			frappe.db.rollback(save_point="employee_checkin")
+			frappe.clear_messages()
+			add_failed_log(result, log, str(e))
+
+	return result
+
+
+def add_failed_log(result: dict, log: dict, error: str) -> None:
+	log.error = error
+	result.failed.append({"idx": log.idx, "employee_field_value": log.employee_field_value, "error": error})
+
+
+def get_employees_by_field(employee_fieldname: str, values: set) -> dict:
+	if not values:
+		return {}
+
+	employees = frappe.get_all(
+		"Employee",
+		filters={employee_fieldname: ("in", list(values))},
+		fields=["name", "employee_name", "status", employee_fieldname],
+		order_by="creation asc",
+	)
+
+	employees_by_field = {}
+	for employee in employees:
+		# same as a lookup by the field, where the first matching employee is used
+		employees_by_field.setdefault(cstr(employee.get(employee_fieldname)), employee)
+
+	return employees_by_field
+
+
+def remove_duplicate_logs(logs: list[dict], result: dict) -> list[dict]:
+	"""Drops logs that already exist with the same employee, time and log type (see `validate_duplicate_log`)"""
+	if not logs:
+		return []
+
+	Checkin = frappe.qb.DocType("Employee Checkin")
+	existing_logs = (
+		frappe.qb.from_(Checkin)
+		.select(Checkin.name, Checkin.employee, Checkin.time, Checkin.log_type)
+		.where(
+			(Checkin.employee.isin(list({log.employee for log in logs})))
+			& (Checkin.time.isin(list({log.time for log in logs})))
+		)
+	).run(as_dict=True)
+
+	existing = {(d.employee, get_datetime(d.time), d.log_type or None): d.name for d in existing_logs}
+
+	unique_logs = []
+	for log in logs:
+		key = (log.employee, log.time, log.log_type)
+		if key in existing:
+			add_failed_log(
+				result,
+				log,
+				_("This employee already has a log with the same timestamp.{0}").format(
+					"<Br>" + frappe.get_desk_link("Employee Checkin", existing[key]) if existing[key] else ""
+				),
+			)
+			continue
+
+		# punches repeated within the same request
+		existing[key] = None
+		unique_logs.append(log)
+
+	return unique_logs
+
+
+def set_shifts_for_logs(logs: list[dict], result: dict) -> None:
+	if not logs:
+		return
+
+	shift_assignments = ShiftAssignmentIndex([log.employee for log in logs])
+
+	for log in logs:
+		log.shift = None
+		shift_actual_timings = get_actual_start_end_datetime_of_shift(
+			log.employee, log.time, True, shift_assignments
+		)
+		if not shift_actual_timings:
+			continue
+
+		try:
+			validate_log_type_for_shift(log, shift_actual_timings.shift_type)
+		except frappe.ValidationError as e:
+			frappe.clear_messages()
+			add_failed_log(result, log, str(e))
+			continue
+
+		log.update(
+			{
+				"shift": shift_actual_timings.shift_type.name,
+				"shift_actual_start": shift_actual_timings.actual_start,
+				"shift_actual_end": shift_actual_timings.actual_end,
+				"shift_start": shift_actual_timings.start_datetime,
+				"shift_end": shift_actual_timings.end_datetime,
+			}
+		)
+
+
+CHECKIN_FIELDS = (
+	"employee",
+	"employee_name",
+	"log_type",
+	"time",
+	"device_id",
+	"skip_auto_attendance",
+	"shift",
+	"shift_start",
+	"shift_end",
+	"shift_actual_start",
+	"shift_actual_end",
+)
+
+
+def insert_checkins(logs: list[dict], batch_size: int = 1000) -> list[str]:
+	if not logs:
+		return []
+
+	names = get_names_from_series(frappe.get_meta("Employee Checkin").autoname, len(logs))
+	now, user = now_datetime(), frappe.session.user
+	fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus", *CHECKIN_FIELDS]
+
+	for batch in create_batch(list(zip(names, logs, strict=True)), batch_size):
+		values = [
+			(name, user, user, now, now, 0, *(log.get(field) for field in CHECKIN_FIELDS))
+			for name, log in batch
+		]
+		frappe.db.bulk_insert("Employee Checkin", fields, values)
+
+	return names
+
+
 @frappe.whitelist()
 def bulk_fetch_shift(checkins: list[str] | str) -> None:
 	if isinstance(checkins, str):
@@ -232,6 +467,57 @@ def mark_attendance_and_link_log(
 		frappe.throw(_("{} is an invalid Attendance Status.").format(attendance_status))
 
 
+def mark_bulk_attendance_and_link_logs(shift_attendance: list[dict]):
+	"""Same as `mark_attendance_and_link_log` for the logs of many shifts, creating the attendance in bulk.
+
+	:param shift_attendance: The List of dicts with `logs` of a single shift and the arguments of
+	        `mark_attendance_and_link_log` for them.
+	"""
+	skipped_logs, to_mark, records = [], [], []
+
+	for d in shift_attendance:
+		log_names = [x.name for x in d.logs]
+
+		if d.attendance_status == "Skip":
+			skipped_logs.extend(log_names)
+			continue
+
+		elif d.attendance_status not in ("Present", "Absent", "Half Day"):
+			frappe.throw(_("{} is an invalid Attendance Status.").format(d.attendance_status))
+
+		to_mark.append(log_names)
+		records.append(
+			{
+				"employee": d.logs[0].employee,
+				"attendance_date": d.attendance_date,
+				"status": d.attendance_status,
+				"working_hours": d.working_hours,
+				"shift": d.shift,
+				"late_entry": d.late_entry,
+				"early_exit": d.early_exit,
+				"in_time": d.in_time,
+				"out_time": d.out_time,
+				"checkins": log_names,
+				"comment": _("Employee was marked Absent for not meeting the working hours threshold.")
+				if d.attendance_status == "Absent"
+				else None,
+			}
+		)
+
+	if skipped_logs:
+		skip_attendance_in_checkins(skipped_logs)
+
+	failed = False
+	for log_names, result in zip(to_mark, BulkAttendance(records).submit(), strict=True):
+		if result.error:
+			failed = True
+			skip_attendance_in_checkins(log_names)
+			add_comment_in_checkins(log_names, result.error)
+
+	if failed:
+		frappe.clear_messages()
+
+
 def calculate_working_hours(logs, check_in_out_type, working_hours_calc_type):
 	"""Given a set of logs in chronological order calculates the total working hours based on the parameters.
 	Zero is returned for all invalid cases.
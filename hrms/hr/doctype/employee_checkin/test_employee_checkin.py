@@ -2,11 +2,13 @@
 # See license.txt
 
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase, change_settings
 from frappe.utils import (
 	add_days,
+	cint,
 	get_time,
 	get_year_ending,
 	get_year_start,
@@ -19,11 +21,14 @@ from erpnext.setup.doctype.employee.test_employee import make_employee
 
 from hrms.hr.doctype.employee_checkin.employee_checkin import (
 	CheckinRadiusExceededError,
+	EmployeeCheckin,
 	add_log_based_on_employee_field,
+	add_logs_based_on_employee_field,
 	bulk_fetch_shift,
 	calculate_working_hours,
 	mark_attendance_and_link_log,
 )
+from hrms.hr.doctype.shift_assignment.shift_assignment import clear_shift_assignment_index
 from hrms.hr.doctype.shift_type.test_shift_type import make_shift_assignment, setup_shift_type
 from hrms.payroll.doctype.salary_slip.test_salary_slip import make_holiday_list
 
@@ -32,6 +37,7 @@ class TestEmployeeCheckin(IntegrationTestCase):
 	def setUp(self):
 		frappe.db.delete("Shift Type")
 		frappe.db.delete("Shift Assignment")
+		clear_shift_assignment_index()
 		frappe.db.delete("Employee Checkin")
 
 		from_date = get_year_start(getdate())
@@ -82,6 +88,71 @@ class TestEmployeeCheckin(IntegrationTestCase):
 		self.assertEqual(employee_checkin.device_id, "mumbai_first_floor")
 		self.assertEqual(employee_checkin.log_type, "IN")
 
+	def test_add_logs_based_on_employee_field(self):
+		employee = make_employee("test_add_logs_based_on_employee_field@example.com", company="_Test Company")
+		frappe.db.set_value("Employee", employee, "attendance_device_id", "4455")
+
+		# shift setup for 8-12
+		shift_type = setup_shift_type()
+		date = getdate()
+		make_shift_assignment(shift_type.name, employee, date)
+
+		logs = [
+			{"employee_field_value": "4455", "timestamp": f"{date} 08:45:00", "log_type": "IN"},
+			{"employee_field_value": 4455, "timestamp": f"{date} 13:01:00", "device_id": "gate_1"},
+			# duplicate within the same request
+			{"employee_field_value": "4455", "timestamp": f"{date} 08:45:00", "log_type": "IN"},
+			{"employee_field_value": "9999", "timestamp": f"{date} 08:45:00"},
+		]
+		result = add_logs_based_on_employee_field(logs)
+
+		self.assertEqual(len(result.checkins), 2)
+		self.assertEqual([d["idx"] for d in result.failed], [2, 3])
+
+		checkin_in_shift = frappe.get_doc("Employee Checkin", result.checkins[0])
+		self.assertEqual(checkin_in_shift.employee, employee)
+		self.assertEqual(checkin_in_shift.log_type, "IN")
+		self.assertEqual(checkin_in_shift.shift, shift_type.name)
+		self.assertEqual(checkin_in_shift.shift_actual_start, datetime.combine(date, get_time("07:00:00")))
+
+		checkin_outside_shift = frappe.get_doc("Employee Checkin", result.checkins[1])
+		self.assertEqual(checkin_outside_shift.device_id, "gate_1")
+		self.assertIsNone(checkin_outside_shift.shift)
+
+		# names continue the series with as many digits as checkins inserted one at a time
+		checkin = frappe.get_doc(
+			{"doctype": "Employee Checkin", "employee": employee, "time": f"{date} 17:00:00"}
+		).insert()
+		self.assertEqual(len(checkin.name), len(result.checkins[0]))
+		self.assertEqual(cint(checkin.name.rsplit("-", 1)[1]), cint(result.checkins[1].rsplit("-", 1)[1]) + 1)
+
+		# duplicate of an existing log
+		result = add_logs_based_on_employee_field(logs[:1])
+		self.assertFalse(result.checkins)
+		self.assertEqual(len(result.failed), 1)
+
+	def test_add_logs_based_on_employee_field_with_doc_events(self):
+		employee = make_employee("test_add_logs_based_on_employee_field@example.com", company="_Test Company")
+		frappe.db.set_value("Employee", employee, "attendance_device_id", "4455")
+		date = getdate()
+
+		logs = [
+			{"employee_field_value": "4455", "timestamp": f"{date} 08:45:00", "log_type": "IN"},
+			{"employee_field_value": "4455", "timestamp": f"{date} 08:45:00", "log_type": "IN"},
+			{"employee_field_value": "9999", "timestamp": f"{date} 08:45:00"},
+		]
+		# checkins are inserted one at a time when other apps hook into their events
+		with (
+			patch("hrms.hr.doctype.employee_checkin.employee_checkin.has_doc_events", return_value=True),
+			patch.object(EmployeeCheckin, "after_insert", create=True) as after_insert,
+		):
+			result = add_logs_based_on_employee_field(logs)
+
+		self.assertEqual(after_insert.call_count, 1)
+		self.assertEqual(len(result.checkins), 1)
+		self.assertEqual([d["idx"] for d in result.failed], [1, 2])
+		self.assertEqual(frappe.db.get_value("Employee Checkin", result.checkins[0], "employee"), employee)
+
 	def test_mark_attendance_and_link_log(self):
 		employee = make_employee("test_mark_attendance_and_link_log@example.com")
 		logs = make_n_checkins(employee, 3)
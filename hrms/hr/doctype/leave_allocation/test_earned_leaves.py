@@ -501,6 +501,47 @@ class TestLeaveAllocation(IntegrationTestCase):
 		)
 		self.assertRaises(frappe.ValidationError, leave_allocation.allocate_leaves_manually, 1)
 
+	def test_earned_leave_ledger_entry_and_comment(self):
+		"""Tests the ledger entry and comment added for leaves allocated via scheduler"""
+		prev_month_last_day = get_last_day(add_months(getdate(), -1))
+		last_day = get_last_day(getdate())
+
+		frappe.flags.current_date = prev_month_last_day
+		leave_policy_assignments = make_policy_assignment(
+			self.employee, allocate_on_day="Last Day", start_date=prev_month_last_day
+		)
+		allocation = frappe.db.get_value(
+			"Leave Allocation", {"leave_policy_assignment": leave_policy_assignments[0]}, ["name", "to_date"]
+		)
+
+		frappe.flags.current_date = last_day
+		allocate_earned_leaves()
+
+		ledger_entry = frappe.get_all(
+			"Leave Ledger Entry",
+			filters={"transaction_name": allocation[0], "from_date": last_day},
+			fields=["employee", "company", "leaves", "to_date", "is_carry_forward", "docstatus"],
+		)
+		self.assertEqual(len(ledger_entry), 1)
+		self.assertEqual(ledger_entry[0].employee, self.employee.name)
+		self.assertEqual(ledger_entry[0].company, self.employee.company)
+		self.assertEqual(ledger_entry[0].leaves, 1)
+		self.assertEqual(ledger_entry[0].to_date, allocation[1])
+		self.assertEqual(ledger_entry[0].is_carry_forward, 0)
+		self.assertEqual(ledger_entry[0].docstatus, 1)
+
+		self.assertTrue(
+			frappe.db.exists(
+				"Comment",
+				{
+					"reference_doctype": "Leave Allocation",
+					"reference_name": allocation[0],
+					"comment_type": "Info",
+				},
+			)
+		)
+		self.assertEqual(get_leave_balance_on(self.employee.name, self.leave_type, last_day), 2)
+
 	def tearDown(self):
 		frappe.db.set_value("Employee", self.employee.name, "date_of_joining", self.original_doj)
 		frappe.db.set_value("Leave Type", self.leave_type, "max_leaves_allowed", 0)
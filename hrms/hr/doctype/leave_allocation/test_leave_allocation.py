@@ -458,6 +458,36 @@ class TestLeaveAllocation(IntegrationTestCase):
 		)
 		self.assertIsNone(expired_leaves)
 
+	def test_expiry_of_allocation_submitted_after_last_run(self):
+		process_expired_allocation()
+		# the last run is recorded once it is committed
+		frappe.db.after_commit.run()
+
+		# back dated allocation that ended before the last run
+		leave_allocation = create_leave_allocation(
+			employee=self.employee.name,
+			employee_name=self.employee.employee_name,
+			from_date=add_days(nowdate(), -60),
+			to_date=add_days(nowdate(), -30),
+			new_leaves_allocated=5,
+		)
+		leave_allocation.submit()
+
+		process_expired_allocation()
+		frappe.db.after_commit.run()
+		expiry_filters = dict(transaction_name=leave_allocation.name, is_expired=1, docstatus=1)
+		expiry = frappe.db.get_value("Leave Ledger Entry", expiry_filters, ["name", "leaves"], as_dict=True)
+		self.assertEqual(expiry.leaves, -5)
+		self.assertEqual(frappe.db.get_value("Leave Allocation", leave_allocation.name, "expired"), 1)
+
+		# allocation expires again once the expiry is cancelled
+		frappe.get_doc("Leave Ledger Entry", expiry.name).cancel()
+		self.assertEqual(frappe.db.get_value("Leave Allocation", leave_allocation.name, "expired"), 0)
+
+		process_expired_allocation()
+		self.assertEqual(frappe.db.count("Leave Ledger Entry", expiry_filters), 1)
+		self.assertEqual(frappe.db.get_value("Leave Allocation", leave_allocation.name, "expired"), 1)
+
 	def test_creation_of_leave_ledger_entry_on_submit(self):
 		leave_allocation = create_leave_allocation(
 			employee=self.employee.name, employee_name=self.employee.employee_name
@@ -20,9 +20,12 @@ from frappe.utils import (
 )
 
 from erpnext.buying.doctype.supplier_scorecard.supplier_scorecard import daterange
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
 
 import hrms
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+	get_leave_balance_snapshots,
+	get_remaining_leaves_from_snapshot,
+)
 from hrms.hr.doctype.leave_block_list.leave_block_list import get_applicable_block_dates
 from hrms.hr.doctype.leave_ledger_entry.leave_ledger_entry import create_leave_ledger_entry
 from hrms.hr.utils import (
@@ -34,6 +37,7 @@ from hrms.hr.utils import (
 )
 from hrms.mixins.pwa_notifications import PWANotificationsMixin
 from hrms.utils import get_employee_email
+from hrms.utils.holiday_list import get_holiday_count_between, get_holiday_list_for_employee
 
 
 class LeaveDayBlockedError(frappe.ValidationError):
@@ -814,6 +818,38 @@ def get_allocation_expiry_for_cf_leaves(
 	return expiry[0][0] if expiry else ""
 
 
+def get_allocation_expiry_for_cf_leaves_for_employees(
+	allocations: dict[tuple[str, str], dict], to_date: datetime.date
+) -> dict[tuple[str, str], datetime.date]:
+	"""Returns expiry of carry forward allocation in leave ledger entries between the from date
+	of each allocation and the given date, by (employee, leave type)"""
+	if not allocations:
+		return {}
+
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	expiries = (
+		frappe.qb.from_(Ledger)
+		.select(Ledger.employee, Ledger.leave_type, Ledger.to_date)
+		.where(
+			(Ledger.employee.isin(list({employee for employee, leave_type in allocations})))
+			& (Ledger.leave_type.isin(list({leave_type for employee, leave_type in allocations})))
+			& (Ledger.is_carry_forward == 1)
+			& (Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.to_date.between(min(getdate(d.from_date) for d in allocations.values()), to_date))
+			& (Ledger.docstatus == 1)
+		)
+		.orderby(Ledger.to_date)
+	).run(as_dict=True)
+
+	cf_expiry = {}
+	for d in expiries:
+		allocation = allocations.get((d.employee, d.leave_type))
+		if allocation and getdate(d.to_date) >= getdate(allocation.from_date):
+			cf_expiry.setdefault((d.employee, d.leave_type), d.to_date)
+
+	return cf_expiry
+
+
 @frappe.whitelist()
 def get_number_of_leave_days(
 	employee: str,
@@ -826,16 +862,7 @@ def get_number_of_leave_days(
 ) -> float:
 	"""Returns number of leave days between 2 dates after considering half day and holidays
 	(Based on the include_holiday setting in Leave Type)"""
-	number_of_days = 0
-	if cint(half_day) == 1:
-		if getdate(from_date) == getdate(to_date):
-			number_of_days = 0.5
-		elif half_day_date and getdate(from_date) <= getdate(half_day_date) <= getdate(to_date):
-			number_of_days = date_diff(to_date, from_date) + 0.5
-		else:
-			number_of_days = date_diff(to_date, from_date) + 1
-	else:
-		number_of_days = date_diff(to_date, from_date) + 1
+	number_of_days = get_number_of_days(from_date, to_date, half_day, half_day_date)
 
 	if not frappe.db.get_value("Leave Type", leave_type, "include_holiday"):
 		number_of_days = flt(number_of_days) - flt(
@@ -844,24 +871,51 @@ def get_number_of_leave_days(
 	return number_of_days
 
 
+def get_number_of_days(
+	from_date: datetime.date,
+	to_date: datetime.date,
+	half_day: int | str | None = None,
+	half_day_date: datetime.date | str | None = None,
+) -> float:
+	"""Returns number of days between 2 dates after considering half day"""
+	if cint(half_day) == 1:
+		if getdate(from_date) == getdate(to_date):
+			return 0.5
+		elif half_day_date and getdate(from_date) <= getdate(half_day_date) <= getdate(to_date):
+			return date_diff(to_date, from_date) + 0.5
+
+	return date_diff(to_date, from_date) + 1
+
+
 @frappe.whitelist()
 def get_leave_details(employee, date, for_salary_slip=False):
 	allocation_records = get_leave_allocation_records(employee, date)
+	snapshots = get_leave_balance_snapshots(employee, date)
 	leave_allocation = {}
 	precision = cint(frappe.db.get_single_value("System Settings", "float_precision", cache=True))
 
 	for d in allocation_records:
 		allocation = allocation_records.get(d, frappe._dict())
 		to_date = date if for_salary_slip else allocation.to_date
-		remaining_leaves = get_leave_balance_on(
-			employee,
-			d,
-			date,
-			to_date=to_date,
-			consider_all_leaves_in_the_allocation_period=False if for_salary_slip else True,
+		consider_all_leaves_in_the_allocation_period = False if for_salary_slip else True
+
+		snapshot = snapshots.get(d)
+		remaining = snapshot and get_remaining_leaves_from_snapshot(
+			snapshot, date, to_date, consider_all_leaves_in_the_allocation_period
 		)
+		if remaining:
+			remaining_leaves = remaining.leave_balance
+			leaves_taken = flt(snapshot.leaves_taken) * -1
+		else:
+			remaining_leaves = get_leave_balance_on(
+				employee,
+				d,
+				date,
+				to_date=to_date,
+				consider_all_leaves_in_the_allocation_period=consider_all_leaves_in_the_allocation_period,
+			)
+			leaves_taken = get_leaves_for_period(employee, d, allocation.from_date, to_date) * -1
 
-		leaves_taken = get_leaves_for_period(employee, d, allocation.from_date, to_date) * -1
 		leaves_pending = get_leaves_pending_approval_for_period(employee, d, allocation.from_date, to_date)
 		expired_leaves = allocation.total_leaves_allocated - (remaining_leaves + leaves_taken)
 
@@ -909,15 +963,22 @@ def get_leave_balance_on(
 	if not to_date:
 		to_date = nowdate()
 
-	allocation_records = get_leave_allocation_records(employee, date, leave_type)
-	allocation = allocation_records.get(leave_type, frappe._dict())
+	remaining_leaves = None
+	if snapshot := get_leave_balance_snapshots(employee, date, leave_type).get(leave_type):
+		remaining_leaves = get_remaining_leaves_from_snapshot(
+			snapshot, date, to_date, cint(consider_all_leaves_in_the_allocation_period)
+		)
+
+	if remaining_leaves is None:
+		allocation_records = get_leave_allocation_records(employee, date, leave_type)
+		allocation = allocation_records.get(leave_type, frappe._dict())
 
-	end_date = allocation.to_date if cint(consider_all_leaves_in_the_allocation_period) else date
-	cf_expiry = get_allocation_expiry_for_cf_leaves(employee, leave_type, to_date, allocation.from_date)
+		end_date = allocation.to_date if cint(consider_all_leaves_in_the_allocation_period) else date
+		cf_expiry = get_allocation_expiry_for_cf_leaves(employee, leave_type, to_date, allocation.from_date)
 
-	leaves_taken = get_leaves_for_period(employee, leave_type, allocation.from_date, end_date)
+		leaves_taken = get_leaves_for_period(employee, leave_type, allocation.from_date, end_date)
 
-	remaining_leaves = get_remaining_leaves(allocation, leaves_taken, date, cf_expiry)
+		remaining_leaves = get_remaining_leaves(allocation, leaves_taken, date, cf_expiry)
 
 	if for_consumption:
 		return remaining_leaves
@@ -925,8 +986,69 @@ def get_leave_balance_on(
 		return remaining_leaves.get("leave_balance")
 
 
+def get_leave_balances_on(
+	employee_leave_types: list[tuple[str, str]], date: datetime.date
+) -> dict[tuple[str, str], float]:
+	"""Returns leave balance till date of each (employee, leave type) pair,
+	as returned by `get_leave_balance_on` for the date, from a handful of queries for all the pairs"""
+	employee_leave_types = [tuple(d) for d in employee_leave_types]
+	if not employee_leave_types:
+		return {}
+
+	date = getdate(date)
+	allocations = get_leave_allocation_records_for_employees(
+		list({employee for employee, leave_type in employee_leave_types}),
+		date,
+		list({leave_type for employee, leave_type in employee_leave_types}),
+	)
+	cf_expiry = get_allocation_expiry_for_cf_leaves_for_employees(allocations, getdate(nowdate()))
+
+	periods = []
+	for key, allocation in allocations.items():
+		periods.append((key, allocation.from_date, date))
+		if cf_expiry.get(key) and allocation.unused_leaves:
+			periods.append((key, allocation.from_date, cf_expiry[key]))
+			periods.append((key, add_days(cf_expiry[key], 1), allocation.to_date))
+
+	leaves = get_leaves_for_employee_periods(periods)
+
+	balances = {}
+	for key in employee_leave_types:
+		allocation = allocations.get(key)
+		if not allocation:
+			balances[key] = 0.0
+			continue
+
+		new_and_cf_leaves_taken = None
+		if cf_expiry.get(key) and allocation.unused_leaves:
+			new_and_cf_leaves_taken = (
+				leaves[(key, getdate(add_days(cf_expiry[key], 1)), getdate(allocation.to_date))],
+				leaves[(key, getdate(allocation.from_date), getdate(cf_expiry[key]))],
+			)
+
+		balances[key] = get_remaining_leaves(
+			allocation,
+			leaves[(key, getdate(allocation.from_date), date)],
+			date,
+			cf_expiry.get(key, ""),
+			new_and_cf_leaves_taken,
+		).leave_balance
+
+	return balances
+
+
 def get_leave_allocation_records(employee, date, leave_type=None):
 	"""Returns the total allocated leaves and carry forwarded leaves based on ledger entries"""
+	allocations = get_leave_allocation_records_for_employees(
+		[employee], date, [leave_type] if leave_type else None
+	)
+	return frappe._dict({d.leave_type: d for d in allocations.values()})
+
+
+def get_leave_allocation_records_for_employees(
+	employees: list[str], date: datetime.date, leave_types: list[str] | None = None
+) -> dict[tuple[str, str], dict]:
+	"""Returns the allocation records of the employees on the given date by (employee, leave type)"""
 	Ledger = frappe.qb.DocType("Leave Ledger Entry")
 	LeaveAllocation = frappe.qb.DocType("Leave Allocation")
 
@@ -952,7 +1074,7 @@ def get_leave_allocation_records(employee, date, leave_type=None):
 			(Ledger.from_date <= date)
 			& (Ledger.docstatus == 1)
 			& (Ledger.transaction_type == "Leave Allocation")
-			& (Ledger.employee == employee)
+			& (Ledger.employee.isin(employees))
 			& (Ledger.is_expired == 0)
 			& (Ledger.is_lwp == 0)
 			& (
@@ -971,16 +1093,16 @@ def get_leave_allocation_records(employee, date, leave_type=None):
 		)
 	)
 
-	if leave_type:
-		query = query.where(Ledger.leave_type == leave_type)
+	if leave_types:
+		query = query.where(Ledger.leave_type.isin(leave_types))
 	query = query.groupby(Ledger.employee, Ledger.leave_type)
 
 	allocation_details = query.run(as_dict=True)
 
-	allocated_leaves = frappe._dict()
+	allocated_leaves = {}
 	for d in allocation_details:
 		allocated_leaves.setdefault(
-			d.leave_type,
+			(d.employee, d.leave_type),
 			frappe._dict(
 				{
 					"from_date": d.from_date,
@@ -1013,11 +1135,16 @@ def get_leaves_pending_approval_for_period(
 
 
 def get_remaining_leaves(
-	allocation: dict, leaves_taken: float, date: str, cf_expiry: str
+	allocation: dict,
+	leaves_taken: float,
+	date: str,
+	cf_expiry: str,
+	new_and_cf_leaves_taken: tuple[float, float] | None = None,
 ) -> dict[str, float]:
 	"""Returns a dict of leave_balance and leave_balance_for_consumption
 	leave_balance returns the available leave balance
 	leave_balance_for_consumption returns the minimum leaves remaining after comparing with remaining days for allocation expiry
+	new_and_cf_leaves_taken are the leaves taken after and till the cf expiry, if already known
 	"""
 
 	def _get_remaining_leaves(remaining_leaves, end_date):
@@ -1030,7 +1157,10 @@ def get_remaining_leaves(
 
 	if cf_expiry and allocation.unused_leaves:
 		# allocation contains both carry forwarded and new leaves
-		new_leaves_taken, cf_leaves_taken = get_new_and_cf_leaves_taken(allocation, cf_expiry)
+		if new_and_cf_leaves_taken:
+			new_leaves_taken, cf_leaves_taken = adjust_cf_leaves_taken(allocation, *new_and_cf_leaves_taken)
+		else:
+			new_leaves_taken, cf_leaves_taken = get_new_and_cf_leaves_taken(allocation, cf_expiry)
 
 		if getdate(date) > getdate(cf_expiry):
 			# carry forwarded leaves have expired
@@ -1064,6 +1194,13 @@ def get_new_and_cf_leaves_taken(allocation: dict, cf_expiry: str) -> tuple[float
 		allocation.employee, allocation.leave_type, add_days(cf_expiry, 1), allocation.to_date
 	)
 
+	return adjust_cf_leaves_taken(allocation, new_leaves_taken, cf_leaves_taken)
+
+
+def adjust_cf_leaves_taken(
+	allocation: dict, new_leaves_taken: float, cf_leaves_taken: float
+) -> tuple[float, float]:
+	"""Counts carry forwarded leaves taken in excess of the unused leaves as new leaves taken"""
 	# using abs because leaves taken is a -ve number in the ledger
 	if abs(cf_leaves_taken) > allocation.unused_leaves:
 		# adjust the excess leaves in new_leaves_taken
@@ -1080,16 +1217,37 @@ def get_leaves_for_period(
 	to_date: datetime.date,
 	skip_expired_leaves: bool = True,
 ) -> float:
-	leave_entries = get_leave_entries(employee, leave_type, from_date, to_date)
-	leave_days = 0
+	return get_leaves_for_periods([(employee, leave_type)], from_date, to_date, skip_expired_leaves)[
+		(employee, leave_type)
+	]
+
+
+def get_leaves_for_periods(
+	employee_leave_types: list[tuple[str, str]],
+	from_date: datetime.date,
+	to_date: datetime.date,
+	skip_expired_leaves: bool = True,
+) -> dict[tuple[str, str], float]:
+	"""Returns leaves taken between 2 dates for each (employee, leave type) pair.
+
+	Ledger entries of all the pairs are fetched with the half day dates of their leave applications
+	in a single query, and leave days are counted against holiday calendars loaded once for the period."""
+	leave_days = {tuple(d): 0 for d in employee_leave_types}
+	if not (leave_days and from_date and to_date):
+		return leave_days
+
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	leave_entries = get_leave_entries_for_employees(list(leave_days), from_date, to_date)
+	leave_day_counter = LeaveDayCounter(
+		[d for d in leave_entries if d.transaction_type == "Leave Application"], from_date, to_date
+	)
 
 	for leave_entry in leave_entries:
-		inclusive_period = leave_entry.from_date >= getdate(from_date) and leave_entry.to_date <= getdate(
-			to_date
-		)
+		inclusive_period = leave_entry.from_date >= from_date and leave_entry.to_date <= to_date
+		key = (leave_entry.employee, leave_entry.leave_type)
 
 		if inclusive_period and leave_entry.transaction_type == "Leave Encashment":
-			leave_days += leave_entry.leaves
+			leave_days[key] += leave_entry.leaves
 
 		elif (
 			inclusive_period
@@ -1097,58 +1255,132 @@ def get_leaves_for_period(
 			and leave_entry.is_expired
 			and not skip_expired_leaves
 		):
-			leave_days += leave_entry.leaves
+			leave_days[key] += leave_entry.leaves
 
 		elif leave_entry.transaction_type == "Leave Application":
-			if leave_entry.from_date < getdate(from_date):
-				leave_entry.from_date = from_date
-			if leave_entry.to_date > getdate(to_date):
-				leave_entry.to_date = to_date
-
-			half_day = 0
-			half_day_date = None
-			# fetch half day date for leaves with half days
-			if leave_entry.leaves % 1:
-				half_day = 1
-				half_day_date = frappe.db.get_value(
-					"Leave Application", leave_entry.transaction_name, "half_day_date"
-				)
+			leave_days[key] += leave_day_counter.get_leave_days(leave_entry) * -1
+
+	return leave_days
 
-			leave_days += (
-				get_number_of_leave_days(
-					employee,
-					leave_type,
-					leave_entry.from_date,
-					leave_entry.to_date,
-					half_day,
-					half_day_date,
-					holiday_list=leave_entry.holiday_list,
+
+def get_leaves_for_employee_periods(
+	periods: list[tuple], skip_expired_leaves: bool = True
+) -> dict[tuple, float]:
+	"""Returns leaves taken for each ((employee, leave type), from date, to date),
+	counting leaves of all the pairs with the same period together"""
+	pairs_by_period = {}
+	for key, from_date, to_date in periods:
+		pairs_by_period.setdefault((getdate(from_date), getdate(to_date)), set()).add(tuple(key))
+
+	leaves = {}
+	for (from_date, to_date), keys in pairs_by_period.items():
+		for key, leave_days in get_leaves_for_periods(
+			list(keys), from_date, to_date, skip_expired_leaves
+		).items():
+			leaves[(key, from_date, to_date)] = leave_days
+
+	return leaves
+
+
+class LeaveDayCounter:
+	"""Counts leave days of leave application ledger entries clipped to a period,
+	with the leave types and holiday calendars the entries need loaded upfront"""
+
+	def __init__(self, leave_entries: list[dict], from_date: datetime.date, to_date: datetime.date):
+		from hrms.utils.holiday_list import get_holiday_calendars_between
+
+		self.from_date = from_date
+		self.to_date = to_date
+
+		self.include_holiday = {}
+		if leave_types := {d.leave_type for d in leave_entries}:
+			self.include_holiday = dict(
+				frappe.get_all(
+					"Leave Type",
+					filters={"name": ("in", list(leave_types))},
+					fields=["name", "include_holiday"],
+					as_list=True,
 				)
-				* -1
 			)
 
-	return leave_days
+		self.holiday_list_for_employee = {}
+		holiday_lists = set()
+		for d in leave_entries:
+			if self.include_holiday.get(d.leave_type):
+				continue
+
+			if not d.holiday_list and d.employee not in self.holiday_list_for_employee:
+				self.holiday_list_for_employee[d.employee] = get_holiday_list_for_employee(d.employee)
+			holiday_lists.add(d.holiday_list or self.holiday_list_for_employee[d.employee])
+
+		self.calendars = get_holiday_calendars_between(holiday_lists, from_date, to_date)
+
+	def get_leave_days(self, leave_entry: dict) -> float:
+		from_date = max(leave_entry.from_date, self.from_date)
+		to_date = min(leave_entry.to_date, self.to_date)
+
+		# fractional leaves are recorded for leaves with half days
+		half_day = 1 if leave_entry.leaves % 1 else 0
+		leave_days = get_number_of_days(from_date, to_date, half_day, leave_entry.half_day_date)
+
+		if not self.include_holiday.get(leave_entry.leave_type):
+			holiday_list = leave_entry.holiday_list or self.holiday_list_for_employee[leave_entry.employee]
+			leave_days = flt(leave_days) - sum(
+				self.calendars[(holiday_list, year)].count(from_date, to_date)
+				for year in range(from_date.year, to_date.year + 1)
+			)
+
+		return leave_days
 
 
 def get_leave_entries(employee, leave_type, from_date, to_date):
 	"""Returns leave entries between from_date and to_date."""
-	return frappe.db.sql(
-		"""
-		SELECT
-			employee, leave_type, from_date, to_date, leaves, transaction_name, transaction_type, holiday_list,
-			is_carry_forward, is_expired
-		FROM `tabLeave Ledger Entry`
-		WHERE employee=%(employee)s AND leave_type=%(leave_type)s
-			AND docstatus=1
-			AND (leaves<0
-				OR is_expired=1)
-			AND (from_date between %(from_date)s AND %(to_date)s
-				OR to_date between %(from_date)s AND %(to_date)s
-				OR (from_date < %(from_date)s AND to_date > %(to_date)s))
-	""",
-		{"from_date": from_date, "to_date": to_date, "employee": employee, "leave_type": leave_type},
-		as_dict=1,
-	)
+	return get_leave_entries_for_employees([(employee, leave_type)], from_date, to_date)
+
+
+def get_leave_entries_for_employees(
+	employee_leave_types: list[tuple[str, str]], from_date: datetime.date, to_date: datetime.date
+) -> list[dict]:
+	"""Returns leave entries between from_date and to_date of the (employee, leave type) pairs,
+	with the half day date of leave applications"""
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	LeaveApplication = frappe.qb.DocType("Leave Application")
+
+	leave_entries = (
+		frappe.qb.from_(Ledger)
+		.left_join(LeaveApplication)
+		.on(
+			(Ledger.transaction_type == "Leave Application")
+			& (Ledger.transaction_name == LeaveApplication.name)
+		)
+		.select(
+			Ledger.employee,
+			Ledger.leave_type,
+			Ledger.from_date,
+			Ledger.to_date,
+			Ledger.leaves,
+			Ledger.transaction_name,
+			Ledger.transaction_type,
+			Ledger.holiday_list,
+			Ledger.is_carry_forward,
+			Ledger.is_expired,
+			LeaveApplication.half_day_date,
+		)
+		.where(
+			(Ledger.employee.isin(list({employee for employee, leave_type in employee_leave_types})))
+			& (Ledger.leave_type.isin(list({leave_type for employee, leave_type in employee_leave_types})))
+			& (Ledger.docstatus == 1)
+			& ((Ledger.leaves < 0) | (Ledger.is_expired == 1))
+			& (
+				(Ledger.from_date.between(from_date, to_date))
+				| (Ledger.to_date.between(from_date, to_date))
+				| ((Ledger.from_date < from_date) & (Ledger.to_date > to_date))
+			)
+		)
+	).run(as_dict=True)
+
+	employee_leave_types = set(employee_leave_types)
+	return [d for d in leave_entries if (d.employee, d.leave_type) in employee_leave_types]
 
 
 @frappe.whitelist()
@@ -1157,14 +1389,7 @@ def get_holidays(employee, from_date, to_date, holiday_list=None):
 	if not holiday_list:
 		holiday_list = get_holiday_list_for_employee(employee)
 
-	holidays = frappe.db.sql(
-		"""select count(distinct holiday_date) from `tabHoliday` h1, `tabHoliday List` h2
-		where h1.parent = h2.name and h1.holiday_date between %s and %s
-		and h2.name = %s""",
-		(from_date, to_date, holiday_list),
-	)[0][0]
-
-	return holidays
+	return get_holiday_count_between(holiday_list, from_date, to_date)
 
 
 def is_lwp(leave_type):
@@ -39,7 +39,7 @@ from hrms.payroll.doctype.salary_slip.test_salary_slip import (
 	make_holiday_list,
 	make_leave_application,
 )
-from hrms.tests.test_utils import get_first_sunday
+from hrms.tests.test_utils import add_date_to_holiday_list, get_first_sunday
 
 test_dependencies = ["Leave Type", "Leave Allocation", "Leave Block List", "Employee"]
 
@@ -127,6 +127,61 @@ class TestLeaveApplication(IntegrationTestCase):
 		application.to_date = "2013-01-05"
 		return application
 
+	def test_holiday_calendar(self):
+		from hrms.utils.holiday_list import (
+			get_holiday_count_between,
+			get_holiday_dates_between,
+			is_holiday,
+		)
+
+		# spans two calendar years, with weekly offs on Sundays
+		holiday_list = make_holiday_list(
+			"_Test Holiday Calendar", from_date="2023-12-01", to_date="2024-01-31"
+		)
+		add_date_to_holiday_list("2024-01-01", holiday_list)
+		sundays = [getdate(d) for d in ("2023-12-24", "2023-12-31", "2024-01-07")]
+
+		self.assertTrue(is_holiday(holiday_list, "2024-01-01"))
+		self.assertTrue(is_holiday(holiday_list, "2024-01-01", skip_weekly_offs=True))
+		self.assertTrue(is_holiday(holiday_list, "2023-12-31"))
+		self.assertFalse(is_holiday(holiday_list, "2023-12-31", skip_weekly_offs=True))
+		self.assertFalse(is_holiday(holiday_list, "2024-01-02"))
+
+		self.assertEqual(
+			get_holiday_dates_between(holiday_list, "2023-12-20", "2024-01-10"),
+			[sundays[0], sundays[1], getdate("2024-01-01"), sundays[2]],
+		)
+		self.assertEqual(
+			get_holiday_dates_between(holiday_list, "2023-12-20", "2024-01-10", skip_weekly_offs=True),
+			[getdate("2024-01-01")],
+		)
+		self.assertEqual(get_holiday_count_between(holiday_list, "2023-12-20", "2024-01-10"), 4)
+
+		# saving the holiday list invalidates its calendar
+		add_date_to_holiday_list("2024-01-02", holiday_list)
+		self.assertTrue(is_holiday(holiday_list, "2024-01-02"))
+		self.assertEqual(get_holiday_count_between(holiday_list, "2023-12-20", "2024-01-10"), 5)
+
+	@set_holiday_list("Salary Slip Test Holiday List", "_Test Company")
+	def test_resolve_holiday_lists(self):
+		from hrms.utils.holiday_list import get_holiday_list_for_employee, resolve_holiday_lists
+
+		holiday_list = make_holiday_list("_Test Employee Holiday List")
+		employee = make_employee("test_emp_holiday_list@example.com", company="_Test Company")
+		frappe.db.set_value("Employee", employee, "holiday_list", None)
+		other_employee = make_employee("test_emp_own_holiday_list@example.com", company="_Test Company")
+		frappe.get_doc("Employee", other_employee).update({"holiday_list": holiday_list}).save()
+
+		self.assertEqual(
+			resolve_holiday_lists([employee, other_employee]),
+			{employee: "Salary Slip Test Holiday List", other_employee: holiday_list},
+		)
+		self.assertEqual(get_holiday_list_for_employee(employee), "Salary Slip Test Holiday List")
+
+		# changes to the employee are picked up right away, even if made without saving the employee
+		frappe.db.set_value("Employee", employee, "holiday_list", holiday_list)
+		self.assertEqual(get_holiday_list_for_employee(employee), holiday_list)
+
 	@set_holiday_list("Salary Slip Test Holiday List", "_Test Company")
 	def test_validate_application_across_allocations(self):
 		# Test validation for application dates when negative balance is disabled
@@ -1205,6 +1260,116 @@ class TestLeaveApplication(IntegrationTestCase):
 		# filters out old CF leaves (15 i.e total 45)
 		self.assertEqual(details[leave_type.name]["total_leaves_allocated"], 30.0)
 
+	@set_holiday_list("Salary Slip Test Holiday List", "_Test Company")
+	def test_get_leaves_for_periods(self):
+		from hrms.hr.doctype.leave_application.leave_application import (
+			get_leaves_for_period,
+			get_leaves_for_periods,
+		)
+
+		employee = get_employee().name
+		leave_type = create_leave_type(leave_type_name="_Test Leave Type w/o Holidays")
+		leave_type.include_holiday = 0
+		leave_type.save()
+
+		year_start, year_end = get_year_start(getdate()), get_year_ending(getdate())
+		for d in (leave_type.name, "_Test Leave Type"):
+			make_allocation_record(employee=employee, leave_type=d, from_date=year_start, to_date=year_end)
+
+		first_sunday = get_first_sunday(self.holiday_list, for_date=add_months(year_start, 6))
+		# saturday to monday with a half day on monday, excluding the weekly off
+		make_leave_application(
+			employee,
+			add_days(first_sunday, -1),
+			add_days(first_sunday, 1),
+			leave_type.name,
+			half_day=1,
+			half_day_date=add_days(first_sunday, 1),
+		)
+		# next saturday and sunday, including the weekly off
+		make_leave_application(
+			employee, add_days(first_sunday, 6), add_days(first_sunday, 7), "_Test Leave Type"
+		)
+
+		# the application across the period start is clipped to sunday and the half day on monday
+		from_date, to_date = first_sunday, add_days(first_sunday, 30)
+		leaves = get_leaves_for_periods(
+			[(employee, leave_type.name), (employee, "_Test Leave Type")], from_date, to_date
+		)
+		self.assertEqual(leaves, {(employee, leave_type.name): -0.5, (employee, "_Test Leave Type"): -2})
+
+		for d in (leave_type.name, "_Test Leave Type"):
+			self.assertEqual(get_leaves_for_period(employee, d, from_date, to_date), leaves[(employee, d)])
+
+	@set_holiday_list("Holiday List w/o Weekly Offs", "_Test Company")
+	def test_leave_balance_snapshot(self):
+		from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+			get_leave_balance_snapshots,
+			rebuild_leave_balance_snapshots,
+			verify_leave_balance_snapshots,
+		)
+
+		employee = get_employee()
+		leave_type = create_leave_type(
+			leave_type_name="_Test_CF_leave_expiry",
+			is_carry_forward=1,
+			expire_carry_forwarded_leaves_after_days=90,
+		)
+
+		leave_alloc = create_carry_forwarded_allocation(employee, leave_type)
+		cf_expiry = frappe.db.get_value(
+			"Leave Ledger Entry", {"transaction_name": leave_alloc.name, "is_carry_forward": 1}, "to_date"
+		)
+		application = make_leave_application(
+			employee.name, cf_expiry, add_days(cf_expiry, 3), leave_type.name
+		)
+
+		# snapshot is updated with the ledger entries of the application
+		snapshot = get_leave_balance_snapshots(employee.name, add_days(cf_expiry, 4), leave_type.name)
+		self.assertEqual(snapshot[leave_type.name].leave_allocation, leave_alloc.name)
+		self.assertEqual(snapshot[leave_type.name].total_leaves_allocated, 30.0)
+		self.assertEqual(snapshot[leave_type.name].leaves_taken, -4.0)
+		self.assertEqual(verify_leave_balance_snapshots([employee.name]), [])
+
+		# balances read from the snapshot match the ones computed from the ledger
+		def get_balances():
+			return [
+				get_leave_balance_on(
+					employee.name,
+					leave_type.name,
+					date,
+					to_date=leave_alloc.to_date,
+					consider_all_leaves_in_the_allocation_period=consider_all,
+					for_consumption=True,
+				)
+				for date in (add_days(cf_expiry, -1), add_days(cf_expiry, 4))
+				for consider_all in (False, True)
+			]
+
+		balances = get_balances()
+		frappe.db.delete("Leave Balance Snapshot")
+		self.assertEqual(get_balances(), balances)
+
+		rebuild_leave_balance_snapshots([employee.name])
+		self.assertEqual(get_balances(), balances)
+
+		# snapshots are ignored once the ledger entries change without rebuilding them
+		ledger_entry = frappe.get_last_doc("Leave Ledger Entry", {"transaction_name": application.name})
+		frappe.db.set_value("Leave Ledger Entry", ledger_entry.name, "leaves", ledger_entry.leaves - 1)
+		snapshot = get_leave_balance_snapshots(employee.name, add_days(cf_expiry, 4), leave_type.name)
+		self.assertEqual(snapshot, {})
+		frappe.db.set_value("Leave Ledger Entry", ledger_entry.name, "leaves", ledger_entry.leaves)
+		rebuild_leave_balance_snapshots([employee.name])
+		leave_details = get_leave_details(employee.name, add_days(cf_expiry, 4))
+		self.assertEqual(leave_details["leave_allocation"][leave_type.name]["leaves_taken"], 4.0)
+		self.assertEqual(leave_details["leave_allocation"][leave_type.name]["remaining_leaves"], 12.0)
+
+		# cancelling the application deletes its ledger entries and updates the snapshot
+		application.cancel()
+		snapshot = get_leave_balance_snapshots(employee.name, add_days(cf_expiry, 4), leave_type.name)
+		self.assertEqual(snapshot[leave_type.name].leaves_taken, 0.0)
+		self.assertEqual(verify_leave_balance_snapshots([employee.name]), [])
+
 
 def create_carry_forwarded_allocation(employee, leave_type, date=None):
 	date = date or nowdate()
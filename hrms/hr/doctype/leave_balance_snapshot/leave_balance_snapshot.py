@@ -0,0 +1,423 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Count, Max, Min
+from frappe.utils import add_days, cint, flt, get_datetime, getdate, now_datetime
+
+SNAPSHOT_DATE_FIELDS = ("from_date", "to_date", "cf_expiry", "valid_from", "valid_till", "last_leave_date")
+SNAPSHOT_BALANCE_FIELDS = (
+	"new_leaves_allocated",
+	"unused_leaves",
+	"total_leaves_allocated",
+	"leaves_taken",
+	"new_leaves_taken",
+	"cf_leaves_taken",
+)
+# count and last modification of the ledger entries of the employee and leave type the snapshot was built from
+SNAPSHOT_LEDGER_FIELDS = ("ledger_entries", "ledger_modified")
+SNAPSHOT_FIELDS = (
+	"employee",
+	"leave_type",
+	"leave_allocation",
+	*SNAPSHOT_DATE_FIELDS,
+	*SNAPSHOT_BALANCE_FIELDS,
+	*SNAPSHOT_LEDGER_FIELDS,
+)
+
+
+class LeaveBalanceSnapshot(Document):
+	"""Balance of a leave allocation materialised from the Leave Ledger.
+
+	Holds the leaves allocated once all the ledger entries of the allocation have taken effect
+	(between `valid_from` and `valid_till`) and the leaves taken over the whole allocation period,
+	so that the leave balance on such dates can be read from a single row instead of the ledger.
+	Snapshots are rebuilt as ledger entries of the employee and leave type are submitted,
+	cancelled or deleted, and are ignored if the ledger entries changed otherwise since.
+	"""
+
+	pass
+
+
+def update_leave_balance_snapshots(employee: str, leave_type: str, from_date=None, to_date=None) -> None:
+	"""Rebuilds snapshots of the employee's allocations of the leave type overlapping the given dates,
+	or of all the allocations if no dates are given"""
+	Snapshot = frappe.qb.DocType("Leave Balance Snapshot")
+	query = (
+		frappe.qb.from_(Snapshot)
+		.delete()
+		.where((Snapshot.employee == employee) & (Snapshot.leave_type == leave_type))
+	)
+	if from_date and to_date:
+		query = query.where((Snapshot.to_date >= from_date) & (Snapshot.from_date <= to_date))
+	query.run()
+
+	snapshots = get_leave_balance_snapshot_values(employee, leave_type, from_date, to_date)
+	if not snapshots:
+		return
+
+	ledger_state = get_ledger_states(employee, leave_type).get(leave_type, frappe._dict())
+	for snapshot in snapshots:
+		snapshot.update({field: ledger_state.get(field) for field in SNAPSHOT_LEDGER_FIELDS})
+
+	now, user = now_datetime(), frappe.session.user
+	values = [
+		(frappe.generate_hash(length=10), user, user, now, now, 0, *(d.get(f) for f in SNAPSHOT_FIELDS))
+		for d in snapshots
+	]
+
+	fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus"]
+	fields.extend(SNAPSHOT_FIELDS)
+	frappe.db.bulk_insert("Leave Balance Snapshot", fields, values)
+
+
+def get_leave_balance_snapshot_values(employee: str, leave_type: str, from_date=None, to_date=None) -> list:
+	"""Computes snapshots of the employee's allocations of the leave type from the Leave Ledger"""
+	from hrms.hr.doctype.leave_application.leave_application import (
+		get_allocation_expiry_for_cf_leaves,
+		get_leave_allocation_records,
+		get_leave_entries,
+		get_leaves_for_period,
+	)
+
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	query = (
+		frappe.qb.from_(Ledger)
+		.select(
+			Ledger.transaction_name.as_("leave_allocation"),
+			Min(Ledger.from_date).as_("from_date"),
+			Max(Ledger.to_date).as_("to_date"),
+			Max(Ledger.from_date).as_("valid_from"),
+			# carry forwarded leaves stop counting towards the allocation once they expire
+			Min(Case().when(Ledger.is_carry_forward == 0, Ledger.to_date)).as_("valid_till"),
+		)
+		.where(
+			(Ledger.employee == employee)
+			& (Ledger.leave_type == leave_type)
+			& (Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.docstatus == 1)
+			& (Ledger.is_expired == 0)
+			& (Ledger.is_lwp == 0)
+		)
+		.groupby(Ledger.transaction_name)
+	)
+	if from_date and to_date:
+		query = query.having((Max(Ledger.to_date) >= from_date) & (Min(Ledger.from_date) <= to_date))
+
+	snapshots = []
+	for allocation in query.run(as_dict=True):
+		if not allocation.valid_till or getdate(allocation.valid_from) > getdate(allocation.valid_till):
+			continue
+
+		record = get_leave_allocation_records(employee, allocation.valid_from, leave_type).get(leave_type)
+		if not (
+			record
+			and getdate(record.from_date) == getdate(allocation.from_date)
+			and getdate(record.to_date) == getdate(allocation.to_date)
+		):
+			# overlapping allocations, leave it to the ledger
+			continue
+
+		cf_expiry = get_allocation_expiry_for_cf_leaves(
+			employee, leave_type, record.to_date, record.from_date
+		)
+		new_leaves_taken = cf_leaves_taken = 0
+		if cf_expiry:
+			cf_leaves_taken = get_leaves_for_period(employee, leave_type, record.from_date, cf_expiry)
+			new_leaves_taken = get_leaves_for_period(
+				employee, leave_type, add_days(cf_expiry, 1), record.to_date
+			)
+
+		leave_entries = get_leave_entries(employee, leave_type, record.from_date, record.to_date)
+		snapshots.append(
+			frappe._dict(
+				employee=employee,
+				leave_type=leave_type,
+				leave_allocation=allocation.leave_allocation,
+				from_date=record.from_date,
+				to_date=record.to_date,
+				cf_expiry=cf_expiry or None,
+				valid_from=allocation.valid_from,
+				valid_till=allocation.valid_till,
+				last_leave_date=max(
+					(getdate(entry.to_date) for entry in leave_entries if not entry.is_expired), default=None
+				),
+				new_leaves_allocated=flt(record.new_leaves_allocated),
+				unused_leaves=flt(record.unused_leaves),
+				total_leaves_allocated=flt(record.total_leaves_allocated),
+				leaves_taken=get_leaves_for_period(employee, leave_type, record.from_date, record.to_date),
+				new_leaves_taken=new_leaves_taken,
+				cf_leaves_taken=cf_leaves_taken,
+			)
+		)
+
+	return snapshots
+
+
+def get_leave_balance_snapshots(employee: str, date, leave_type: str | None = None) -> dict:
+	"""Returns snapshots of the employee's allocations valid on the given date by leave type"""
+	Snapshot = frappe.qb.DocType("Leave Balance Snapshot")
+	query = (
+		frappe.qb.from_(Snapshot)
+		.select(*SNAPSHOT_FIELDS)
+		.where(
+			(Snapshot.employee == employee) & (Snapshot.valid_from <= date) & (Snapshot.valid_till >= date)
+		)
+	)
+	if leave_type:
+		query = query.where(Snapshot.leave_type == leave_type)
+
+	snapshots = query.run(as_dict=True)
+	if not snapshots:
+		return {}
+
+	ledger_states = get_ledger_states(employee, leave_type)
+	return {
+		row.leave_type: row
+		for row in snapshots
+		if is_snapshot_current(row, ledger_states.get(row.leave_type))
+	}
+
+
+def get_ledger_states(employee: str, leave_type: str | None = None) -> dict:
+	"""Returns the count and last modification of the employee's ledger entries by leave type"""
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	query = (
+		frappe.qb.from_(Ledger)
+		.select(
+			Ledger.leave_type,
+			Count(Ledger.name).as_("ledger_entries"),
+			Max(Ledger.modified).as_("ledger_modified"),
+		)
+		.where(Ledger.employee == employee)
+		.groupby(Ledger.leave_type)
+	)
+	if leave_type:
+		query = query.where(Ledger.leave_type == leave_type)
+
+	return {row.leave_type: row for row in query.run(as_dict=True)}
+
+
+def is_snapshot_current(snapshot: dict, ledger_state: dict | None) -> bool:
+	"""Returns True if the ledger entries of the snapshot's employee and leave type
+	have not changed since it was built"""
+	return bool(
+		ledger_state
+		and snapshot.ledger_modified
+		and cint(snapshot.ledger_entries) == cint(ledger_state.ledger_entries)
+		and get_datetime(snapshot.ledger_modified) == get_datetime(ledger_state.ledger_modified)
+	)
+
+
+def get_remaining_leaves_from_snapshot(
+	snapshot: dict, date, to_date, consider_all_leaves_in_the_allocation_period: bool = False
+) -> dict | None:
+	"""Returns the remaining leaves as computed from the ledger by `get_leave_balance_on`,
+	or None if the snapshot can not answer for the given dates"""
+	from hrms.hr.doctype.leave_application.leave_application import get_remaining_leaves
+
+	date, to_date = getdate(date), getdate(to_date)
+	if to_date > getdate(snapshot.to_date):
+		# carry forward expiry of a later allocation may apply
+		return None
+
+	if (
+		not consider_all_leaves_in_the_allocation_period
+		and snapshot.last_leave_date
+		and getdate(snapshot.last_leave_date) > date
+	):
+		# leaves taken till the date differ from the leaves taken in the allocation period
+		return None
+
+	allocation = frappe._dict(
+		employee=snapshot.employee,
+		leave_type=snapshot.leave_type,
+		from_date=snapshot.from_date,
+		to_date=snapshot.to_date,
+		new_leaves_allocated=flt(snapshot.new_leaves_allocated),
+		unused_leaves=flt(snapshot.unused_leaves),
+		total_leaves_allocated=flt(snapshot.total_leaves_allocated),
+	)
+	cf_expiry = snapshot.cf_expiry if snapshot.cf_expiry and getdate(snapshot.cf_expiry) <= to_date else ""
+
+	return get_remaining_leaves(
+		allocation,
+		flt(snapshot.leaves_taken),
+		date,
+		cf_expiry,
+		new_and_cf_leaves_taken=(flt(snapshot.new_leaves_taken), flt(snapshot.cf_leaves_taken)),
+	)
+
+
+def get_employee_leave_types(employees: list | None = None, leave_type: str | None = None) -> list[tuple]:
+	"""Returns (employee, leave type) pairs having leave allocations in the ledger"""
+	return frappe.get_all(
+		"Leave Ledger Entry",
+		filters={
+			"transaction_type": "Leave Allocation",
+			"docstatus": 1,
+			**get_filters(employees, leave_type),
+		},
+		fields=["employee", "leave_type"],
+		group_by="employee, leave_type",
+		as_list=True,
+	)
+
+
+def delete_leave_balance_snapshots(employees: list | None = None, leave_type: str | None = None) -> None:
+	frappe.db.delete("Leave Balance Snapshot", get_filters(employees, leave_type))
+
+
+def rebuild_leave_balance_snapshots(employees: list | None = None, leave_type: str | None = None) -> int:
+	"""Rebuilds snapshots of the employees' allocations from the Leave Ledger,
+	for all the employees if none are given. Returns the number of snapshots built"""
+	delete_leave_balance_snapshots(employees, leave_type)
+
+	for employee, employee_leave_type in get_employee_leave_types(employees, leave_type):
+		update_leave_balance_snapshots(employee, employee_leave_type)
+
+	return frappe.db.count("Leave Balance Snapshot", get_filters(employees, leave_type))
+
+
+def verify_leave_balance_snapshots(employees: list | None = None, leave_type: str | None = None) -> list:
+	"""Returns snapshots that differ from the balances computed from the Leave Ledger,
+	with the expected and the stored values"""
+	stored = {}
+	for row in frappe.get_all(
+		"Leave Balance Snapshot", filters=get_filters(employees, leave_type), fields=list(SNAPSHOT_FIELDS)
+	):
+		stored[(row.employee, row.leave_type, row.leave_allocation)] = row
+
+	expected = {}
+	for employee, employee_leave_type in set(get_employee_leave_types(employees, leave_type)) | {
+		key[:2] for key in stored
+	}:
+		for row in get_leave_balance_snapshot_values(employee, employee_leave_type):
+			expected[(row.employee, row.leave_type, row.leave_allocation)] = row
+
+	mismatches = []
+	for key in sorted(set(stored) | set(expected)):
+		if normalize_snapshot(stored.get(key)) != normalize_snapshot(expected.get(key)):
+			mismatches.append(
+				frappe._dict(
+					employee=key[0],
+					leave_type=key[1],
+					leave_allocation=key[2],
+					expected=expected.get(key),
+					stored=stored.get(key),
+				)
+			)
+
+	return mismatches
+
+
+def get_filters(employees: list | None = None, leave_type: str | None = None) -> dict:
+	filters = {}
+	if employees:
+		filters["employee"] = ("in", employees)
+	if leave_type:
+		filters["leave_type"] = leave_type
+
+	return filters
+
+
+def normalize_snapshot(snapshot: dict | None) -> tuple | None:
+	if not snapshot:
+		return None
+
+	dates = tuple(getdate(snapshot[field]) if snapshot[field] else None for field in SNAPSHOT_DATE_FIELDS)
+	return dates + tuple(flt(snapshot[field], 6) for field in SNAPSHOT_BALANCE_FIELDS)
+
+
+def invalidate_leave_balance_snapshots(doc, method=None):
+	"""Drops snapshots affected by changes to the leave type or holidays the leaves taken are counted with,
+	and enqueues rebuilding them. Balances are read from the ledger till then"""
+	employees, leave_type = None, None
+
+	def has_changed(fieldname):
+		return doc.get_doc_before_save() and doc.has_value_changed(fieldname)
+
+	if doc.doctype == "Leave Type":
+		if not has_changed("include_holiday"):
+			return
+		leave_type = doc.name
+
+	elif doc.doctype == "Employee":
+		if not has_changed("holiday_list"):
+			return
+		employees = [doc.name]
+
+	elif doc.doctype == "Company":
+		if not has_changed("default_holiday_list"):
+			return
+		employees = frappe.get_all("Employee", filters={"company": doc.name}, pluck="name")
+
+	elif doc.doctype == "Holiday List":
+		if not has_holidays_changed(doc):
+			return
+		employees = get_employees_with_holiday_list(doc.name)
+
+	if employees is not None and not employees:
+		return
+
+	queue_leave_balance_snapshot_rebuild(employees, leave_type)
+
+
+def queue_leave_balance_snapshot_rebuild(
+	employees: list | None = None, leave_type: str | None = None
+) -> None:
+	"""Drops the snapshots of the employees and leave type and enqueues rebuilding them
+	once the transaction is committed"""
+	delete_leave_balance_snapshots(employees, leave_type)
+	frappe.enqueue(
+		rebuild_leave_balance_snapshots,
+		queue="long",
+		employees=employees,
+		leave_type=leave_type,
+		enqueue_after_commit=True,
+	)
+
+
+def has_holidays_changed(doc) -> bool:
+	"""Returns True if the holiday dates of a new or updated holiday list differ from the saved ones"""
+	doc_before_save = doc.get_doc_before_save()
+	if not doc_before_save:
+		return True
+
+	return {getdate(d.holiday_date) for d in doc.holidays} != {
+		getdate(d.holiday_date) for d in doc_before_save.holidays
+	}
+
+
+def get_employees_with_holiday_list(holiday_list: str) -> list[str]:
+	"""Returns employees whose leaves may be counted with the holiday list"""
+	Employee = frappe.qb.DocType("Employee")
+	Company = frappe.qb.DocType("Company")
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+
+	employees = (
+		frappe.qb.from_(Employee)
+		.left_join(Company)
+		.on(Employee.company == Company.name)
+		.select(Employee.name)
+		.where(
+			(Employee.holiday_list == holiday_list)
+			| (
+				((Employee.holiday_list.isnull()) | (Employee.holiday_list == ""))
+				& (Company.default_holiday_list == holiday_list)
+			)
+		)
+	).run(pluck=True)
+
+	employees += (
+		frappe.qb.from_(Ledger).select(Ledger.employee).distinct().where(Ledger.holiday_list == holiday_list)
+	).run(pluck=True)
+
+	return list(set(employees))
+
+
+def on_doctype_update():
+	frappe.db.add_index("Leave Balance Snapshot", ["employee", "valid_from", "valid_till"])
+	frappe.db.add_index("Leave Balance Snapshot", ["employee", "leave_type"])
@@ -4,7 +4,22 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import DATE_FORMAT, flt, get_link_to_form, getdate, today
+from frappe.query_builder.functions import Sum
+from frappe.utils import (
+	DATE_FORMAT,
+	create_batch,
+	flt,
+	get_datetime,
+	get_link_to_form,
+	getdate,
+	now_datetime,
+	today,
+)
+
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import update_leave_balance_snapshots
+
+EXPIRY_EMPLOYEE_BATCH_SIZE = 500
+LEAVE_EXPIRY_HIGH_WATER_MARK = "leave_expiry_high_water_mark"
 
 
 class LeaveLedgerEntry(Document):
@@ -12,6 +27,9 @@ class LeaveLedgerEntry(Document):
 		if getdate(self.from_date) > getdate(self.to_date):
 			frappe.throw(_("To date needs to be before from date"))
 
+	def on_submit(self):
+		update_leave_balance_snapshots(self.employee, self.leave_type, self.from_date, self.to_date)
+
 	def on_cancel(self):
 		# allow cancellation of expiry leaves
 		if self.is_expired:
@@ -19,6 +37,8 @@ class LeaveLedgerEntry(Document):
 		else:
 			frappe.throw(_("Only expired allocation can be cancelled"))
 
+		update_leave_balance_snapshots(self.employee, self.leave_type, self.from_date, self.to_date)
+
 
 def validate_leave_allocation_against_leave_application(ledger):
 	"""Checks that leave allocation has no leave application against it"""
@@ -85,6 +105,12 @@ def delete_ledger_entry(ledger):
 		(ledger.transaction_name, expired_entry),
 	)
 
+	if expired_entry:
+		# the expiry entry may belong to another allocation of the leave type
+		update_leave_balance_snapshots(ledger.employee, ledger.leave_type)
+	else:
+		update_leave_balance_snapshots(ledger.employee, ledger.leave_type, ledger.from_date, ledger.to_date)
+
 
 def get_previous_expiry_ledger_entry(ledger):
 	"""Returns the expiry ledger entry having same creation date as the ledger entry to be cancelled"""
@@ -120,42 +146,265 @@ def process_expired_allocation():
 	        create a separate leave expiry entry against each entry of carry forwarded and non carry forwarded leaves
 	Case 2: leave type has no specific expiry period for carry forwarded leaves
 	        and there is no carry forwarded leave allocation, create a single expiry against the remaining leaves.
+
+	Only allocations that ended, changed or had their expiry cancelled since the last run are checked,
+	all of them if the last run is not known. Expiry entries are computed and inserted per batch of employees.
 	"""
+	run = frappe._dict(date=getdate(today()), started_at=now_datetime())
+	high_water_mark = get_expiry_high_water_mark(run)
 
 	# fetch leave type records that has carry forwarded leaves expiry
-	leave_type_records = frappe.db.get_values(
-		"Leave Type", filters={"expire_carry_forwarded_leaves_after_days": (">", 0)}, fieldname=["name"]
+	cf_expiry_leave_types = frappe.get_all(
+		"Leave Type", filters={"expire_carry_forwarded_leaves_after_days": (">", 0)}, pluck="name"
+	)
+
+	allocations_by_employee = {}
+	for d in get_allocations_to_check_for_expiry(run, high_water_mark):
+		allocations_by_employee.setdefault(d.employee, set()).add(d.transaction_name)
+
+	for employees in create_batch(sorted(allocations_by_employee), EXPIRY_EMPLOYEE_BATCH_SIZE):
+		allocations = [name for employee in employees for name in allocations_by_employee[employee]]
+		expire_allocation_entries(get_expiring_allocation_entries(allocations, cf_expiry_leave_types))
+
+	# set once the expiry entries are committed, so that a run that is not committed is processed again
+	frappe.db.after_commit.add(lambda: frappe.cache().set_value(LEAVE_EXPIRY_HIGH_WATER_MARK, run))
+
+
+def get_expiry_high_water_mark(run: dict) -> frappe._dict | None:
+	"""Returns the last expiry run, if it ran before the current one"""
+	high_water_mark = frappe.cache().get_value(LEAVE_EXPIRY_HIGH_WATER_MARK)
+	if (
+		high_water_mark
+		and getdate(high_water_mark.date) <= run.date
+		and get_datetime(high_water_mark.started_at) <= run.started_at
+	):
+		return high_water_mark
+
+	return None
+
+
+def get_allocations_to_check_for_expiry(run: dict, high_water_mark: dict | None) -> list[dict]:
+	"""Returns allocations with ledger entries ending before the run date that have not been checked
+	by the last run: ending since its date, submitted or modified since it started,
+	or with an expiry entry cancelled since it started"""
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	query = (
+		frappe.qb.from_(Ledger)
+		.select(Ledger.employee, Ledger.transaction_name)
+		.distinct()
+		.where(
+			(Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.docstatus == 1)
+			& (Ledger.is_expired == 0)
+			& (Ledger.to_date < run.date)
+		)
 	)
+	if not high_water_mark:
+		return query.run(as_dict=True)
+
+	allocations = query.where(
+		(Ledger.to_date >= high_water_mark.date) | (Ledger.modified >= high_water_mark.started_at)
+	).run(as_dict=True)
+
+	cancelled_expiries = (
+		frappe.qb.from_(Ledger)
+		.select(Ledger.employee, Ledger.transaction_name)
+		.distinct()
+		.where(
+			(Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.docstatus == 2)
+			& (Ledger.is_expired == 1)
+			& (Ledger.modified >= high_water_mark.started_at)
+		)
+	).run(as_dict=True)
+
+	return allocations + cancelled_expiries
+
+
+def get_expiring_allocation_entries(allocations: list[str], cf_expiry_leave_types: list[str]) -> list[dict]:
+	"""Returns the allocation ledger entries of the allocations that are due for expiry,
+	ordered by their end date so that earlier expiries are accounted for in the later ones"""
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	entries = (
+		frappe.qb.from_(Ledger)
+		.select(
+			Ledger.name,
+			Ledger.employee,
+			Ledger.employee_name,
+			Ledger.company,
+			Ledger.leave_type,
+			Ledger.leaves,
+			Ledger.from_date,
+			Ledger.to_date,
+			Ledger.is_carry_forward,
+			Ledger.is_expired,
+			Ledger.transaction_name,
+		)
+		.where(
+			(Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.transaction_name.isin(allocations))
+			& (Ledger.docstatus == 1)
+		)
+	).run(as_dict=True)
+
+	entries_by_allocation = {}
+	for entry in entries:
+		entries_by_allocation.setdefault(entry.transaction_name, []).append(entry)
+
+	today_date = getdate(today())
+	expiring_entries = []
+	for entry in entries:
+		if entry.is_expired or getdate(entry.to_date) >= today_date:
+			continue
+
+		# an entry has expired already if the allocation has another entry of the same kind, and
+		# non carry forwarded leaves expire with the carry forwarded ones if they do not expire separately
+		if any(
+			other.name != entry.name
+			and (
+				other.is_carry_forward == entry.is_carry_forward
+				or (not other.is_carry_forward and other.leave_type not in cf_expiry_leave_types)
+			)
+			for other in entries_by_allocation[entry.transaction_name]
+		):
+			continue
 
-	leave_type = [record[0] for record in leave_type_records] or [""]
+		expiring_entries.append(entry)
 
-	# fetch non expired leave ledger entry of transaction_type allocation
-	expire_allocation = frappe.db.sql(
-		"""
-		SELECT
-			leaves, to_date, from_date, employee, leave_type,
-			is_carry_forward, transaction_name as name, transaction_type
-		FROM `tabLeave Ledger Entry` l
-		WHERE (NOT EXISTS
-			(SELECT name
-				FROM `tabLeave Ledger Entry`
-				WHERE
-					transaction_name = l.transaction_name
-					AND transaction_type = 'Leave Allocation'
-					AND name<>l.name
-					AND docstatus = 1
-					AND (
-						is_carry_forward=l.is_carry_forward
-						OR (is_carry_forward = 0 AND leave_type not in %s)
-			)))
-			AND transaction_type = 'Leave Allocation'
-			AND to_date < %s""",
-		(leave_type, today()),
-		as_dict=1,
+	return sorted(expiring_entries, key=lambda d: (getdate(d.to_date), -d.is_carry_forward))
+
+
+def expire_allocation_entries(entries: list[dict]) -> None:
+	"""Creates expiry ledger entries for the allocation entries in bulk,
+	same as `expire_allocation` and `expire_carried_forward_allocation` for each entry in order"""
+	from hrms.hr.doctype.leave_application.leave_application import get_leaves_for_employee_periods
+	from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+		queue_leave_balance_snapshot_rebuild,
+	)
+
+	if not entries:
+		return
+
+	remaining_leaves = get_remaining_leaves_for_entries(
+		[entry.name for entry in entries if not entry.is_carry_forward]
+	)
+	cf_leaves_taken = get_leaves_for_employee_periods(
+		[
+			((entry.employee, entry.leave_type), entry.from_date, entry.to_date)
+			for entry in entries
+			if entry.is_carry_forward
+		],
+		skip_expired_leaves=False,
 	)
 
-	if expire_allocation:
-		create_expiry_ledger_entry(expire_allocation)
+	expiries, expired_allocations = {}, []
+	for entry in entries:
+		key = (entry.employee, entry.leave_type)
+		from_date, to_date = getdate(entry.from_date), getdate(entry.to_date)
+		# expiry entries created earlier in this run, which are not in the ledger yet
+		expired_in_run = expiries.get(key, [])
+
+		if entry.is_carry_forward:
+			leaves_taken = cf_leaves_taken[(key, from_date, to_date)] + sum(
+				expiry.leaves for expiry in expired_in_run if from_date <= expiry.to_date <= to_date
+			)
+			leaves = flt(entry.leaves) + flt(leaves_taken)
+		else:
+			leaves = flt(remaining_leaves.get(entry.name)) + sum(
+				expiry.leaves for expiry in expired_in_run if expiry.to_date <= to_date
+			)
+			expired_allocations.append(entry.transaction_name)
+
+		if (entry.is_carry_forward and leaves > 0) or (not entry.is_carry_forward and leaves):
+			expiries.setdefault(key, []).append(
+				frappe._dict(entry, leaves=leaves * -1, from_date=to_date, to_date=to_date)
+			)
+
+	insert_expiry_ledger_entries([expiry for entries in expiries.values() for expiry in entries])
+
+	if expired_allocations:
+		LeaveAllocation = frappe.qb.DocType("Leave Allocation")
+		(
+			frappe.qb.update(LeaveAllocation)
+			.set(LeaveAllocation.expired, 1)
+			.where(LeaveAllocation.name.isin(expired_allocations))
+		).run()
+
+	if expiries:
+		queue_leave_balance_snapshot_rebuild(list({employee for employee, leave_type in expiries}))
+
+
+def get_remaining_leaves_for_entries(entries: list[str]) -> dict[str, float]:
+	"""Returns remaining leaves of the allocation ledger entries, as returned by `get_remaining_leaves`"""
+	if not entries:
+		return {}
+
+	Allocation = frappe.qb.DocType("Leave Ledger Entry")
+	Ledger = frappe.qb.DocType("Leave Ledger Entry").as_("ledger")
+	remaining_leaves = (
+		frappe.qb.from_(Allocation)
+		.join(Ledger)
+		.on(
+			(Ledger.employee == Allocation.employee)
+			& (Ledger.leave_type == Allocation.leave_type)
+			& (Ledger.to_date <= Allocation.to_date)
+			& (Ledger.docstatus == 1)
+		)
+		.select(Allocation.name, Sum(Ledger.leaves).as_("leaves"))
+		.where(Allocation.name.isin(entries))
+		.groupby(Allocation.name)
+	).run(as_dict=True)
+
+	return {d.name: flt(d.leaves) for d in remaining_leaves}
+
+
+def insert_expiry_ledger_entries(expiries: list[dict]) -> None:
+	now, user = now_datetime(), frappe.session.user
+	fields = [
+		"name",
+		"owner",
+		"modified_by",
+		"creation",
+		"modified",
+		"docstatus",
+		"employee",
+		"employee_name",
+		"company",
+		"leave_type",
+		"transaction_type",
+		"transaction_name",
+		"leaves",
+		"from_date",
+		"to_date",
+		"is_carry_forward",
+		"is_expired",
+		"is_lwp",
+	]
+	values = [
+		(
+			frappe.generate_hash(length=10),
+			user,
+			user,
+			now,
+			now,
+			1,
+			expiry.employee,
+			expiry.employee_name,
+			expiry.company,
+			expiry.leave_type,
+			"Leave Allocation",
+			expiry.transaction_name,
+			expiry.leaves,
+			expiry.from_date,
+			expiry.to_date,
+			expiry.is_carry_forward,
+			1,
+			0,
+		)
+		for expiry in expiries
+	]
+	for batch in create_batch(values, EXPIRY_EMPLOYEE_BATCH_SIZE):
+		frappe.db.bulk_insert("Leave Ledger Entry", fields, batch)
 
 
 def create_expiry_ledger_entry(allocations):
@@ -238,3 +487,4 @@ def expire_carried_forward_allocation(allocation):
 
 def on_doctype_update():
 	frappe.db.add_index("Leave Ledger Entry", ["transaction_type", "transaction_name"])
+	frappe.db.add_index("Leave Ledger Entry", ["transaction_type", "to_date"])
@@ -49,6 +49,13 @@ class LeaveType(Document):
 		):
 			frappe.throw(_("The fraction of Daily Salary per Leave should be between 0 and 1"))
 
+	def on_update(self):
+		from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+			invalidate_leave_balance_snapshots,
+		)
+
+		invalidate_leave_balance_snapshots(self)
+
 	def clear_cache(self):
 		from hrms.payroll.doctype.salary_slip.salary_slip import LEAVE_TYPE_MAP
 
@@ -2,16 +2,47 @@
 # For license information, please see license.txt
 
 
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.query_builder import Criterion
-from frappe.utils import add_days, cint, cstr, get_link_to_form, get_time, getdate, now_datetime
+from frappe.query_builder.functions import Count, Max
+from frappe.utils import (
+	add_days,
+	cint,
+	create_batch,
+	cstr,
+	get_link_to_form,
+	get_time,
+	getdate,
+	now_datetime,
+)
 
 from hrms.hr.utils import validate_active_employee
-from hrms.utils import generate_date_range
+from hrms.utils import (
+	generate_date_range,
+	get_names_from_series,
+	has_doc_events,
+	release_names_from_series,
+)
+
+SHIFT_ASSIGNMENT_INDEX = "shift_assignment_index"
+SHIFT_ASSIGNMENT_INDEX_EXPIRY = 24 * 60 * 60
+SHIFT_ASSIGNMENT_FIELDS = [
+	"employee",
+	"employee_name",
+	"department",
+	"company",
+	"shift_type",
+	"start_date",
+	"end_date",
+	"status",
+	"shift_request",
+	"shift_location",
+	"schedule",
+]
 
 
 class OverlappingShiftError(frappe.ValidationError):
@@ -24,7 +55,12 @@ class MultipleShiftError(frappe.ValidationError):
 
 class ShiftAssignment(Document):
 	def validate(self):
-		validate_active_employee(self.employee)
+		bulk_shift_assignment = self.get_bulk_shift_assignment()
+		if (
+			not bulk_shift_assignment
+			or bulk_shift_assignment.get_employee(self.employee).status == "Inactive"
+		):
+			validate_active_employee(self.employee)
 		if self.end_date:
 			self.validate_from_to_dates("start_date", "end_date")
 		self.validate_overlapping_shifts()
@@ -38,6 +74,17 @@ class ShiftAssignment(Document):
 		self.validate_employee_checkin()
 		self.validate_attendance()
 
+	def clear_cache(self):
+		from hrms.hr.doctype.shift_type.shift_type import invalidate_high_water_marks
+
+		clear_shift_assignment_index(self.employee)
+		invalidate_high_water_marks([self.shift_type])
+		return super().clear_cache()
+
+	def get_bulk_shift_assignment(self) -> "BulkShiftAssignment | None":
+		"""Returns the batch this assignment is being validated in by `BulkShiftAssignment`, if any"""
+		return getattr(self, "_bulk_shift_assignment", None)
+
 	def validate_employee_checkin(self):
 		checkins = frappe.get_all(
 			"Employee Checkin",
@@ -76,16 +123,29 @@ class ShiftAssignment(Document):
 		if self.status == "Inactive":
 			return
 
+		bulk_shift_assignment = self.get_bulk_shift_assignment()
 		overlapping_dates = self.get_overlapping_dates()
 		if len(overlapping_dates):
 			self.validate_same_date_multiple_shifts(overlapping_dates)
 			# if dates are overlapping, check if timings are overlapping, else allow
 			for d in overlapping_dates:
-				if has_overlapping_timings(self.shift_type, d.shift_type):
+				if bulk_shift_assignment:
+					overlapping = bulk_shift_assignment.has_overlapping_timings(self.shift_type, d.shift_type)
+				else:
+					overlapping = has_overlapping_timings(self.shift_type, d.shift_type)
+
+				if overlapping:
 					self.throw_overlap_error(d)
 
 	def validate_same_date_multiple_shifts(self, overlapping_dates):
-		if cint(frappe.db.get_single_value("HR Settings", "allow_multiple_shift_assignments")):
+		if bulk_shift_assignment := self.get_bulk_shift_assignment():
+			allow_multiple_shift_assignments = bulk_shift_assignment.allow_multiple_shift_assignments
+		else:
+			allow_multiple_shift_assignments = frappe.db.get_single_value(
+				"HR Settings", "allow_multiple_shift_assignments"
+			)
+
+		if cint(allow_multiple_shift_assignments):
 			if not self.docstatus:
 				frappe.msgprint(
 					_(
@@ -113,6 +173,9 @@ class ShiftAssignment(Document):
 			)
 
 	def get_overlapping_dates(self):
+		if bulk_shift_assignment := self.get_bulk_shift_assignment():
+			return bulk_shift_assignment.get_overlapping_assignments(self)
+
 		if not self.name:
 			self.name = "New Shift Assignment"
 
@@ -155,11 +218,216 @@ def has_overlapping_timings(shift_1: str, shift_2: str) -> bool:
 	s1 = frappe.db.get_value("Shift Type", shift_1, ["start_time", "end_time"], as_dict=True)
 	s2 = frappe.db.get_value("Shift Type", shift_2, ["start_time", "end_time"], as_dict=True)
 
+	return have_overlapping_timings(s1, s2)
+
+
+def have_overlapping_timings(s1: dict, s2: dict) -> bool:
+	"""Accepts the timings of two shift types and checks whether they are overlapping"""
+	end_times = []
 	for d in [s1, s2]:
-		if d.end_time <= d.start_time:
-			d.end_time += timedelta(days=1)
+		end_times.append(d.end_time + timedelta(days=1) if d.end_time <= d.start_time else d.end_time)
+
+	return end_times[0] > s2.start_time and s1.start_time < end_times[1]
 
-	return s1.end_time > s2.start_time and s1.start_time < s2.end_time
+
+class BulkShiftAssignment:
+	"""Validates and submits shift assignments in bulk.
+
+	Each record is validated by `ShiftAssignment.validate`, with the employee and overlap checks
+	answered from the active assignments of all the employees, fetched in a single query over the
+	period spanned by the batch. Records are validated in order and a valid record is visible to the
+	ones after it, so the outcome is the same as submitting them one at a time. Valid records are then
+	inserted with multi-row inserts, without running the document lifecycle or hooks registered
+	for all doctypes. If any app hooks into the document events of Shift Assignment,
+	records are submitted one document at a time instead, so that its hooks keep running.
+
+	Once a record of a schedule fails validation, the records of the schedule after it are skipped
+	with the same error, as schedules create their assignments in order till the first failure.
+	"""
+
+	def __init__(self, records: list[dict]):
+		self.records = [frappe._dict(record) for record in records]
+		self.naming_series = frappe.get_meta("Shift Assignment").autoname
+
+	def submit(self, batch_size: int = 1000) -> list[frappe._dict]:
+		"""Returns the `name` of the shift assignment created for each record,
+		or the `error` the record failed validation with"""
+		if not self.records:
+			return []
+
+		self.prefetch()
+		bulk_insert = not has_doc_events("Shift Assignment")
+		names = get_names_from_series(self.naming_series, len(self.records)) if bulk_insert else []
+
+		results, assignments, failed_schedules = [], [], {}
+		for record in self.records:
+			if record.schedule in failed_schedules:
+				results.append(frappe._dict(name=None, error=failed_schedules[record.schedule]))
+				continue
+
+			try:
+				doc = self.get_assignment_doc(record)
+				if bulk_insert:
+					doc.validate()
+				else:
+					self.submit_assignment(doc)
+			except frappe.ValidationError as e:
+				if record.schedule:
+					failed_schedules[record.schedule] = e
+				results.append(frappe._dict(name=None, error=e))
+				continue
+
+			if bulk_insert:
+				doc.name = names[len(assignments)]
+			self.add_assignment(doc)
+			assignments.append(doc)
+			results.append(frappe._dict(name=doc.name, error=None))
+
+		if bulk_insert:
+			release_names_from_series(self.naming_series, len(names) - len(assignments))
+			self.insert_assignments(assignments, batch_size)
+
+			# same as on saving each assignment
+			for doc in assignments:
+				doc.clear_cache()
+
+		return results
+
+	def submit_assignment(self, doc: ShiftAssignment) -> None:
+		"""Submits the assignment as a document, undoing its writes if it fails"""
+		frappe.db.savepoint("bulk_shift_assignment")
+		try:
+			doc.submit()
+		except frappe.ValidationError:
+			frappe.db.rollback(save_point="bulk_shift_assignment")
+			raise
+
+	def prefetch(self):
+		employees = list({record.employee for record in self.records})
+		from_date = min(getdate(record.start_date) for record in self.records)
+		to_date = None
+		if all(record.end_date for record in self.records):
+			to_date = max(getdate(record.end_date) for record in self.records)
+
+		self.employees = {
+			employee.name: employee
+			for employee in frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "employee_name", "company", "department", "status"],
+			)
+		}
+
+		ShiftAssignment = frappe.qb.DocType("Shift Assignment")
+		query = (
+			frappe.qb.from_(ShiftAssignment)
+			.select(
+				ShiftAssignment.name,
+				ShiftAssignment.employee,
+				ShiftAssignment.shift_type,
+				ShiftAssignment.start_date,
+				ShiftAssignment.end_date,
+				ShiftAssignment.docstatus,
+				ShiftAssignment.status,
+			)
+			.where(
+				(ShiftAssignment.employee.isin(employees))
+				& (ShiftAssignment.docstatus == 1)
+				& (ShiftAssignment.status == "Active")
+				& ((ShiftAssignment.end_date >= from_date) | (ShiftAssignment.end_date.isnull()))
+			)
+			.for_update()
+		)
+		if to_date:
+			query = query.where(ShiftAssignment.start_date <= to_date)
+
+		self.assignments = {}
+		for d in query.run(as_dict=True):
+			self.assignments.setdefault(d.employee, []).append(d)
+
+		shift_types = {record.shift_type for record in self.records}
+		shift_types.update(d.shift_type for assignments in self.assignments.values() for d in assignments)
+		self.shift_timings = {
+			d.name: d
+			for d in frappe.get_all(
+				"Shift Type",
+				filters={"name": ("in", list(shift_types))},
+				fields=["name", "start_time", "end_time"],
+			)
+		}
+		self.overlapping_timings = {}
+		self.allow_multiple_shift_assignments = frappe.db.get_single_value(
+			"HR Settings", "allow_multiple_shift_assignments"
+		)
+
+	def get_assignment_doc(self, record: dict) -> ShiftAssignment:
+		doc = frappe.new_doc("Shift Assignment")
+		doc.update(record)
+
+		employee = self.get_employee(doc.employee)
+		doc.update(
+			{
+				"employee_name": employee.employee_name,
+				"company": doc.company or employee.company,
+				"department": employee.department,
+				"status": doc.status or "Active",
+			}
+		)
+		doc._bulk_shift_assignment = self
+		return doc
+
+	def add_assignment(self, doc: ShiftAssignment):
+		if doc.status != "Active":
+			return
+
+		self.assignments.setdefault(doc.employee, []).append(
+			frappe._dict(
+				name=doc.name,
+				employee=doc.employee,
+				shift_type=doc.shift_type,
+				start_date=doc.start_date,
+				end_date=doc.end_date,
+				docstatus=1,
+				status=doc.status,
+			)
+		)
+
+	def get_employee(self, employee: str) -> frappe._dict:
+		if employee not in self.employees:
+			frappe.throw(_("Employee {0} not found").format(employee), frappe.DoesNotExistError)
+
+		return self.employees[employee]
+
+	def get_overlapping_assignments(self, doc: ShiftAssignment) -> list[dict]:
+		start_date = getdate(doc.start_date)
+		end_date = getdate(doc.end_date) if doc.end_date else None
+
+		return [
+			d
+			for d in self.assignments.get(doc.employee, [])
+			if (not d.end_date or getdate(d.end_date) >= start_date)
+			and (not end_date or getdate(d.start_date) <= end_date)
+		]
+
+	def has_overlapping_timings(self, shift_1: str, shift_2: str) -> bool:
+		if (shift_1, shift_2) not in self.overlapping_timings:
+			self.overlapping_timings[(shift_1, shift_2)] = have_overlapping_timings(
+				self.shift_timings[shift_1], self.shift_timings[shift_2]
+			)
+
+		return self.overlapping_timings[(shift_1, shift_2)]
+
+	def insert_assignments(self, assignments: list[ShiftAssignment], batch_size: int):
+		now, user = now_datetime(), frappe.session.user
+		values = [
+			(doc.name, user, user, now, now, 1, *(doc.get(f) for f in SHIFT_ASSIGNMENT_FIELDS))
+			for doc in assignments
+		]
+
+		fields = ["name", "owner", "modified_by", "creation", "modified", "docstatus"]
+		fields.extend(SHIFT_ASSIGNMENT_FIELDS)
+		for batch in create_batch(values, batch_size):
+			frappe.db.bulk_insert("Shift Assignment", fields, batch)
 
 
 @frappe.whitelist()
@@ -360,44 +628,184 @@ def _adjust_overlapping_shifts(shifts: dict):
 		shifts[i + 1] = next_shift
 
 
-def get_shifts_for_date(employee: str, for_timestamp: datetime) -> list[dict[str, str]]:
-	"""Returns list of shifts with details for given date"""
-	for_date = for_timestamp.date()
-	prev_day = add_days(for_date, -1)
-	next_day = add_days(for_date, 1)
+class ShiftAssignmentIndex:
+	"""Active shift assignments of employees sorted by start date, along with their default shifts.
+
+	Assignments are read from the shift assignment index cache, and the ones missing from the cache
+	are loaded in one query. Cached assignments of an employee are used only while the count and
+	last modification of their shift assignments are unchanged, so that updates bypassing the
+	document are picked up as well. Shift lookups for a date and searches for the next or previous
+	assignment are then answered in memory with binary searches."""
+
+	def __init__(self, employees: list[str] | None = None):
+		self.assignments = {}
+		self.start_dates = {}
+		self.closed_assignments = {}
+		self.closed_start_dates = {}
+		self.max_end_dates = {}
+		self.open_ended_assignments = {}
+		self.default_shifts = {}
+		if employees:
+			self.load(employees)
+
+	def load(self, employees: list[str]) -> None:
+		employees = [employee for employee in set(employees) if employee not in self.assignments]
+		if not employees:
+			return
+
+		versions = get_shift_assignment_versions(employees)
+		cached = {}
+		for employee in employees:
+			entry = frappe.cache().get_value(get_shift_assignment_index_key(employee), expires=True)
+			if entry and entry.version == versions.get(employee):
+				cached[employee] = entry.assignments
+
+		missing = [employee for employee in employees if employee not in cached]
+		if missing:
+			for employee, assignments in get_active_shift_assignments(missing).items():
+				frappe.cache().set_value(
+					get_shift_assignment_index_key(employee),
+					frappe._dict(version=versions.get(employee), assignments=assignments),
+					expires_in_sec=SHIFT_ASSIGNMENT_INDEX_EXPIRY,
+				)
+				cached[employee] = assignments
+
+		for employee, assignments in cached.items():
+			self.add_assignments(employee, assignments)
+
+		self.default_shifts.update(
+			frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "default_shift"],
+				as_list=True,
+			)
+		)
+
+	def add_assignments(self, employee: str, assignments: list[dict]) -> None:
+		closed = [d for d in assignments if d.end_date]
+		max_end_dates = []
+		for d in closed:
+			max_end_dates.append(max(max_end_dates[-1], d.end_date) if max_end_dates else d.end_date)
+
+		self.assignments[employee] = assignments
+		self.start_dates[employee] = [d.start_date for d in assignments]
+		self.closed_assignments[employee] = closed
+		self.closed_start_dates[employee] = [d.start_date for d in closed]
+		self.max_end_dates[employee] = max_end_dates
+		self.open_ended_assignments[employee] = [d for d in assignments if not d.end_date]
+
+	def get_shifts_for_date(self, employee: str, for_timestamp: datetime) -> list[dict]:
+		"""Returns assignments active on the previous, same or next day of the timestamp"""
+		self.load([employee])
+		prev_day = add_days(for_timestamp.date(), -1)
+		next_day = add_days(for_timestamp.date(), 1)
+		closed = self.closed_assignments[employee]
+		max_end_dates = self.max_end_dates[employee]
+
+		shifts = [d for d in self.open_ended_assignments[employee] if d.start_date <= next_day]
+		# closed assignments starting on or before the next day, scanned backwards
+		# until none of the earlier assignments end on or after the previous day
+		idx = bisect_right(self.closed_start_dates[employee], next_day) - 1
+		while idx >= 0 and max_end_dates[idx] >= prev_day:
+			if closed[idx].end_date >= prev_day:
+				shifts.append(closed[idx])
+			idx -= 1
+
+		return shifts
+
+	def get_assignment_dates(self, employee: str, for_date, direction: str, limit: int) -> list[tuple]:
+		"""Returns (start date, end date) of assignments starting after the date (forward)
+		or before the date (reverse), nearest first"""
+		self.load([employee])
+		assignments = self.assignments[employee]
+		start_dates = self.start_dates[employee]
+
+		if direction == "reverse":
+			assignments = reversed(assignments[: bisect_left(start_dates, for_date)])
+		else:
+			assignments = assignments[bisect_right(start_dates, for_date) :]
+
+		return [(d.start_date, d.end_date) for d in assignments][:limit]
+
+	def get_default_shift(self, employee: str) -> str | None:
+		if employee not in self.default_shifts:
+			self.default_shifts[employee] = frappe.db.get_value(
+				"Employee", employee, "default_shift", cache=True
+			)
+
+		return self.default_shifts[employee]
 
+
+def get_active_shift_assignments(employees: list[str]) -> dict[str, list[dict]]:
+	"""Returns active shift assignments of the employees sorted by start date"""
 	assignment = frappe.qb.DocType("Shift Assignment")
-	return (
+	assignments = (
 		frappe.qb.from_(assignment)
-		.select(assignment.name, assignment.shift_type, assignment.start_date, assignment.end_date)
+		.select(
+			assignment.employee,
+			assignment.name,
+			assignment.shift_type,
+			assignment.start_date,
+			assignment.end_date,
+		)
 		.where(
-			(assignment.employee == employee)
+			(assignment.employee.isin(employees))
 			& (assignment.docstatus == 1)
 			& (assignment.status == "Active")
-			# for shifts that exceed a day in duration or margins
-			# eg: shift = 00:30:00 - 10:00:00, including margins (1 hr) = 23:30:00 - 11:00:00
-			# if for_timestamp = 23:30:00 (falls in before shift margin), also fetch next days shift to find the correct shift
-			& (assignment.start_date <= next_day)
-			& (
-				Criterion.any(
-					[
-						assignment.end_date.isnull(),
-						(
-							assignment.end_date.isnotnull()
-							# for shifts that exceed a day in duration or margins
-							# eg: shift = 15:00 - 23:30, including margins (1 hr) = 14:00 - 00:30
-							# if for_timestamp = 00:30:00 (falls in after shift margin), also fetch prev days shift to find the correct shift
-							& (prev_day <= assignment.end_date)
-						),
-					]
-				)
-			)
 		)
+		.orderby(assignment.start_date)
 	).run(as_dict=True)
 
+	assignments_by_employee = {employee: [] for employee in employees}
+	for d in assignments:
+		assignments_by_employee[d.pop("employee")].append(d)
+
+	return assignments_by_employee
+
+
+def get_shift_assignment_versions(employees: list[str]) -> dict[str, tuple]:
+	"""Returns the count and last modification of the shift assignments of each employee"""
+	assignment = frappe.qb.DocType("Shift Assignment")
+	versions = (
+		frappe.qb.from_(assignment)
+		.select(assignment.employee, Count(assignment.name), Max(assignment.modified))
+		.where(assignment.employee.isin(employees))
+		.groupby(assignment.employee)
+	).run()
+
+	return {employee: (count, str(modified)) for employee, count, modified in versions}
+
 
-def get_shift_for_timestamp(employee: str, for_timestamp: datetime) -> dict:
-	shifts = get_shifts_for_date(employee, for_timestamp)
+def get_shift_assignment_index_key(employee: str) -> str:
+	return f"{SHIFT_ASSIGNMENT_INDEX}:{employee}"
+
+
+def clear_shift_assignment_index(employee: str | None = None) -> None:
+	if employee:
+		frappe.cache().delete_value(get_shift_assignment_index_key(employee))
+	else:
+		frappe.cache().delete_keys(f"{SHIFT_ASSIGNMENT_INDEX}:")
+
+
+def get_shifts_for_date(
+	employee: str,
+	for_timestamp: datetime,
+	shift_assignments: ShiftAssignmentIndex | None = None,
+) -> list[dict[str, str]]:
+	"""Returns list of shifts with details for given date"""
+	# for shifts that exceed a day in duration or margins
+	# eg: shift = 00:30:00 - 10:00:00, including margins (1 hr) = 23:30:00 - 11:00:00
+	# if for_timestamp = 23:30:00 (falls in before shift margin), also fetch next days shift to find the correct shift
+	# eg: shift = 15:00 - 23:30, including margins (1 hr) = 14:00 - 00:30
+	# if for_timestamp = 00:30:00 (falls in after shift margin), also fetch prev days shift to find the correct shift
+	return (shift_assignments or ShiftAssignmentIndex()).get_shifts_for_date(employee, for_timestamp)
+
+
+def get_shift_for_timestamp(
+	employee: str, for_timestamp: datetime, shift_assignments: ShiftAssignmentIndex | None = None
+) -> dict:
+	shifts = get_shifts_for_date(employee, for_timestamp, shift_assignments)
 	if shifts:
 		return get_shift_for_time(shifts, for_timestamp)
 	return {}
@@ -408,6 +816,7 @@ def get_employee_shift(
 	for_timestamp: datetime | None = None,
 	consider_default_shift: bool = False,
 	next_shift_direction: str | None = None,
+	shift_assignments: ShiftAssignmentIndex | None = None,
 ) -> dict:
 	"""Returns a Shift Type for the given employee on the given date
 
@@ -415,21 +824,28 @@ def get_employee_shift(
 	:param for_timestamp: DateTime on which shift is required
 	:param consider_default_shift: If set to true, default shift is taken when no shift assignment is found.
 	:param next_shift_direction: One of: None, 'forward', 'reverse'. Direction to look for next shift if shift not found on given date.
+	:param shift_assignments: (optional) Preloaded shift assignments to look up shifts from.
 	"""
 	if for_timestamp is None:
 		for_timestamp = now_datetime()
 
-	shift_details = get_shift_for_timestamp(employee, for_timestamp)
+	shift_assignments = shift_assignments or ShiftAssignmentIndex([employee])
+	shift_details = get_shift_for_timestamp(employee, for_timestamp, shift_assignments)
 
 	# if shift assignment is not found, consider default shift
-	default_shift = frappe.db.get_value("Employee", employee, "default_shift", cache=True)
+	default_shift = shift_assignments.get_default_shift(employee)
 	if not shift_details and consider_default_shift:
 		shift_details = get_shift_details(default_shift, for_timestamp)
 
 	# if no shift is found, find next or prev shift assignment based on direction
 	if not shift_details and next_shift_direction:
 		shift_details = get_prev_or_next_shift(
-			employee, for_timestamp, consider_default_shift, default_shift, next_shift_direction
+			employee,
+			for_timestamp,
+			consider_default_shift,
+			default_shift,
+			next_shift_direction,
+			shift_assignments,
 		)
 
 	return shift_details or {}
@@ -441,33 +857,25 @@ def get_prev_or_next_shift(
 	consider_default_shift: bool,
 	default_shift: str,
 	next_shift_direction: str,
+	shift_assignments: ShiftAssignmentIndex | None = None,
 ) -> dict:
 	"""Returns a dict of shift details for the next or prev shift based on the next_shift_direction"""
 	MAX_DAYS = 366
 	shift_details = {}
+	shift_assignments = shift_assignments or ShiftAssignmentIndex([employee])
 
 	if consider_default_shift and default_shift:
 		direction = -1 if next_shift_direction == "reverse" else 1
 		for i in range(MAX_DAYS):
 			date = for_timestamp + timedelta(days=direction * (i + 1))
-			shift_details = get_employee_shift(employee, date, consider_default_shift, None)
+			shift_details = get_employee_shift(
+				employee, date, consider_default_shift, None, shift_assignments
+			)
 			if shift_details:
 				return shift_details
 	else:
-		direction = "<" if next_shift_direction == "reverse" else ">"
-		sort_order = "desc" if next_shift_direction == "reverse" else "asc"
-		shift_dates = frappe.get_all(
-			"Shift Assignment",
-			["start_date", "end_date"],
-			{
-				"employee": employee,
-				"start_date": (direction, for_timestamp.date()),
-				"docstatus": 1,
-				"status": "Active",
-			},
-			as_list=True,
-			limit=MAX_DAYS,
-			order_by="start_date " + sort_order,
+		shift_dates = shift_assignments.get_assignment_dates(
+			employee, for_timestamp.date(), next_shift_direction, limit=MAX_DAYS
 		)
 
 		for date_range in shift_dates:
@@ -481,7 +889,11 @@ def get_prev_or_next_shift(
 
 			for dt in generate_date_range(start_date, end_date, reverse=reverse):
 				shift_details = get_employee_shift(
-					employee, datetime.combine(dt, for_timestamp.time()), consider_default_shift, None
+					employee,
+					datetime.combine(dt, for_timestamp.time()),
+					consider_default_shift,
+					None,
+					shift_assignments,
 				)
 				if shift_details:
 					return shift_details
@@ -490,7 +902,10 @@ def get_prev_or_next_shift(
 
 
 def get_employee_shift_timings(
-	employee: str, for_timestamp: datetime | None = None, consider_default_shift: bool = False
+	employee: str,
+	for_timestamp: datetime | None = None,
+	consider_default_shift: bool = False,
+	shift_assignments: ShiftAssignmentIndex | None = None,
 ) -> list[dict]:
 	"""Returns previous shift, current/upcoming shift, next_shift for the given timestamp and employee"""
 	if for_timestamp is None:
@@ -498,19 +913,24 @@ def get_employee_shift_timings(
 
 	# write and verify a test case for midnight shift.
 	prev_shift = curr_shift = next_shift = None
-	curr_shift = get_employee_shift(employee, for_timestamp, consider_default_shift, "forward")
+	shift_assignments = shift_assignments or ShiftAssignmentIndex([employee])
+	curr_shift = get_employee_shift(
+		employee, for_timestamp, consider_default_shift, "forward", shift_assignments
+	)
 	if curr_shift:
 		next_shift = get_employee_shift(
 			employee,
 			curr_shift.start_datetime + timedelta(days=1),
 			consider_default_shift,
 			"forward",
+			shift_assignments,
 		)
 	prev_shift = get_employee_shift(
 		employee,
 		(curr_shift.end_datetime if curr_shift else for_timestamp) + timedelta(days=-1),
 		consider_default_shift,
 		"reverse",
+		shift_assignments,
 	)
 
 	if curr_shift:
@@ -542,7 +962,10 @@ def get_employee_shift_timings(
 
 
 def get_actual_start_end_datetime_of_shift(
-	employee: str, for_timestamp: datetime, consider_default_shift: bool = False
+	employee: str,
+	for_timestamp: datetime,
+	consider_default_shift: bool = False,
+	shift_assignments: ShiftAssignmentIndex | None = None,
 ) -> dict:
 	"""Returns a Dict containing shift details with actual_start and actual_end datetime values
 	Here 'actual' means taking into account the "begin_check_in_before_shift_start_time" and "allow_check_out_after_shift_end_time".
@@ -552,9 +975,10 @@ def get_actual_start_end_datetime_of_shift(
 	:param for_timestamp (datetime, optional): Datetime value of checkin, if not provided considers current datetime
 	:param consider_default_shift (bool, optional): Flag (defaults to False) to specify whether to consider
 	default shift in employee master if no shift assignment is found
+	:param shift_assignments (ShiftAssignmentIndex, optional): Preloaded shift assignments to look up shifts from
 	"""
 	shift_timings_as_per_timestamp = get_employee_shift_timings(
-		employee, for_timestamp, consider_default_shift
+		employee, for_timestamp, consider_default_shift, shift_assignments
 	)
 	return get_exact_shift(shift_timings_as_per_timestamp, for_timestamp)
 
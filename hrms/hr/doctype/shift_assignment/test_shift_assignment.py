@@ -10,6 +10,8 @@ from erpnext.setup.doctype.employee.test_employee import make_employee
 from hrms.hr.doctype.shift_assignment.shift_assignment import (
 	MultipleShiftError,
 	OverlappingShiftError,
+	ShiftAssignmentIndex,
+	clear_shift_assignment_index,
 	get_actual_start_end_datetime_of_shift,
 	get_events,
 )
@@ -22,6 +24,7 @@ class TestShiftAssignment(IntegrationTestCase):
 	def setUp(self):
 		frappe.db.delete("Shift Assignment")
 		frappe.db.delete("Shift Type")
+		clear_shift_assignment_index()
 
 	def test_overlapping_for_ongoing_shift(self):
 		shift = "Day Shift"
@@ -246,3 +249,45 @@ class TestShiftAssignment(IntegrationTestCase):
 		self.assertTrue(checkin.shift_type.name == checkout.shift_type.name == "Morning")
 		self.assertEqual(checkin.actual_start, get_datetime(f"{yesterday} 06:00:00"))
 		self.assertEqual(checkout.actual_end, get_datetime(f"{yesterday} 13:00:00"))
+
+	def test_shift_assignment_index(self):
+		employee = make_employee("test_shift_assignment@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(shift_type="Morning", start_time="07:00:00", end_time="12:00:00")
+		past_assignment = make_shift_assignment(
+			shift_type.name, employee, add_days(today, -30), add_days(today, -20)
+		)
+		make_shift_assignment(shift_type.name, employee, add_days(today, 10))
+
+		index = ShiftAssignmentIndex([employee])
+		self.assertEqual(index.get_shifts_for_date(employee, get_datetime(f"{today} 08:00:00")), [])
+		shifts = index.get_shifts_for_date(employee, get_datetime(f"{add_days(today, -19)} 08:00:00"))
+		self.assertEqual([d.name for d in shifts], [past_assignment.name])
+		self.assertEqual(
+			index.get_assignment_dates(employee, today, "forward", limit=10), [(add_days(today, 10), None)]
+		)
+		self.assertEqual(
+			index.get_assignment_dates(employee, today, "reverse", limit=10),
+			[(add_days(today, -30), add_days(today, -20))],
+		)
+
+		# next shift is found without a default shift
+		next_shift = get_actual_start_end_datetime_of_shift(
+			employee, get_datetime(f"{add_days(today, 10)} 08:00:00")
+		)
+		self.assertEqual(next_shift.shift_type.name, shift_type.name)
+
+		# index is invalidated when an assignment is cancelled
+		past_assignment.cancel()
+		index = ShiftAssignmentIndex([employee])
+		self.assertEqual(
+			index.get_shifts_for_date(employee, get_datetime(f"{add_days(today, -19)} 08:00:00")), []
+		)
+
+		# and when assignments are updated bypassing the document
+		next_assignment = frappe.get_last_doc("Shift Assignment", {"employee": employee, "docstatus": 1})
+		frappe.db.set_value("Shift Assignment", next_assignment.name, "start_date", add_days(today, 5))
+		index = ShiftAssignmentIndex([employee])
+		self.assertEqual(
+			index.get_assignment_dates(employee, today, "forward", limit=10), [(add_days(today, 5), None)]
+		)
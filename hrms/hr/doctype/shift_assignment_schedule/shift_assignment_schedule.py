@@ -3,13 +3,40 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import add_days, get_weekday, nowdate
+from frappe.query_builder import Case
+from frappe.utils import add_days, get_weekday, getdate, now_datetime, nowdate
 
-from hrms.hr.doctype.shift_assignment_tool.shift_assignment_tool import create_shift_assignment
+from hrms.hr.doctype.shift_assignment.shift_assignment import BulkShiftAssignment
 
 
 class ShiftAssignmentSchedule(Document):
 	def create_shifts(self, start_date: str, end_date: str | None = None) -> None:
+		records = self.get_shift_assignment_records(start_date, end_date)
+		for result in BulkShiftAssignment(records).submit():
+			if result.error:
+				raise result.error
+
+		if records:
+			self.create_shifts_after = records[-1]["end_date"]
+			self.save()
+
+	def get_shift_assignment_records(self, start_date: str, end_date: str | None = None) -> list[dict]:
+		return [
+			{
+				"employee": self.employee,
+				"company": self.company,
+				"shift_type": self.shift_type,
+				"start_date": period_start,
+				"end_date": period_end,
+				"status": self.shift_status,
+				"schedule": self.name,
+			}
+			for period_start, period_end in self.get_shift_periods(start_date, end_date)
+		]
+
+	def get_shift_periods(self, start_date: str, end_date: str | None = None) -> list[tuple]:
+		"""Returns the start and end dates of each run of consecutive days the schedule repeats on,
+		till the end date or for 90 days if no end date is set"""
 		gap = {
 			"Every Week": 0,
 			"Every 2 Weeks": 1,
@@ -17,48 +44,98 @@ class ShiftAssignmentSchedule(Document):
 			"Every 4 Weeks": 3,
 		}[self.frequency]
 
-		date = start_date
-		individual_assignment_start = None
-		week_end_day = get_weekday(add_days(start_date, -1))
+		date = getdate(start_date)
+		end_date = getdate(end_date) if end_date else add_days(date, 90)
+		period_start = None
+		week_end_day = get_weekday(add_days(date, -1))
 		repeat_on_days = [day.day for day in self.repeat_on_days]
 
-		if not end_date:
-			end_date = add_days(start_date, 90)
-
+		periods = []
 		while date <= end_date:
 			weekday = get_weekday(date)
 			if weekday in repeat_on_days:
-				if not individual_assignment_start:
-					individual_assignment_start = date
+				if not period_start:
+					period_start = date
 				if date == end_date:
-					self.create_individual_assignment(individual_assignment_start, date)
+					periods.append((period_start, date))
+					period_start = None
 
-			elif individual_assignment_start:
-				self.create_individual_assignment(individual_assignment_start, add_days(date, -1))
-				individual_assignment_start = None
+			elif period_start:
+				periods.append((period_start, add_days(date, -1)))
+				period_start = None
 
 			if weekday == week_end_day and gap:
-				if individual_assignment_start:
-					self.create_individual_assignment(individual_assignment_start, date)
-					individual_assignment_start = None
+				if period_start:
+					periods.append((period_start, date))
+					period_start = None
 				date = add_days(date, 7 * gap)
 
 			date = add_days(date, 1)
 
-	def create_individual_assignment(self, start_date, end_date):
-		create_shift_assignment(
-			self.employee, self.company, self.shift_type, start_date, end_date, self.shift_status, self.name
-		)
-		self.create_shifts_after = end_date
-		self.save()
+		return periods
 
 
 def process_auto_shift_creation():
+	"""Creates the next shift assignments of all the enabled schedules due for creation in one batch"""
 	schedules = frappe.get_all(
 		"Shift Assignment Schedule",
 		filters={"enabled": 1, "create_shifts_after": ["<=", nowdate()]},
-		pluck="name",
+		fields=[
+			"name",
+			"employee",
+			"company",
+			"shift_type",
+			"shift_status",
+			"frequency",
+			"create_shifts_after",
+		],
 	)
-	for d in schedules:
-		doc = frappe.get_doc("Shift Assignment Schedule", d)
-		doc.create_shifts(add_days(doc.create_shifts_after, 1))
+	if not schedules:
+		return
+
+	repeat_on_days = {}
+	for d in frappe.get_all(
+		"Assignment Rule Day",
+		filters={"parenttype": "Shift Assignment Schedule", "parent": ("in", [d.name for d in schedules])},
+		fields=["parent", "day"],
+	):
+		repeat_on_days.setdefault(d.parent, []).append({"day": d.day})
+
+	records = []
+	for schedule in schedules:
+		doc = frappe.get_doc(
+			{
+				"doctype": "Shift Assignment Schedule",
+				**schedule,
+				"repeat_on_days": repeat_on_days.get(schedule.name, []),
+			}
+		)
+		records.extend(doc.get_shift_assignment_records(add_days(schedule.create_shifts_after, 1)))
+
+	created_till, errors = {}, {}
+	for record, result in zip(records, BulkShiftAssignment(records).submit(), strict=True):
+		if result.error:
+			errors.setdefault(record["schedule"], result.error)
+		else:
+			created_till[record["schedule"]] = record["end_date"]
+
+	if created_till:
+		ShiftAssignmentSchedule = frappe.qb.DocType("Shift Assignment Schedule")
+		create_shifts_after = Case()
+		for schedule, end_date in created_till.items():
+			create_shifts_after = create_shifts_after.when(ShiftAssignmentSchedule.name == schedule, end_date)
+
+		(
+			frappe.qb.update(ShiftAssignmentSchedule)
+			.set(ShiftAssignmentSchedule.create_shifts_after, create_shifts_after)
+			.set(ShiftAssignmentSchedule.modified, now_datetime())
+			.where(ShiftAssignmentSchedule.name.isin(list(created_till)))
+		).run()
+
+	for schedule, error in errors.items():
+		frappe.log_error(
+			title=f"Failed to create shifts for Shift Assignment Schedule {schedule}",
+			message=str(error),
+			reference_doctype="Shift Assignment Schedule",
+			reference_name=schedule,
+		)
@@ -1,9 +1,97 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, get_weekday, getdate
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+
+from hrms.hr.doctype.shift_assignment.shift_assignment import ShiftAssignment, clear_shift_assignment_index
+from hrms.hr.doctype.shift_assignment_schedule.shift_assignment_schedule import (
+	process_auto_shift_creation,
+)
+from hrms.hr.doctype.shift_type.test_shift_type import make_shift_assignment, setup_shift_type
 
 
 class TestShiftAssignmentSchedule(IntegrationTestCase):
-	pass
+	def setUp(self):
+		for doctype in ["Shift Assignment", "Shift Assignment Schedule", "Shift Type"]:
+			frappe.db.delete(doctype)
+		clear_shift_assignment_index()
+
+	def test_process_auto_shift_creation(self):
+		shift_type = setup_shift_type(shift_type="Day Shift").name
+		employee = make_employee("test_shift_schedule@example.com", company="_Test Company")
+		other_employee = make_employee("test_shift_schedule_1@example.com", company="_Test Company")
+
+		# a monday, so that shifts are created from tuesday
+		create_shifts_after = getdate("2024-01-01")
+		schedule = make_schedule(employee, shift_type, ["Tuesday", "Wednesday"], create_shifts_after)
+		# already has a shift on the first tuesday, so no shifts are created for this schedule
+		make_shift_assignment(shift_type, other_employee, "2024-01-02", "2024-01-02")
+		failing_schedule = make_schedule(other_employee, shift_type, ["Tuesday"], create_shifts_after)
+
+		process_auto_shift_creation()
+
+		shifts = frappe.get_all(
+			"Shift Assignment",
+			filters={"schedule": schedule.name, "docstatus": 1},
+			fields=["start_date", "end_date"],
+			order_by="start_date",
+		)
+		# tuesday and wednesday of every week, for 90 days
+		self.assertEqual(len(shifts), 13)
+		for shift in shifts:
+			self.assertEqual(get_weekday(shift.start_date), "Tuesday")
+			self.assertEqual(shift.end_date, add_days(shift.start_date, 1))
+
+		schedule.reload()
+		self.assertEqual(schedule.create_shifts_after, shifts[-1].end_date)
+
+		self.assertFalse(frappe.db.exists("Shift Assignment", {"schedule": failing_schedule.name}))
+		failing_schedule.reload()
+		self.assertEqual(failing_schedule.create_shifts_after, create_shifts_after)
+
+	def test_create_shifts_with_doc_events(self):
+		shift_type = setup_shift_type(shift_type="Day Shift").name
+		employee = make_employee("test_shift_schedule@example.com", company="_Test Company")
+		schedule = make_schedule(employee, shift_type, ["Tuesday"], getdate("2024-01-01"))
+		# already has a shift on the third tuesday, so shifts are created till the second one
+		make_shift_assignment(shift_type, employee, "2024-01-16", "2024-01-16")
+
+		# assignments are submitted one at a time when other apps hook into their events
+		with (
+			patch("hrms.hr.doctype.shift_assignment.shift_assignment.has_doc_events", return_value=True),
+			patch.object(ShiftAssignment, "on_submit", create=True) as on_submit,
+		):
+			self.assertRaises(frappe.ValidationError, schedule.create_shifts, "2024-01-02", "2024-01-31")
+
+		self.assertEqual(on_submit.call_count, 2)
+		self.assertEqual(
+			frappe.get_all(
+				"Shift Assignment",
+				filters={"schedule": schedule.name, "docstatus": 1},
+				order_by="start_date",
+				pluck="start_date",
+			),
+			[getdate("2024-01-02"), getdate("2024-01-09")],
+		)
+
+
+def make_schedule(employee: str, shift_type: str, days: list[str], create_shifts_after):
+	return frappe.get_doc(
+		{
+			"doctype": "Shift Assignment Schedule",
+			"frequency": "Every Week",
+			"repeat_on_days": [{"day": day} for day in days],
+			"enabled": 1,
+			"employee": employee,
+			"company": "_Test Company",
+			"shift_type": shift_type,
+			"shift_status": "Active",
+			"create_shifts_after": create_shifts_after,
+		}
+	).insert()
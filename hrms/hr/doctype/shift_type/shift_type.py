@@ -2,26 +2,47 @@
 # For license information, please see license.txt
 
 
+import hashlib
 from datetime import datetime, timedelta
 from itertools import groupby
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cint, create_batch, get_datetime, get_time, getdate
+from frappe.utils import cint, create_batch, get_datetime, get_time, getdate, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
 
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
-from erpnext.setup.doctype.holiday_list.holiday_list import is_holiday
-
-from hrms.hr.doctype.attendance.attendance import mark_attendance
+from hrms.hr.doctype.attendance.attendance import (
+	BulkAttendance,
+	DuplicateAttendanceError,
+	OverlappingShiftAttendanceError,
+)
 from hrms.hr.doctype.employee_checkin.employee_checkin import (
 	calculate_working_hours,
-	mark_attendance_and_link_log,
+	mark_bulk_attendance_and_link_logs,
+)
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	ShiftAssignmentIndex,
+	get_employee_shift,
+	get_shift_details,
 )
-from hrms.hr.doctype.shift_assignment.shift_assignment import get_employee_shift, get_shift_details
 from hrms.utils import get_date_range
-from hrms.utils.holiday_list import get_holiday_dates_between
+from hrms.utils.holiday_list import (
+	get_holiday_dates_for_lists,
+	get_holiday_list_for_employee,
+	is_holiday,
+	resolve_holiday_lists,
+)
 
 EMPLOYEE_CHUNK_SIZE = 50
+CHECKIN_BATCH_SIZE = 1000
+AUTO_ATTENDANCE_SHARD_SIZE = 500
+AUTO_ATTENDANCE_HIGH_WATER_MARK = "auto_attendance_high_water_mark"
+AUTO_ATTENDANCE_INVALIDATED_AT = "auto_attendance_invalidated_at"
+AUTO_ATTENDANCE_JOB_TIMEOUT = 3000
+# a run whose shards have not all finished by then is considered abandoned
+AUTO_ATTENDANCE_RUN_EXPIRY = AUTO_ATTENDANCE_JOB_TIMEOUT + 10 * 60
+AUTO_ATTENDANCE_LOCK_TIMEOUT = 60
 
 
 class ShiftType(Document):
@@ -34,7 +55,86 @@ class ShiftType(Document):
 		):
 			return
 
-		logs = self.get_employee_checkins()
+		run = frappe._dict(
+			process_attendance_after=self.process_attendance_after,
+			last_sync_of_checkin=self.last_sync_of_checkin,
+			started_at=now_datetime(),
+			settings=self.get_settings_hash(),
+		)
+		high_water_mark = self.get_high_water_mark()
+
+		assigned_employees = self.get_assigned_employees(self.process_attendance_after, True)
+		employees = sorted(set(assigned_employees) | set(self.get_employees_with_checkins(high_water_mark)))
+		shards = list(create_batch(employees, AUTO_ATTENDANCE_SHARD_SIZE))
+
+		if not start_auto_attendance_run(self.name, run, max(len(shards), 1), queued=len(shards) > 1):
+			frappe.msgprint(
+				_("Auto attendance of the previous run is still being processed. Please try again later."),
+				alert=True,
+				indicator="orange",
+			)
+			return
+
+		if len(shards) <= 1:
+			try:
+				self.process_auto_attendance_for_employees(employees, assigned_employees, high_water_mark)
+			except Exception:
+				complete_auto_attendance_shard(self.name, run, 0, failed=True)
+				raise
+
+			complete_auto_attendance_shard(self.name, run, 0)
+			return
+
+		# shard by employee so that a large shift is processed by all available workers
+		assigned_employees = set(assigned_employees)
+		for shard, shard_employees in enumerate(shards):
+			frappe.enqueue(
+				process_auto_attendance_for_shard,
+				queue="long",
+				timeout=AUTO_ATTENDANCE_JOB_TIMEOUT,
+				job_id=get_shard_job_id(self.name, shard),
+				deduplicate=True,
+				shift_type=self.name,
+				employees=shard_employees,
+				absent_employees=[employee for employee in shard_employees if employee in assigned_employees],
+				run=run,
+				high_water_mark=high_water_mark,
+				shard=shard,
+				total_shards=len(shards),
+			)
+
+		frappe.msgprint(
+			_("Auto attendance processing has been queued. It may take a few minutes."),
+			alert=True,
+			indicator="blue",
+		)
+
+	def process_auto_attendance_for_employees(
+		self, employees: list[str], absent_employees: list[str], high_water_mark: dict | None = None
+	):
+		"""Marks attendance from the unprocessed checkins of the employees,
+		and marks absent for the `absent_employees` on working days without attendance"""
+		for batch in create_batch(employees, EMPLOYEE_CHUNK_SIZE):
+			shift_attendance = []
+			for logs in self.iter_employee_checkins(batch, high_water_mark):
+				shift_attendance.extend(self.get_shift_attendance(logs))
+
+			mark_bulk_attendance_and_link_logs(shift_attendance)
+
+			# commit after processing checkin logs to avoid losing progress
+			frappe.db.commit()  # nosemgrep
+
+		# mark absent in batches & commit to avoid losing progress
+		# since this tries to process remaining attendance
+		# right from "Process Attendance After" to "Last Sync of Checkin"
+		for batch in create_batch(absent_employees, EMPLOYEE_CHUNK_SIZE):
+			self.mark_absent_for_dates_with_no_attendance(batch)
+
+			frappe.db.commit()  # nosemgrep
+
+	def get_shift_attendance(self, logs: list[dict]) -> list[frappe._dict]:
+		"""Returns the attendance to be marked for the logs, one for each shift they belong to"""
+		shift_attendance = []
 
 		group_key = lambda x: (x["employee"], x["shift_start"])  # noqa
 		for key, group in groupby(sorted(logs, key=group_key), key=group_key):
@@ -54,56 +154,145 @@ class ShiftType(Document):
 				out_time,
 			) = self.get_attendance(single_shift_logs)
 
-			mark_attendance_and_link_log(
-				single_shift_logs,
-				attendance_status,
-				attendance_date,
-				working_hours,
-				late_entry,
-				early_exit,
-				in_time,
-				out_time,
-				self.name,
+			shift_attendance.append(
+				frappe._dict(
+					logs=single_shift_logs,
+					attendance_status=attendance_status,
+					attendance_date=attendance_date,
+					working_hours=working_hours,
+					late_entry=late_entry,
+					early_exit=early_exit,
+					in_time=in_time,
+					out_time=out_time,
+					shift=self.name,
+				)
 			)
 
-		# commit after processing checkin logs to avoid losing progress
-		frappe.db.commit()  # nosemgrep
+		return shift_attendance
 
-		assigned_employees = self.get_assigned_employees(self.process_attendance_after, True)
+	def iter_employee_checkins(self, employees: list[str] | None = None, high_water_mark: dict | None = None):
+		"""Yields the unprocessed checkins of one employee at a time, in chronological order.
+		Checkins are read in pages of `CHECKIN_BATCH_SIZE` using the last (employee, time, name) read
+		as the cursor, so only one page and one employee's logs are held in memory at a time.
+		"""
+		after = None
+		employee_logs = []
+
+		while True:
+			logs = self.get_employee_checkins(employees, high_water_mark, after, CHECKIN_BATCH_SIZE)
+			for log in logs:
+				if employee_logs and employee_logs[0].employee != log.employee:
+					yield employee_logs
+					employee_logs = []
+				employee_logs.append(log)
+
+			if len(logs) < CHECKIN_BATCH_SIZE:
+				break
+
+			after = (logs[-1].employee, logs[-1].time, logs[-1].name)
+
+		if employee_logs:
+			yield employee_logs
+
+	def get_employee_checkins(
+		self,
+		employees: list[str] | None = None,
+		high_water_mark: dict | None = None,
+		after: tuple | None = None,
+		limit: int | None = None,
+	) -> list[dict]:
+		EmployeeCheckin = frappe.qb.DocType("Employee Checkin")
+		query = (
+			frappe.qb.from_(EmployeeCheckin)
+			.select(
+				EmployeeCheckin.name,
+				EmployeeCheckin.employee,
+				EmployeeCheckin.log_type,
+				EmployeeCheckin.time,
+				EmployeeCheckin.shift,
+				EmployeeCheckin.shift_start,
+				EmployeeCheckin.shift_end,
+				EmployeeCheckin.shift_actual_start,
+				EmployeeCheckin.shift_actual_end,
+				EmployeeCheckin.device_id,
+			)
+			.where(self.get_unprocessed_checkins_condition(EmployeeCheckin, high_water_mark))
+			.orderby(EmployeeCheckin.employee)
+			.orderby(EmployeeCheckin.time)
+			.orderby(EmployeeCheckin.name)
+		)
 
-		# mark absent in batches & commit to avoid losing progress since this tries to process remaining attendance
-		# right from "Process Attendance After" to "Last Sync of Checkin"
-		for batch in create_batch(assigned_employees, EMPLOYEE_CHUNK_SIZE):
-			for employee in batch:
-				self.mark_absent_for_dates_with_no_attendance(employee)
+		if employees is not None:
+			query = query.where(EmployeeCheckin.employee.isin(employees or [""]))
+
+		if after:
+			employee, time, name = after
+			query = query.where(
+				(EmployeeCheckin.employee > employee)
+				| (
+					(EmployeeCheckin.employee == employee)
+					& (
+						(EmployeeCheckin.time > time)
+						| ((EmployeeCheckin.time == time) & (EmployeeCheckin.name > name))
+					)
+				)
+			)
 
-			frappe.db.commit()  # nosemgrep
+		if limit:
+			query = query.limit(limit)
 
-	def get_employee_checkins(self) -> list[dict]:
-		return frappe.get_all(
-			"Employee Checkin",
-			fields=[
-				"name",
-				"employee",
-				"log_type",
-				"time",
-				"shift",
-				"shift_start",
-				"shift_end",
-				"shift_actual_start",
-				"shift_actual_end",
-				"device_id",
-			],
-			filters={
-				"skip_auto_attendance": 0,
-				"attendance": ("is", "not set"),
-				"time": (">=", self.process_attendance_after),
-				"shift_actual_end": ("<", self.last_sync_of_checkin),
-				"shift": self.name,
-			},
-			order_by="employee,time",
+		return query.run(as_dict=True)
+
+	def get_employees_with_checkins(self, high_water_mark: dict | None = None) -> list[str]:
+		EmployeeCheckin = frappe.qb.DocType("Employee Checkin")
+		return (
+			frappe.qb.from_(EmployeeCheckin)
+			.select(EmployeeCheckin.employee)
+			.distinct()
+			.where(self.get_unprocessed_checkins_condition(EmployeeCheckin, high_water_mark))
+		).run(pluck=True)
+
+	def get_unprocessed_checkins_condition(self, EmployeeCheckin, high_water_mark: dict | None = None):
+		condition = (
+			(EmployeeCheckin.skip_auto_attendance == 0)
+			& (EmployeeCheckin.attendance.isnull() | (EmployeeCheckin.attendance == ""))
+			& (EmployeeCheckin.time >= self.process_attendance_after)
+			& (EmployeeCheckin.shift_actual_end < self.last_sync_of_checkin)
+			& (EmployeeCheckin.shift == self.name)
 		)
 
+		if high_water_mark:
+			# logs of shifts that ended before the last processed sync were already seen by a previous run,
+			# unless they were created or changed after it started
+			condition &= (EmployeeCheckin.shift_actual_end >= high_water_mark.last_sync_of_checkin) | (
+				EmployeeCheckin.modified >= high_water_mark.started_at
+			)
+
+		return condition
+
+	def get_high_water_mark(self) -> frappe._dict | None:
+		"""Returns the last completed auto attendance run of this shift,
+		if it is still valid for the current processing window and settings, and no shift assignments
+		or holidays have changed since it started"""
+		high_water_mark = frappe.cache().hget(AUTO_ATTENDANCE_HIGH_WATER_MARK, self.name)
+		if (
+			high_water_mark
+			and getdate(high_water_mark.process_attendance_after) == getdate(self.process_attendance_after)
+			and get_datetime(high_water_mark.last_sync_of_checkin) <= get_datetime(self.last_sync_of_checkin)
+			and high_water_mark.settings == self.get_settings_hash()
+			and not is_high_water_mark_invalidated(self.name, high_water_mark)
+		):
+			return high_water_mark
+
+		return None
+
+	def get_settings_hash(self) -> str:
+		"""Returns a hash of the shift's settings,
+		except the last sync of checkins that moves with every sync"""
+		settings = self.as_dict(no_default_fields=True)
+		settings.pop("last_sync_of_checkin", None)
+		return hashlib.sha256(frappe.as_json(settings).encode()).hexdigest()
+
 	def get_attendance(self, logs):
 		"""Return attendance_status, working_hours, late_entry, early_exit, in_time, out_time
 		for a set of logs belonging to a single shift.
@@ -143,61 +332,113 @@ class ShiftType(Document):
 
 		return "Present", total_working_hours, late_entry, early_exit, in_time, out_time
 
-	def mark_absent_for_dates_with_no_attendance(self, employee: str):
-		"""Marks Absents for the given employee on working days in this shift that have no attendance marked.
+	def mark_absent_for_dates_with_no_attendance(self, employees: str | list[str]):
+		"""Marks Absents for the given employees on working days in this shift that have no attendance marked.
 		The Absent status is marked starting from 'process_attendance_after' or employee creation date.
 		"""
-		start_time = get_time(self.start_time)
-		dates = self.get_dates_for_attendance(employee)
-
-		for date in dates:
-			timestamp = datetime.combine(date, start_time)
-			shift_details = get_employee_shift(employee, timestamp, True)
-
-			if shift_details and shift_details.shift_type.name == self.name:
-				attendance = mark_attendance(employee, date, "Absent", self.name)
+		if isinstance(employees, str):
+			employees = [employees]
+
+		records = [
+			{
+				"employee": employee,
+				"attendance_date": date,
+				"status": "Absent",
+				"shift": self.name,
+				"comment": _("Employee was marked Absent due to missing Employee Checkins."),
+			}
+			for employee, date in self.get_dates_for_attendance(employees)
+		]
+
+		for result in BulkAttendance(records).submit():
+			# skip dates that already have attendance, same as `mark_attendance`
+			if result.error and not isinstance(
+				result.error, DuplicateAttendanceError | OverlappingShiftAttendanceError
+			):
+				raise result.error
+
+	def get_dates_for_attendance(self, employees: list[str]) -> list[tuple]:
+		"""Returns (employee, date) for the working days of the employees in this shift without attendance.
+		The dates in each employee's window, less holidays and marked attendance, are computed for all
+		the employees together from a handful of queries."""
+		shift_assignments = ShiftAssignmentIndex(employees)
+		employee_details = self.get_employee_details(employees)
+
+		date_ranges = {}
+		for employee in employees:
+			start_date, end_date = self.get_start_and_end_dates(
+				employee, employee_details.get(employee), shift_assignments
+			)
 
-				if not attendance:
-					continue
+			# no shift assignment found, no need to process absent attendance records
+			if start_date is not None and start_date <= end_date:
+				date_ranges[employee] = (start_date, end_date)
 
-				frappe.get_doc(
-					{
-						"doctype": "Comment",
-						"comment_type": "Comment",
-						"reference_doctype": "Attendance",
-						"reference_name": attendance,
-						"content": frappe._("Employee was marked Absent due to missing Employee Checkins."),
-					}
-				).insert(ignore_permissions=True)
-
-	def get_dates_for_attendance(self, employee: str) -> list[str]:
-		start_date, end_date = self.get_start_and_end_dates(employee)
-
-		# no shift assignment found, no need to process absent attendance records
-		if start_date is None:
+		if not date_ranges:
 			return []
 
-		date_range = get_date_range(start_date, end_date)
+		from_date = min(start_date for start_date, end_date in date_ranges.values())
+		to_date = max(end_date for start_date, end_date in date_ranges.values())
 
 		# skip marking absent on holidays
-		holiday_list = self.get_holiday_list(employee)
-		holiday_dates = get_holiday_dates_between(holiday_list, start_date, end_date)
+		if self.holiday_list:
+			holiday_list_for_employee = dict.fromkeys(date_ranges, self.holiday_list)
+		else:
+			holiday_list_for_employee = resolve_holiday_lists(list(date_ranges))
+		holidays = get_holiday_dates_for_lists(
+			set(filter(None, holiday_list_for_employee.values())), from_date, to_date
+		)
 		# skip dates with attendance
-		marked_attendance_dates = self.get_marked_attendance_dates_between(employee, start_date, end_date)
+		marked_attendance_dates = self.get_marked_attendance_dates_between(
+			list(date_ranges), from_date, to_date
+		)
 
-		return sorted(set(date_range) - set(holiday_dates) - set(marked_attendance_dates))
+		start_time = get_time(self.start_time)
+		dates = []
+		for employee, (start_date, end_date) in date_ranges.items():
+			holiday_dates = set(holidays.get(holiday_list_for_employee.get(employee), []))
+
+			for date in get_date_range(start_date, end_date):
+				date = getdate(date)
+				if date in holiday_dates or (employee, date) in marked_attendance_dates:
+					continue
 
-	def get_start_and_end_dates(self, employee):
+				# skip dates on which the employee is working another shift
+				shift_details = get_employee_shift(
+					employee, datetime.combine(date, start_time), True, shift_assignments=shift_assignments
+				)
+				if shift_details and shift_details.shift_type.name == self.name:
+					dates.append((employee, date))
+
+		return dates
+
+	def get_employee_details(self, employees: list[str]) -> dict[str, dict]:
+		return {
+			employee.name: employee
+			for employee in frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "date_of_joining", "relieving_date", "creation"],
+			)
+		}
+
+	def get_start_and_end_dates(
+		self,
+		employee: str,
+		employee_details: dict | None = None,
+		shift_assignments: ShiftAssignmentIndex | None = None,
+	):
 		"""Returns start and end dates for checking attendance and marking absent
 		return: start date = max of `process_attendance_after` and DOJ
 		return: end date = min of shift before `last_sync_of_checkin` and Relieving Date
 		"""
-		date_of_joining, relieving_date, employee_creation = frappe.get_cached_value(
-			"Employee", employee, ["date_of_joining", "relieving_date", "creation"]
-		)
+		if not employee_details:
+			employee_details = frappe.get_cached_value(
+				"Employee", employee, ["date_of_joining", "relieving_date", "creation"], as_dict=True
+			)
 
-		if not date_of_joining:
-			date_of_joining = employee_creation.date()
+		date_of_joining = employee_details.date_of_joining or get_datetime(employee_details.creation).date()
+		relieving_date = employee_details.relieving_date
 
 		start_date = max(getdate(self.process_attendance_after), date_of_joining)
 		end_date = None
@@ -209,7 +450,9 @@ class ShiftType(Document):
 
 		# check if shift is found for 1 day before the last sync of checkin
 		# absentees are auto-marked 1 day after the shift to wait for any manual attendance records
-		prev_shift = get_employee_shift(employee, last_shift_time - timedelta(days=1), True, "reverse")
+		prev_shift = get_employee_shift(
+			employee, last_shift_time - timedelta(days=1), True, "reverse", shift_assignments
+		)
 		if prev_shift and prev_shift.shift_type.name == self.name:
 			end_date = (
 				min(prev_shift.start_datetime.date(), relieving_date)
@@ -221,18 +464,23 @@ class ShiftType(Document):
 			return None, None
 		return start_date, end_date
 
-	def get_marked_attendance_dates_between(self, employee: str, start_date: str, end_date: str) -> list[str]:
+	def get_marked_attendance_dates_between(
+		self, employees: list[str], start_date: str, end_date: str
+	) -> set[tuple]:
+		"""Returns (employee, date) of attendance marked for the employees without a shift or in this shift"""
 		Attendance = frappe.qb.DocType("Attendance")
-		return (
+		attendance = (
 			frappe.qb.from_(Attendance)
-			.select(Attendance.attendance_date)
+			.select(Attendance.employee, Attendance.attendance_date)
 			.where(
-				(Attendance.employee == employee)
+				(Attendance.employee.isin(employees))
 				& (Attendance.docstatus < 2)
 				& (Attendance.attendance_date.between(start_date, end_date))
 				& ((Attendance.shift.isnull()) | (Attendance.shift == self.name))
 			)
-		).run(pluck=True)
+		).run()
+
+		return {(employee, getdate(attendance_date)) for employee, attendance_date in attendance}
 
 	def get_assigned_employees(self, from_date=None, consider_default_shift=False) -> list[str]:
 		filters = {"shift_type": self.name, "docstatus": "1", "status": "Active"}
@@ -286,9 +534,159 @@ class ShiftType(Document):
 			return False
 		return True
 
+	def on_trash(self):
+		frappe.cache().hdel(AUTO_ATTENDANCE_HIGH_WATER_MARK, self.name)
+		frappe.cache().hdel(AUTO_ATTENDANCE_INVALIDATED_AT, self.name)
+
 
 def process_auto_attendance_for_all_shifts():
+	"""Enqueues auto attendance for every shift separately,
+	so that a large shift does not hold up the others"""
 	shift_list = frappe.get_all("Shift Type", filters={"enable_auto_attendance": "1"}, pluck="name")
 	for shift in shift_list:
-		doc = frappe.get_cached_doc("Shift Type", shift)
-		doc.process_auto_attendance()
+		frappe.enqueue(
+			process_auto_attendance_for_shift,
+			queue="long",
+			timeout=AUTO_ATTENDANCE_JOB_TIMEOUT,
+			job_id=f"process_auto_attendance::{shift}",
+			deduplicate=True,
+			shift_type=shift,
+		)
+
+
+def process_auto_attendance_for_shift(shift_type: str):
+	frappe.get_doc("Shift Type", shift_type).process_auto_attendance()
+
+
+def process_auto_attendance_for_shard(
+	shift_type: str,
+	employees: list[str],
+	absent_employees: list[str],
+	run: dict,
+	high_water_mark: dict | None,
+	shard: int,
+	total_shards: int,
+):
+	doc = frappe.get_doc("Shift Type", shift_type)
+	# process the window the run was started with, even if the shift has been synced since
+	doc.process_attendance_after = run.process_attendance_after
+	doc.last_sync_of_checkin = run.last_sync_of_checkin
+
+	try:
+		doc.process_auto_attendance_for_employees(employees, absent_employees, high_water_mark)
+	except Exception:
+		frappe.db.rollback()
+		doc.log_error(_("Auto attendance failed for shard {0} of {1}").format(shard + 1, total_shards))
+		complete_auto_attendance_shard(shift_type, run, shard, failed=True)
+		return
+
+	complete_auto_attendance_shard(shift_type, run, shard)
+
+
+def get_shard_job_id(shift_type: str, shard: int) -> str:
+	return f"process_auto_attendance::{shift_type}::{shard}"
+
+
+def get_run_status_key(shift_type: str) -> str:
+	return f"auto_attendance_run_status:{shift_type}"
+
+
+def get_auto_attendance_lock(shift_type: str):
+	"""Returns a lock on the auto attendance run status of the shift, shared by all workers"""
+	cache = frappe.cache()
+	name = cache.make_key(f"auto_attendance_lock:{shift_type}")
+	return cache.lock(name, timeout=AUTO_ATTENDANCE_LOCK_TIMEOUT)
+
+
+def start_auto_attendance_run(shift_type: str, run: dict, total_shards: int, queued: bool = False) -> bool:
+	"""Records the start of a run with the given number of shards, processed by background jobs if `queued`.
+	Returns False without starting it if shards of the previous run are still pending"""
+	key = get_run_status_key(shift_type)
+	with get_auto_attendance_lock(shift_type):
+		if is_auto_attendance_run_pending(shift_type, frappe.cache().get_value(key, expires=True)):
+			return False
+
+		status = frappe._dict(
+			started_at=run.started_at, total_shards=total_shards, queued=queued, done=set(), failed=set()
+		)
+		frappe.cache().set_value(key, status, expires_in_sec=AUTO_ATTENDANCE_RUN_EXPIRY)
+
+	return True
+
+
+def is_auto_attendance_run_pending(shift_type: str, status: dict | None) -> bool:
+	"""Returns True if the run has unfinished shards that are still queued or running.
+	Shards whose jobs were killed or deduplicated away never finish, so the run is abandoned"""
+	if not status:
+		return False
+
+	if not status.queued:
+		# processed by the job that started the run, the status expires soon after the job times out
+		return True
+
+	finished = status.done | status.failed
+	return any(
+		is_job_enqueued(get_shard_job_id(shift_type, shard))
+		for shard in range(status.total_shards)
+		if shard not in finished
+	)
+
+
+def complete_auto_attendance_shard(shift_type: str, run: dict, shard: int, failed: bool = False):
+	"""Records a finished shard. Once all shards of the run have finished without failures,
+	advances the high-water mark. With a failed shard, the next run processes the same window again"""
+	key = get_run_status_key(shift_type)
+	with get_auto_attendance_lock(shift_type):
+		status = frappe.cache().get_value(key, expires=True)
+		if not status or status.started_at != run.started_at:
+			# the run was abandoned
+			return
+
+		(status.failed if failed else status.done).add(shard)
+		if len(status.done) + len(status.failed) < status.total_shards:
+			frappe.cache().set_value(key, status, expires_in_sec=AUTO_ATTENDANCE_RUN_EXPIRY)
+			return
+
+		frappe.cache().delete_value(key)
+
+	if not status.failed:
+		set_high_water_mark(shift_type, run)
+
+
+def set_high_water_mark(shift_type: str, run: dict):
+	"""Sets the high-water mark once the run is committed, so that a run that is not committed
+	is processed again"""
+	frappe.db.after_commit.add(lambda: frappe.cache().hset(AUTO_ATTENDANCE_HIGH_WATER_MARK, shift_type, run))
+
+
+def is_high_water_mark_invalidated(shift_type: str, high_water_mark: dict) -> bool:
+	invalidated_at = frappe.cache().hget(AUTO_ATTENDANCE_INVALIDATED_AT, shift_type)
+	# high-water marks of all the shifts are invalidated under an empty shift type
+	all_invalidated_at = frappe.cache().hget(AUTO_ATTENDANCE_INVALIDATED_AT, "")
+
+	return any(
+		date and get_datetime(date) >= get_datetime(high_water_mark.started_at)
+		for date in (invalidated_at, all_invalidated_at)
+	)
+
+
+def invalidate_high_water_marks(shift_types: list[str] | set[str] | None = None):
+	"""Invalidates high-water marks of runs of the shifts, of all shifts if none are given,
+	that started before the current transaction is committed"""
+
+	def invalidate():
+		invalidated_at = now_datetime()
+		for shift_type in shift_types or [""]:
+			frappe.cache().hset(AUTO_ATTENDANCE_INVALIDATED_AT, shift_type, invalidated_at)
+
+	frappe.db.after_commit.add(invalidate)
+
+
+def invalidate_high_water_marks_for_holidays(doc, method=None):
+	"""Invalidates high-water marks of all shifts on changes to holidays, so that checkins skipped
+	as holidays are processed again"""
+	fieldname = {"Employee": "holiday_list", "Company": "default_holiday_list"}.get(doc.doctype)
+	if fieldname and not (doc.get_doc_before_save() and doc.has_value_changed(fieldname)):
+		return
+
+	invalidate_high_water_marks()
@@ -4,12 +4,21 @@ from datetime import datetime, timedelta
 
 import frappe
 from frappe.tests import IntegrationTestCase
-from frappe.utils import add_days, get_time, get_year_ending, get_year_start, getdate, now_datetime
+from frappe.utils import (
+	add_days,
+	get_datetime,
+	get_time,
+	get_year_ending,
+	get_year_start,
+	getdate,
+	now_datetime,
+)
 
 from erpnext.setup.doctype.employee.test_employee import make_employee
 from erpnext.setup.doctype.holiday_list.test_holiday_list import set_holiday_list
 
 from hrms.hr.doctype.leave_application.test_leave_application import get_first_sunday
+from hrms.hr.doctype.shift_assignment.shift_assignment import clear_shift_assignment_index
 from hrms.payroll.doctype.salary_slip.test_salary_slip import make_holiday_list
 from hrms.tests.test_utils import add_date_to_holiday_list
 
@@ -18,6 +27,7 @@ class TestShiftType(IntegrationTestCase):
 	def setUp(self):
 		frappe.db.delete("Shift Type")
 		frappe.db.delete("Shift Assignment")
+		clear_shift_assignment_index()
 		frappe.db.delete("Employee Checkin")
 		frappe.db.delete("Attendance")
 
@@ -49,6 +59,89 @@ class TestShiftType(IntegrationTestCase):
 		)
 		self.assertEqual(attendance, "Present")
 
+	def test_process_auto_attendance_in_pages_with_high_water_mark(self):
+		from hrms.hr.doctype.employee_checkin.test_employee_checkin import make_checkin
+
+		employee1 = make_employee("test_employee_checkin@example.com", company="_Test Company")
+		employee2 = make_employee("test_employee_checkin_2@example.com", company="_Test Company")
+
+		shift_type = setup_shift_type()
+		date = getdate()
+		for employee in (employee1, employee2):
+			make_shift_assignment(shift_type.name, employee, date)
+			make_checkin(employee, datetime.combine(date, get_time("08:00:00")))
+			make_checkin(employee, datetime.combine(date, get_time("12:00:00")))
+
+		# page through the checkins one at a time using the last (employee, time, name) as the cursor
+		logs, after = [], None
+		while page := shift_type.get_employee_checkins(after=after, limit=1):
+			logs.extend(page)
+			after = (page[-1].employee, page[-1].time, page[-1].name)
+
+		self.assertEqual(len(logs), 4)
+		self.assertEqual(logs, shift_type.get_employee_checkins())
+		self.assertEqual(
+			[[log.employee for log in group] for group in shift_type.iter_employee_checkins()],
+			[[logs[0].employee] * 2, [logs[2].employee] * 2],
+		)
+
+		# the high-water mark is set once the run is committed,
+		# and is invalidated by shift assignments committed before the run started
+		frappe.db.after_commit.run()
+		shift_type.process_auto_attendance()
+		frappe.db.after_commit.run()
+		high_water_mark = shift_type.get_high_water_mark()
+		self.assertEqual(
+			get_datetime(high_water_mark.last_sync_of_checkin), get_datetime(shift_type.last_sync_of_checkin)
+		)
+		self.assertEqual(shift_type.get_employee_checkins(high_water_mark=high_water_mark), [])
+
+		# cancelling the attendance unlinks the checkins, which are picked up again by the next run
+		attendance = frappe.get_doc(
+			"Attendance", {"employee": employee1, "shift": shift_type.name, "docstatus": 1}
+		)
+		attendance.cancel()
+		self.assertEqual(len(shift_type.get_employee_checkins(high_water_mark=high_water_mark)), 2)
+
+		shift_type.process_auto_attendance()
+		self.assertTrue(
+			frappe.db.exists("Attendance", {"employee": employee1, "shift": shift_type.name, "docstatus": 1})
+		)
+
+		# changes to shift assignments or the shift invalidate the high-water mark
+		frappe.db.after_commit.run()
+		self.assertIsNotNone(shift_type.get_high_water_mark())
+		employee3 = make_employee("test_employee_checkin_3@example.com", company="_Test Company")
+		make_shift_assignment(shift_type.name, employee3, date)
+		frappe.db.after_commit.run()
+		self.assertIsNone(shift_type.get_high_water_mark())
+
+		shift_type.process_auto_attendance()
+		frappe.db.after_commit.run()
+		self.assertIsNotNone(shift_type.get_high_water_mark())
+		shift_type.early_exit_grace_period = 15
+		self.assertIsNone(shift_type.get_high_water_mark())
+
+	def test_abandoned_auto_attendance_run(self):
+		from hrms.hr.doctype.shift_type.shift_type import (
+			get_run_status_key,
+			is_auto_attendance_run_pending,
+			start_auto_attendance_run,
+		)
+
+		shift_type = setup_shift_type()
+		run = frappe._dict(started_at=now_datetime())
+		self.assertTrue(start_auto_attendance_run(shift_type.name, run, 2, queued=True))
+
+		# shards of the previous run are not queued, so it does not block the next one
+		status = frappe.cache().get_value(get_run_status_key(shift_type.name), expires=True)
+		self.assertFalse(is_auto_attendance_run_pending(shift_type.name, status))
+		self.assertTrue(start_auto_attendance_run(shift_type.name, run, 1))
+
+		# a run processed by the job that started it blocks the next one till it finishes or expires
+		self.assertFalse(start_auto_attendance_run(shift_type.name, run, 1))
+		frappe.cache().delete_value(get_run_status_key(shift_type.name))
+
 	def test_mark_attendance_with_different_shift_start_time(self):
 		"""Tests whether attendance is marked correctly if shift configuration is changed midway"""
 		from hrms.hr.doctype.employee_checkin.test_employee_checkin import make_checkin
@@ -340,6 +433,44 @@ class TestShiftType(IntegrationTestCase):
 		)
 		self.assertIsNone(todays_attendance)
 
+	def test_mark_absent_for_multiple_employees(self):
+		from hrms.hr.doctype.attendance.attendance import mark_attendance
+
+		employee1 = make_employee("test_employee_checkin@example.com", company="_Test Company")
+		employee2 = make_employee("test_employee_checkin_2@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(
+			shift_type="Test Absent with no Attendance",
+			process_attendance_after=add_days(today, -6),
+			last_sync_of_checkin=f"{today} 15:00:00",
+			holiday_list=self.holiday_list,
+		)
+
+		add_date_to_holiday_list(add_days(today, -3), self.holiday_list)
+		holidays = frappe.get_all("Holiday", filters={"parent": self.holiday_list}, pluck="holiday_date")
+
+		for employee in (employee1, employee2):
+			make_shift_assignment(shift_type.name, employee, add_days(today, -5))
+		mark_attendance(employee2, add_days(today, -2), "Present", shift_type.name)
+
+		# absent from the assignment till yesterday, except on holidays and dates with attendance
+		expected = {
+			(employee, date)
+			for employee in (employee1, employee2)
+			for date in (add_days(today, -days) for days in range(5, 0, -1))
+			if date not in holidays and (employee, date) != (employee2, add_days(today, -2))
+		}
+		self.assertEqual(set(shift_type.get_dates_for_attendance([employee1, employee2])), expected)
+
+		shift_type.mark_absent_for_dates_with_no_attendance([employee1, employee2])
+		absent_records = frappe.get_all(
+			"Attendance",
+			filters={"employee": ("in", [employee1, employee2]), "status": "Absent", "docstatus": 1},
+			fields=["employee", "attendance_date"],
+			as_list=True,
+		)
+		self.assertEqual(set(absent_records), expected)
+
 	def test_mark_absent_for_dates_with_no_attendance_for_midnight_shift(self):
 		employee = make_employee("test_employee_checkin@example.com", company="_Test Company")
 		today = getdate()
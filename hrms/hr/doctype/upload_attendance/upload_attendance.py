@@ -10,9 +10,11 @@ from frappe.model.document import Document
 from frappe.utils import add_days, cstr, date_diff, getdate
 from frappe.utils.csvutils import UnicodeWriter
 
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
-
-from hrms.hr.utils import get_holiday_dates_for_employee
+from hrms.utils.holiday_list import (
+	get_holiday_dates_for_lists,
+	get_holiday_list_for_employee,
+	resolve_holiday_lists,
+)
 
 
 class UploadAttendance(Document):
@@ -66,7 +68,7 @@ def add_data(w, args):
 def get_data(args):
 	dates = get_dates(args)
 	employees = get_active_employees()
-	holidays = get_holidays_for_employees(
+	holiday_list_for_employee, holidays = get_holidays_for_employees(
 		[employee.name for employee in employees], args["from_date"], args["to_date"]
 	)
 	existing_attendance_records = get_existing_attendance_records(args)
@@ -87,7 +89,7 @@ def get_data(args):
 			):
 				existing_attendance = existing_attendance_records[tuple([getdate(date), employee.name])]
 
-			employee_holiday_list = get_holiday_list_for_employee(employee.name)
+			employee_holiday_list = holiday_list_for_employee.get(employee.name)
 
 			row = [
 				existing_attendance and existing_attendance.name or "",
@@ -107,14 +109,20 @@ def get_data(args):
 
 
 def get_holidays_for_employees(employees, from_date, to_date):
-	holidays = {}
+	holiday_list_for_employee = resolve_holiday_lists(employees)
 	for employee in employees:
-		holiday_list = get_holiday_list_for_employee(employee)
-		holiday = get_holiday_dates_for_employee(employee, getdate(from_date), getdate(to_date))
-		if holiday_list not in holidays:
-			holidays[holiday_list] = holiday
-
-	return holidays
+		if not holiday_list_for_employee.get(employee):
+			# throws if the company has no default holiday list either
+			get_holiday_list_for_employee(employee)
+
+	holidays = {
+		holiday_list: [cstr(holiday) for holiday in dates]
+		for holiday_list, dates in get_holiday_dates_for_lists(
+			set(holiday_list_for_employee.values()), from_date, to_date
+		).items()
+	}
+
+	return holiday_list_for_employee, holidays
 
 
 def writedata(w, data):
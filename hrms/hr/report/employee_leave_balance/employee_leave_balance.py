@@ -2,31 +2,78 @@
 # For license information, please see license.txt
 
 
+import datetime
+import hashlib
 from itertools import groupby
 
 import frappe
 from frappe import _
-from frappe.utils import add_days, cint, flt, getdate
+from frappe.query_builder.functions import Max
+from frappe.utils import add_days, cint, create_batch, date_diff, flt, getdate
 
-from hrms.hr.doctype.leave_allocation.leave_allocation import get_previous_allocation
 from hrms.hr.doctype.leave_application.leave_application import (
-	get_leave_balance_on,
-	get_leaves_for_period,
+	get_leave_balances_on,
+	get_leaves_for_employee_periods,
+	get_leaves_for_periods,
 )
 
 Filters = frappe._dict
 
+EMPLOYEE_BATCH_SIZE = 500
+# employee and leave type pairs times years in the range, above which the report is prepared in the background
+BACKGROUND_REPORT_THRESHOLD = 20000
+EMPLOYEE_LEAVE_BALANCE_DATA = "employee_leave_balance_data"
+EMPLOYEE_LEAVE_BALANCE_DATA_EXPIRY = 60 * 60
+
 
 def execute(filters: Filters | None = None) -> tuple:
 	if filters.to_date <= filters.from_date:
 		frappe.throw(_('"From Date" can not be greater than or equal to "To Date"'))
 
 	columns = get_columns()
-	data = get_data(filters)
+	if is_large_report(filters):
+		data = get_prepared_data(filters)
+		if data is None:
+			message = _("The report is being prepared in the background. Refresh in a few minutes.")
+			return columns, [], message, None
+	else:
+		data = get_data(filters)
+
 	charts = get_chart_data(data, filters)
 	return columns, data, None, charts
 
 
+def is_large_report(filters: Filters) -> bool:
+	years = date_diff(filters.to_date, filters.from_date) // 365 + 1
+	return len(get_employees(filters)) * len(get_leave_types()) * years > BACKGROUND_REPORT_THRESHOLD
+
+
+def get_prepared_data(filters: Filters) -> list | None:
+	"""Returns the report data prepared in the background for the filters,
+	or enqueues preparing it and returns None if it is not ready yet"""
+	key = hashlib.sha256(frappe.as_json(filters).encode()).hexdigest()
+	if (data := frappe.cache().get_value(f"{EMPLOYEE_LEAVE_BALANCE_DATA}:{key}")) is not None:
+		return data
+
+	frappe.enqueue(
+		prepare_data,
+		queue="long",
+		timeout=3000,
+		job_id=f"{EMPLOYEE_LEAVE_BALANCE_DATA}::{key}",
+		deduplicate=True,
+		filters=filters,
+		key=key,
+	)
+
+
+def prepare_data(filters: dict, key: str):
+	frappe.cache().set_value(
+		f"{EMPLOYEE_LEAVE_BALANCE_DATA}:{key}",
+		get_data(Filters(filters)),
+		expires_in_sec=EMPLOYEE_LEAVE_BALANCE_DATA_EXPIRY,
+	)
+
+
 def get_columns() -> list[dict]:
 	return [
 		{
@@ -91,6 +138,10 @@ def get_data(filters: Filters) -> list:
 	consolidate_leave_types = len(active_employees) > 1 and filters.consolidate_leave_types
 	row = None
 
+	leave_balances = {}
+	for employees in create_batch([employee.name for employee in active_employees], EMPLOYEE_BATCH_SIZE):
+		leave_balances.update(get_leave_balances(employees, leave_types, filters))
+
 	data = []
 
 	for leave_type in leave_types:
@@ -108,21 +159,15 @@ def get_data(filters: Filters) -> list:
 			row.employee = employee.name
 			row.employee_name = employee.employee_name
 
-			leaves_taken = (
-				get_leaves_for_period(employee.name, leave_type, filters.from_date, filters.to_date) * -1
-			)
+			balance = leave_balances[(employee.name, leave_type)]
+			leaves_taken = balance.leaves_taken
 
-			new_allocation, expired_leaves, carry_forwarded_leaves = get_allocated_and_expired_leaves(
-				filters.from_date, filters.to_date, employee.name, leave_type
-			)
-			opening = get_opening_balance(employee.name, leave_type, filters, carry_forwarded_leaves)
-
-			row.leaves_allocated = flt(new_allocation, precision)
-			row.leaves_expired = flt(expired_leaves, precision)
-			row.opening_balance = flt(opening, precision)
+			row.leaves_allocated = flt(balance.new_allocation, precision)
+			row.leaves_expired = flt(balance.expired_leaves, precision)
+			row.opening_balance = flt(balance.opening, precision)
 			row.leaves_taken = flt(leaves_taken, precision)
 
-			closing = new_allocation + opening - (row.leaves_expired + leaves_taken)
+			closing = balance.new_allocation + balance.opening - (row.leaves_expired + leaves_taken)
 			row.closing_balance = flt(closing, precision)
 			row.indent = 1
 			data.append(row)
@@ -130,6 +175,36 @@ def get_data(filters: Filters) -> list:
 	return data
 
 
+def get_leave_balances(employees: list[str], leave_types: list[str], filters: Filters) -> dict[tuple, dict]:
+	"""Returns opening balance, new allocation, expired and taken leaves
+	of each (employee, leave type) pair, from grouped ledger queries for all the pairs"""
+	employee_leave_types = [(employee, leave_type) for leave_type in leave_types for employee in employees]
+	if not employee_leave_types:
+		return {}
+
+	leaves_for_period = get_leaves_for_periods(employee_leave_types, filters.from_date, filters.to_date)
+	allocated_and_expired_leaves = get_allocated_and_expired_leaves(
+		filters.from_date, filters.to_date, employees, leave_types
+	)
+	opening_balances = get_opening_balances(
+		employee_leave_types,
+		filters,
+		{key: d.carry_forwarded_leaves for key, d in allocated_and_expired_leaves.items()},
+	)
+
+	leave_balances = {}
+	for key in employee_leave_types:
+		allocated = allocated_and_expired_leaves.get(key, frappe._dict())
+		leave_balances[key] = frappe._dict(
+			leaves_taken=leaves_for_period[key] * -1,
+			new_allocation=allocated.get("new_allocation", 0),
+			expired_leaves=allocated.get("expired_leaves", 0),
+			opening=opening_balances[key],
+		)
+
+	return leave_balances
+
+
 def get_leave_types() -> list[str]:
 	LeaveType = frappe.qb.DocType("Leave Type")
 	return (frappe.qb.from_(LeaveType).select(LeaveType.name).orderby(LeaveType.name)).run(pluck="name")
@@ -156,62 +231,101 @@ def get_employees(filters: Filters) -> list[dict]:
 	return query.run(as_dict=True)
 
 
-def get_opening_balance(
-	employee: str, leave_type: str, filters: Filters, carry_forwarded_leaves: float
-) -> float:
+def get_opening_balances(
+	employee_leave_types: list[tuple[str, str]], filters: Filters, carry_forwarded_leaves: dict[tuple, float]
+) -> dict[tuple, float]:
 	# allocation boundary condition
 	# opening balance is the closing leave balance 1 day before the filter start date
-	opening_balance_date = add_days(filters.from_date, -1)
-	allocation = get_previous_allocation(filters.from_date, leave_type, employee)
-
-	if (
-		allocation
-		and allocation.get("to_date")
-		and opening_balance_date
-		and getdate(allocation.get("to_date")) == getdate(opening_balance_date)
-	):
-		# if opening balance date is same as the previous allocation's expiry
-		# then opening balance should only consider carry forwarded leaves
-		opening_balance = carry_forwarded_leaves
-	else:
-		# else directly get leave balance on the previous day
-		opening_balance = get_leave_balance_on(employee, leave_type, opening_balance_date)
+	opening_balance_date = getdate(add_days(filters.from_date, -1))
+	previous_allocation_end = get_previous_allocation_end_dates(employee_leave_types, filters.from_date)
+
+	opening_balances = {}
+	for key in employee_leave_types:
+		if previous_allocation_end.get(key) == opening_balance_date:
+			# if opening balance date is same as the previous allocation's expiry
+			# then opening balance should only consider carry forwarded leaves
+			opening_balances[key] = carry_forwarded_leaves.get(key, 0)
+
+	# else directly get leave balance on the previous day
+	opening_balances.update(
+		get_leave_balances_on(
+			[key for key in employee_leave_types if key not in opening_balances], opening_balance_date
+		)
+	)
 
-	return opening_balance
+	return opening_balances
 
 
-def get_allocated_and_expired_leaves(
-	from_date: str, to_date: str, employee: str, leave_type: str
-) -> tuple[float, float, float]:
-	new_allocation = 0
-	expired_leaves = 0
-	carry_forwarded_leaves = 0
+def get_previous_allocation_end_dates(
+	employee_leave_types: list[tuple[str, str]], from_date: str
+) -> dict[tuple, datetime.date]:
+	"""Returns the end date of the last allocation before the given date, by (employee, leave type)"""
+	employees = list({employee for employee, leave_type in employee_leave_types})
+	leave_types = list({leave_type for employee, leave_type in employee_leave_types})
+	if not employees:
+		return {}
 
-	records = get_leave_ledger_entries(from_date, to_date, employee, leave_type)
+	Allocation = frappe.qb.DocType("Leave Allocation")
+	allocations = (
+		frappe.qb.from_(Allocation)
+		.select(Allocation.employee, Allocation.leave_type, Max(Allocation.to_date).as_("to_date"))
+		.where(
+			(Allocation.employee.isin(employees))
+			& (Allocation.leave_type.isin(leave_types))
+			& (Allocation.to_date < from_date)
+			& (Allocation.docstatus == 1)
+		)
+		.groupby(Allocation.employee, Allocation.leave_type)
+	).run(as_dict=True)
+
+	return {(d.employee, d.leave_type): getdate(d.to_date) for d in allocations}
 
+
+def get_allocated_and_expired_leaves(
+	from_date: str, to_date: str, employees: list[str], leave_types: list[str]
+) -> dict[tuple, dict]:
+	"""Returns new allocation, expired and carry forwarded leaves by (employee, leave type)"""
+	records = get_leave_ledger_entries(from_date, to_date, employees, leave_types)
+	# leaves taken within allocations ending before to_date, counted together for all records
+	leaves_for_records = get_leaves_for_employee_periods(
+		[
+			((record.employee, record.leave_type), record.from_date, record.to_date)
+			for record in records
+			if not record.is_expired and record.to_date < getdate(to_date)
+		]
+	)
+
+	allocated_and_expired_leaves = {}
 	for record in records:
 		# new allocation records with `is_expired=1` are created when leave expires
 		# these new records should not be considered, else it leads to negative leave balance
 		if record.is_expired:
 			continue
 
+		key = (record.employee, record.leave_type)
+		leaves = allocated_and_expired_leaves.setdefault(
+			key, frappe._dict(new_allocation=0, expired_leaves=0, carry_forwarded_leaves=0)
+		)
+
 		if record.to_date < getdate(to_date):
 			# leave allocations ending before to_date, reduce leaves taken within that period
 			# since they are already used, they won't expire
-			expired_leaves += record.leaves
-			leaves_for_period = get_leaves_for_period(employee, leave_type, record.from_date, record.to_date)
-			expired_leaves -= min(abs(leaves_for_period), record.leaves)
+			leaves.expired_leaves += record.leaves
+			leaves_for_period = leaves_for_records[(key, getdate(record.from_date), getdate(record.to_date))]
+			leaves.expired_leaves -= min(abs(leaves_for_period), record.leaves)
 
 		if record.from_date >= getdate(from_date):
 			if record.is_carry_forward:
-				carry_forwarded_leaves += record.leaves
+				leaves.carry_forwarded_leaves += record.leaves
 			else:
-				new_allocation += record.leaves
+				leaves.new_allocation += record.leaves
 
-	return new_allocation, expired_leaves, carry_forwarded_leaves
+	return allocated_and_expired_leaves
 
 
-def get_leave_ledger_entries(from_date: str, to_date: str, employee: str, leave_type: str) -> list[dict]:
+def get_leave_ledger_entries(
+	from_date: str, to_date: str, employees: list[str], leave_types: list[str]
+) -> list[dict]:
 	ledger = frappe.qb.DocType("Leave Ledger Entry")
 	return (
 		frappe.qb.from_(ledger)
@@ -229,8 +343,8 @@ def get_leave_ledger_entries(from_date: str, to_date: str, employee: str, leave_
 		.where(
 			(ledger.docstatus == 1)
 			& (ledger.transaction_type == "Leave Allocation")
-			& (ledger.employee == employee)
-			& (ledger.leave_type == leave_type)
+			& (ledger.employee.isin(employees))
+			& (ledger.leave_type.isin(leave_types))
 			& (
 				(ledger.from_date[from_date:to_date])
 				| (ledger.to_date[from_date:to_date])
@@ -1,6 +1,7 @@
 # Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase
@@ -12,7 +13,12 @@ from erpnext.setup.doctype.holiday_list.test_holiday_list import set_holiday_lis
 from hrms.hr.doctype.leave_application.test_leave_application import make_allocation_record
 from hrms.hr.doctype.leave_ledger_entry.leave_ledger_entry import process_expired_allocation
 from hrms.hr.doctype.leave_type.test_leave_type import create_leave_type
-from hrms.hr.report.employee_leave_balance.employee_leave_balance import execute
+from hrms.hr.report.employee_leave_balance.employee_leave_balance import (
+	EMPLOYEE_LEAVE_BALANCE_DATA,
+	execute,
+	get_data,
+	prepare_data,
+)
 from hrms.payroll.doctype.salary_slip.test_salary_slip import (
 	make_holiday_list,
 	make_leave_application,
@@ -241,3 +247,29 @@ class TestEmployeeLeaveBalance(IntegrationTestCase):
 		)
 		report = execute(filters)
 		self.assertEqual(len(report[1]), 1)
+
+	@set_holiday_list("_Test Emp Balance Holiday List", "_Test Company")
+	def test_large_report_prepared_in_background(self):
+		frappe.get_doc(test_records[0]).insert()
+		frappe.cache().delete_keys(EMPLOYEE_LEAVE_BALANCE_DATA)
+
+		make_allocation_record(employee=self.employee_id, from_date=self.year_start, to_date=self.year_end)
+		filters = frappe._dict(
+			{"from_date": self.year_start, "to_date": self.year_end, "employee": self.employee_id}
+		)
+
+		with (
+			patch(
+				"hrms.hr.report.employee_leave_balance.employee_leave_balance.BACKGROUND_REPORT_THRESHOLD", 0
+			),
+			patch("frappe.enqueue") as enqueue,
+		):
+			report = execute(filters)
+			self.assertEqual(report[1], [])
+			self.assertTrue(report[2])
+
+			# serves the data prepared by the background job
+			prepare_data(enqueue.call_args.kwargs["filters"], enqueue.call_args.kwargs["key"])
+			report = execute(filters)
+			self.assertEqual(report[1], get_data(filters))
+			self.assertEqual(report[1][0].closing_balance, 30)
@@ -5,7 +5,7 @@
 import frappe
 from frappe import _
 
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+from hrms.utils.holiday_list import resolve_holiday_lists
 
 
 def execute(filters=None):
@@ -60,11 +60,16 @@ def get_data(filters):
 	if filters.department:
 		employee_filters["department"] = filters.department
 
-	for employee in frappe.get_list("Employee", filters=employee_filters, pluck="name"):
-		holiday_list = get_holiday_list_for_employee(employee, raise_exception=False)
+	holiday_list_for_employee = resolve_holiday_lists(
+		frappe.get_list("Employee", filters=employee_filters, pluck="name")
+	)
+	employees_by_holiday_list = {}
+	for employee, holiday_list in holiday_list_for_employee.items():
 		if not holiday_list or (filters.holiday_list and filters.holiday_list != holiday_list):
 			continue
+		employees_by_holiday_list.setdefault(holiday_list, []).append(employee)
 
+	for holiday_list, employees in employees_by_holiday_list.items():
 		working_days = (
 			frappe.qb.from_(Attendance)
 			.inner_join(Holiday)
@@ -77,12 +82,14 @@ def get_data(filters):
 				Holiday.description,
 			)
 			.where(
-				(Attendance.employee == employee)
+				(Attendance.employee.isin(employees))
 				& (Attendance.attendance_date[filters.from_date : filters.to_date])
 				& (Attendance.status.notin(["Absent", "On Leave"]))
 				& (Attendance.docstatus == 1)
 				& (Holiday.parent == holiday_list)
 			)
+			.orderby(Attendance.employee)
+			.orderby(Attendance.attendance_date)
 			.run(as_list=True)
 		)
 		data.extend(working_days)
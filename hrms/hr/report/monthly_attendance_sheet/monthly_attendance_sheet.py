@@ -11,6 +11,8 @@ from frappe.query_builder.functions import Count, Extract, Sum
 from frappe.utils import cint, cstr, getdate
 from frappe.utils.nestedset import get_descendants_of
 
+from hrms.utils.holiday_list import get_holiday_calendars
+
 Filters = frappe._dict
 
 status_map = {
@@ -345,25 +347,23 @@ def get_holiday_map(filters: Filters) -> dict[str, list[dict]]:
 	holiday_lists = frappe.db.get_all("Holiday List", pluck="name")
 	default_holiday_list = frappe.get_cached_value("Company", filters.company, "default_holiday_list")
 	holiday_lists.append(default_holiday_list)
+	holiday_lists = [d for d in holiday_lists if d]
 
-	holiday_map = frappe._dict()
-	Holiday = frappe.qb.DocType("Holiday")
+	year, month = cint(filters.year), cint(filters.month)
+	month_start = getdate(f"{year}-{month:02d}-01")
+	month_end = getdate(f"{year}-{month:02d}-{monthrange(year, month)[1]}")
+	calendars = get_holiday_calendars(holiday_lists, [year])
 
+	holiday_map = frappe._dict()
 	for d in holiday_lists:
-		if not d:
-			continue
-
-		holidays = (
-			frappe.qb.from_(Holiday)
-			.select(Extract("day", Holiday.holiday_date).as_("day_of_month"), Holiday.weekly_off)
-			.where(
-				(Holiday.parent == d)
-				& (Extract("month", Holiday.holiday_date) == filters.month)
-				& (Extract("year", Holiday.holiday_date) == filters.year)
-			)
-		).run(as_dict=True)
-
-		holiday_map.setdefault(d, holidays)
+		calendar = calendars[(d, year)]
+		holiday_map.setdefault(
+			d,
+			[
+				{"day_of_month": holiday.day, "weekly_off": cint(calendar.is_weekly_off(holiday))}
+				for holiday in calendar.get_dates(month_start, month_end)
+			],
+		)
 
 	return holiday_map
 
@@ -6,11 +6,14 @@ import datetime
 import frappe
 from frappe import _, qb
 from frappe.model.document import Document
-from frappe.query_builder import Criterion
+from frappe.model.meta import get_field_precision
+from frappe.query_builder import Case, Criterion
 from frappe.query_builder.custom import ConstantColumn
+from frappe.query_builder.functions import IfNull, Sum
 from frappe.utils import (
 	add_days,
 	comma_and,
+	create_batch,
 	cstr,
 	flt,
 	format_datetime,
@@ -21,22 +24,23 @@ from frappe.utils import (
 	get_link_to_form,
 	get_number_format_info,
 	getdate,
+	now_datetime,
 	nowdate,
 )
 
 import erpnext
 from erpnext import get_company_currency
-from erpnext.setup.doctype.employee.employee import (
-	InactiveEmployeeStatusError,
-	get_holiday_list_for_employee,
-)
+from erpnext.setup.doctype.employee.employee import InactiveEmployeeStatusError
 
 from hrms.hr.doctype.leave_policy_assignment.leave_policy_assignment import (
 	calculate_pro_rated_leaves,
 )
+from hrms.utils.holiday_list import get_holiday_list_for_employee
 
 DateTimeLikeObject = str | datetime.date | datetime.datetime
 
+EARNED_LEAVE_BATCH_SIZE = 1000
+
 
 class DuplicateDeclarationError(frappe.ValidationError):
 	pass
@@ -344,36 +348,250 @@ def allocate_earned_leaves():
 	today = frappe.flags.current_date or getdate()
 
 	for e_leave_type in e_leave_types:
-		leave_allocations = get_leave_allocations(today, e_leave_type.name)
-
-		for allocation in leave_allocations:
-			if not allocation.leave_policy_assignment and not allocation.leave_policy:
-				continue
-
-			leave_policy = (
-				allocation.leave_policy
-				if allocation.leave_policy
-				else frappe.db.get_value(
-					"Leave Policy Assignment", allocation.leave_policy_assignment, ["leave_policy"]
-				)
-			)
+		leave_allocations = get_earned_leave_allocations(today, e_leave_type)
+
+		for allocations in create_batch(leave_allocations, EARNED_LEAVE_BATCH_SIZE):
+			allocate_earned_leaves_for_allocations(allocations, e_leave_type, today)
+
+
+def get_earned_leave_allocations(date, e_leave_type) -> list[dict]:
+	"""Returns allocations of the earned leave type due for accrual on the date, with the annual allocation
+	as per their leave policy and the employee's date of joining"""
+	Allocation = frappe.qb.DocType("Leave Allocation")
+	Assignment = frappe.qb.DocType("Leave Policy Assignment")
+	PolicyDetail = frappe.qb.DocType("Leave Policy Detail")
+	Employee = frappe.qb.DocType("Employee")
+
+	leave_policy = (
+		Case()
+		.when(IfNull(Allocation.leave_policy, "") != "", Allocation.leave_policy)
+		.else_(Assignment.leave_policy)
+	)
+	leave_allocations = (
+		frappe.qb.from_(Allocation)
+		.left_join(Assignment)
+		.on(Assignment.name == Allocation.leave_policy_assignment)
+		.left_join(PolicyDetail)
+		.on(
+			(PolicyDetail.parent == leave_policy)
+			& (PolicyDetail.parenttype == "Leave Policy")
+			& (PolicyDetail.leave_type == Allocation.leave_type)
+		)
+		.left_join(Employee)
+		.on(Employee.name == Allocation.employee)
+		.select(
+			Allocation.name,
+			Allocation.employee,
+			Allocation.employee_name,
+			Allocation.leave_type,
+			Allocation.from_date,
+			Allocation.to_date,
+			Allocation.total_leaves_allocated,
+			Allocation.leave_policy_assignment,
+			Allocation.leave_policy,
+			PolicyDetail.annual_allocation,
+			Employee.date_of_joining,
+			Employee.company,
+		)
+		.where(
+			(Allocation.leave_type == e_leave_type.name)
+			& (Allocation.docstatus == 1)
+			& (Allocation.from_date <= date)
+			& (Allocation.to_date >= date)
+		)
+		.orderby(Allocation.name)
+	).run(as_dict=True)
+
+	allocations = {}
+	for allocation in leave_allocations:
+		if not allocation.leave_policy_assignment and not allocation.leave_policy:
+			continue
+
+		from_date = allocation.from_date
+		if e_leave_type.allocate_on_day == "Date of Joining":
+			from_date = allocation.date_of_joining
+
+		if check_effective_date(
+			from_date, date, e_leave_type.earned_leave_frequency, e_leave_type.allocate_on_day
+		):
+			allocations.setdefault(allocation.name, allocation)
+
+	return list(allocations.values())
+
+
+def allocate_earned_leaves_for_allocations(allocations: list[dict], e_leave_type, date) -> None:
+	"""Adds the leaves earned on the date to the allocations, updating the allocations
+	and inserting their ledger entries and comments with multi-row writes"""
+	from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+		queue_leave_balance_snapshot_rebuild,
+	)
+
+	precision = get_field_precision(frappe.get_meta("Leave Allocation").get_field("total_leaves_allocated"))
+	existing_leave_counts = get_existing_leave_counts([allocation.name for allocation in allocations])
+
+	earned_allocations = []
+	for allocation in allocations:
+		annual_allocation = flt(allocation.annual_allocation, precision)
+		earned_leaves = get_monthly_earned_leave(
+			allocation.date_of_joining,
+			annual_allocation,
+			e_leave_type.earned_leave_frequency,
+			e_leave_type.rounding,
+		)
+
+		new_allocation = flt(allocation.total_leaves_allocated) + flt(earned_leaves)
+		new_allocation_without_cf = flt(
+			flt(existing_leave_counts.get(allocation.name)) + flt(earned_leaves), precision
+		)
+
+		if new_allocation > e_leave_type.max_leaves_allowed and e_leave_type.max_leaves_allowed > 0:
+			new_allocation = e_leave_type.max_leaves_allowed
+
+		if (
+			new_allocation != flt(allocation.total_leaves_allocated)
+			# annual allocation as per policy should not be exceeded
+			and new_allocation_without_cf <= annual_allocation
+		):
+			allocation.total_leaves_allocated = new_allocation
+			allocation.earned_leaves = earned_leaves
+			earned_allocations.append(allocation)
+
+	if not earned_allocations:
+		return
+
+	update_earned_leave_allocations(earned_allocations)
+	insert_earned_leave_ledger_entries(earned_allocations, date)
+	if e_leave_type.allocate_on_day:
+		insert_earned_leave_comments(earned_allocations, e_leave_type, date)
+
+	queue_leave_balance_snapshot_rebuild(
+		list({allocation.employee for allocation in earned_allocations}), e_leave_type.name
+	)
+
+
+def get_existing_leave_counts(allocations: list[str]) -> dict[str, float]:
+	"""Returns leaves allocated without carry forwarded leaves by allocation,
+	as returned by `LeaveAllocation.get_existing_leave_count`"""
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	leave_counts = (
+		frappe.qb.from_(Ledger)
+		.select(Ledger.transaction_name, Sum(Ledger.leaves).as_("total_leaves"))
+		.where(
+			(Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.transaction_name.isin(allocations))
+			& (Ledger.is_carry_forward == 0)
+			& (Ledger.docstatus == 1)
+		)
+		.groupby(Ledger.transaction_name)
+	).run(as_dict=True)
+
+	return {d.transaction_name: flt(d.total_leaves) for d in leave_counts}
 
-			annual_allocation = frappe.db.get_value(
-				"Leave Policy Detail",
-				filters={"parent": leave_policy, "leave_type": e_leave_type.name},
-				fieldname=["annual_allocation"],
-			)
-			date_of_joining = frappe.db.get_value("Employee", allocation.employee, "date_of_joining")
 
-			from_date = allocation.from_date
+def update_earned_leave_allocations(allocations: list[dict]) -> None:
+	Allocation = frappe.qb.DocType("Leave Allocation")
+	total_leaves_allocated = Case()
+	for allocation in allocations:
+		total_leaves_allocated = total_leaves_allocated.when(
+			Allocation.name == allocation.name, allocation.total_leaves_allocated
+		)
 
-			if e_leave_type.allocate_on_day == "Date of Joining":
-				from_date = date_of_joining
+	(
+		frappe.qb.update(Allocation)
+		.set(Allocation.total_leaves_allocated, total_leaves_allocated)
+		.where(Allocation.name.isin([allocation.name for allocation in allocations]))
+	).run()
+
+
+def insert_earned_leave_ledger_entries(allocations: list[dict], date) -> None:
+	"""Inserts submitted ledger entries for the earned leaves,
+	same as `create_additional_leave_ledger_entry` for each allocation"""
+	now, user = now_datetime(), frappe.session.user
+	fields = [
+		"name",
+		"owner",
+		"modified_by",
+		"creation",
+		"modified",
+		"docstatus",
+		"employee",
+		"employee_name",
+		"company",
+		"leave_type",
+		"transaction_type",
+		"transaction_name",
+		"leaves",
+		"from_date",
+		"to_date",
+		"is_carry_forward",
+		"is_expired",
+		"is_lwp",
+	]
+	values = [
+		(
+			frappe.generate_hash(length=10),
+			user,
+			user,
+			now,
+			now,
+			1,
+			allocation.employee,
+			allocation.employee_name,
+			allocation.company,
+			allocation.leave_type,
+			"Leave Allocation",
+			allocation.name,
+			allocation.earned_leaves,
+			date,
+			allocation.to_date,
+			0,
+			0,
+			0,
+		)
+		for allocation in allocations
+	]
+	frappe.db.bulk_insert("Leave Ledger Entry", fields, values)
+
+
+def insert_earned_leave_comments(allocations: list[dict], e_leave_type, date) -> None:
+	now, user = now_datetime(), frappe.session.user
+	fields = [
+		"name",
+		"owner",
+		"modified_by",
+		"creation",
+		"modified",
+		"docstatus",
+		"comment_type",
+		"comment_email",
+		"reference_doctype",
+		"reference_name",
+		"content",
+	]
+	values = []
+	for allocation in allocations:
+		text = _(
+			"Allocated {0} leave(s) via scheduler on {1} based on the 'Allocate on Day' option set to {2}"
+		).format(
+			frappe.bold(allocation.earned_leaves), frappe.bold(formatdate(date)), e_leave_type.allocate_on_day
+		)
+		values.append(
+			(
+				frappe.generate_hash(length=10),
+				user,
+				user,
+				now,
+				now,
+				0,
+				"Info",
+				user,
+				"Leave Allocation",
+				allocation.name,
+				text,
+			)
+		)
 
-			if check_effective_date(
-				from_date, today, e_leave_type.earned_leave_frequency, e_leave_type.allocate_on_day
-			):
-				update_previous_leave_allocation(allocation, annual_allocation, e_leave_type, date_of_joining)
+	frappe.db.bulk_insert("Comment", fields, values)
 
 
 def update_previous_leave_allocation(allocation, annual_allocation, e_leave_type, date_of_joining):
@@ -0,0 +1,5 @@
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import rebuild_leave_balance_snapshots
+
+
+def execute():
+	rebuild_leave_balance_snapshots()
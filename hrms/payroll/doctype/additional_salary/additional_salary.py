@@ -198,7 +198,34 @@ class AdditionalSalary(Document):
 			self.validate_recurring_additional_salary_overlap()
 
 
-def get_additional_salaries(employee, start_date, end_date, component_type):
+def get_additional_salaries(employee, start_date, end_date, component_type, additional_salary_list=None):
+	if additional_salary_list is None:
+		additional_salary_list = get_additional_salary_records(
+			[employee], start_date, end_date, component_type
+		)
+
+	additional_salaries = []
+	components_to_overwrite = []
+
+	for d in additional_salary_list:
+		if d.overwrite:
+			if d.component in components_to_overwrite:
+				frappe.throw(
+					_(
+						"Multiple Additional Salaries with overwrite property exist for Salary Component {0} between {1} and {2}."
+					).format(frappe.bold(d.component), start_date, end_date),
+					title=_("Error"),
+				)
+
+			components_to_overwrite.append(d.component)
+
+		additional_salaries.append(d)
+
+	return additional_salaries
+
+
+def get_additional_salary_records(employees, start_date, end_date, component_type):
+	"""Returns additional salaries applicable in the payroll period for the given employees"""
 	from frappe.query_builder import Criterion
 
 	comp_type = "Earning" if component_type == "earnings" else "Deduction"
@@ -207,10 +234,11 @@ def get_additional_salaries(employee, start_date, end_date, component_type):
 	component_field = additional_sal.salary_component.as_("component")
 	overwrite_field = additional_sal.overwrite_salary_structure_amount.as_("overwrite")
 
-	additional_salary_list = (
+	return (
 		frappe.qb.from_(additional_sal)
 		.select(
 			additional_sal.name,
+			additional_sal.employee,
 			component_field,
 			additional_sal.type,
 			additional_sal.amount,
@@ -219,7 +247,7 @@ def get_additional_salaries(employee, start_date, end_date, component_type):
 			additional_sal.deduct_full_tax_on_selected_payroll_date,
 		)
 		.where(
-			(additional_sal.employee == employee)
+			(additional_sal.employee.isin(employees))
 			& (additional_sal.docstatus == 1)
 			& (additional_sal.type == comp_type)
 			& (additional_sal.disabled == 0)
@@ -245,22 +273,3 @@ def get_additional_salaries(employee, start_date, end_date, component_type):
 		)
 		.run(as_dict=True)
 	)
-
-	additional_salaries = []
-	components_to_overwrite = []
-
-	for d in additional_salary_list:
-		if d.overwrite:
-			if d.component in components_to_overwrite:
-				frappe.throw(
-					_(
-						"Multiple Additional Salaries with overwrite property exist for Salary Component {0} between {1} and {2}."
-					).format(frappe.bold(d.component), start_date, end_date),
-					title=_("Error"),
-				)
-
-			components_to_overwrite.append(d.component)
-
-		additional_salaries.append(d)
-
-	return additional_salaries
@@ -0,0 +1,272 @@
+# Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, flt, getdate
+
+from hrms.payroll.doctype.payroll_period.payroll_period import get_payroll_period
+
+
+class EmployeeTaxLedger(Document):
+	"""Running taxable earnings, exemptions and tax paid by an employee in a payroll period.
+
+	Entries are added and removed as salary slips are submitted and cancelled, so the tax
+	projection of a salary slip can be computed without re-reading all the prior salary slips.
+	"""
+
+	def validate(self):
+		self.set_totals()
+
+	def set_totals(self):
+		self.taxable_earnings = sum(flt(d.taxable_earnings) for d in self.entries)
+		self.exempted_amount = sum(flt(d.exempted_amount) for d in self.entries)
+		self.tax_paid = sum(flt(d.tax_paid) for d in self.entries)
+		self.to_date = max((getdate(d.end_date) for d in self.entries), default=None)
+
+	def add_salary_slip(self, salary_slip):
+		self.remove_salary_slip(salary_slip.name)
+		for entry in get_entries_for_salary_slip(salary_slip):
+			self.append("entries", entry)
+
+	def remove_salary_slip(self, salary_slip: str):
+		for entry in list(self.entries):
+			if entry.salary_slip == salary_slip:
+				self.remove(entry)
+
+	def rebuild(self):
+		self.entries = []
+		salary_slips = get_submitted_salary_slips([self.employee], self.payroll_period)
+		for entry in get_entries_from_salary_slips(salary_slips.get(self.employee, {})):
+			self.append("entries", entry)
+
+
+def update_tax_ledger(salary_slip):
+	"""Records a submitted salary slip in the employee's tax ledger, or removes a cancelled one"""
+	payroll_period = get_payroll_period(salary_slip.start_date, salary_slip.end_date, salary_slip.company)
+	if not payroll_period:
+		return
+
+	name = frappe.db.get_value(
+		"Employee Tax Ledger",
+		{"employee": salary_slip.employee, "payroll_period": payroll_period.name},
+		"name",
+		for_update=True,
+	)
+
+	if name:
+		ledger = frappe.get_doc("Employee Tax Ledger", name)
+	elif salary_slip.docstatus == 1:
+		ledger = frappe.new_doc("Employee Tax Ledger")
+		ledger.update(
+			{
+				"employee": salary_slip.employee,
+				"company": salary_slip.company,
+				"payroll_period": payroll_period.name,
+			}
+		)
+	else:
+		return
+
+	ledger.remove_salary_slip(salary_slip.name)
+	if salary_slip.docstatus == 1:
+		ledger.add_salary_slip(salary_slip)
+
+	# salary slips submitted before the ledger existed, or removed without being cancelled
+	submitted_salary_slips = get_submitted_salary_slips([salary_slip.employee], payroll_period.name)
+	if set(submitted_salary_slips.get(salary_slip.employee, {})) != {d.salary_slip for d in ledger.entries}:
+		ledger.rebuild()
+
+	ledger.save(ignore_permissions=True)
+
+
+def get_tax_ledger_entries(employees: list[str], payroll_period: str) -> dict[str, list]:
+	"""Returns ledger entries of the employees for the payroll period.
+
+	Employees without a ledger, or whose ledger does not match their submitted salary slips,
+	are left out so that the caller can fall back to reading the salary slips."""
+	if not employees:
+		return {}
+
+	TaxLedger = frappe.qb.DocType("Employee Tax Ledger")
+	TaxLedgerEntry = frappe.qb.DocType("Employee Tax Ledger Entry")
+
+	rows = (
+		frappe.qb.from_(TaxLedger)
+		.left_join(TaxLedgerEntry)
+		.on((TaxLedgerEntry.parent == TaxLedger.name) & (TaxLedgerEntry.parenttype == "Employee Tax Ledger"))
+		.select(
+			TaxLedger.employee,
+			TaxLedgerEntry.salary_slip,
+			TaxLedgerEntry.start_date,
+			TaxLedgerEntry.end_date,
+			TaxLedgerEntry.taxable_earnings,
+			TaxLedgerEntry.exempted_amount,
+			TaxLedgerEntry.tax_component,
+			TaxLedgerEntry.is_flexible_benefit,
+			TaxLedgerEntry.tax_paid,
+		)
+		.where((TaxLedger.employee.isin(employees)) & (TaxLedger.payroll_period == payroll_period))
+	).run(as_dict=True)
+
+	ledger_entries = {}
+	for row in rows:
+		entries = ledger_entries.setdefault(row.employee, [])
+		if row.salary_slip:
+			entries.append(row)
+
+	submitted_salary_slips = get_submitted_salary_slips(list(ledger_entries), payroll_period)
+	return {
+		employee: entries
+		for employee, entries in ledger_entries.items()
+		if set(submitted_salary_slips.get(employee, {})) == {d.salary_slip for d in entries}
+	}
+
+
+def get_tax_ledger_totals(
+	entries: list,
+	start_date,
+	end_date,
+	tax_component: str | None = None,
+	include_flexible_benefits: bool = False,
+):
+	"""Returns totals of the ledger entries for salary slips between the given dates.
+	Tax deducted in flexible benefit rows is left out of `tax_paid` unless `include_flexible_benefits` is set"""
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	totals = frappe._dict(taxable_earnings=0.0, exempted_amount=0.0, tax_paid=0.0)
+
+	for entry in entries:
+		if not (
+			start_date <= getdate(entry.start_date) <= end_date
+			and start_date <= getdate(entry.end_date) <= end_date
+		):
+			continue
+
+		totals.taxable_earnings += flt(entry.taxable_earnings)
+		totals.exempted_amount += flt(entry.exempted_amount)
+		if cint(entry.is_flexible_benefit) and not include_flexible_benefits:
+			continue
+
+		if entry.tax_component and (not tax_component or entry.tax_component == tax_component):
+			totals.tax_paid += flt(entry.tax_paid)
+
+	return totals
+
+
+def get_submitted_salary_slips(employees: list[str], payroll_period: str) -> dict[str, dict]:
+	"""Returns submitted salary slips of the employees falling within the payroll period"""
+	if not employees:
+		return {}
+
+	period_start_date, period_end_date = frappe.db.get_value(
+		"Payroll Period", payroll_period, ["start_date", "end_date"]
+	)
+
+	SalarySlip = frappe.qb.DocType("Salary Slip")
+	salary_slips = (
+		frappe.qb.from_(SalarySlip)
+		.select(SalarySlip.name, SalarySlip.employee, SalarySlip.start_date, SalarySlip.end_date)
+		.where(
+			(SalarySlip.docstatus == 1)
+			& (SalarySlip.employee.isin(employees))
+			& (SalarySlip.start_date >= period_start_date)
+			& (SalarySlip.end_date <= period_end_date)
+		)
+	).run(as_dict=True)
+
+	submitted_salary_slips = {}
+	for salary_slip in salary_slips:
+		submitted_salary_slips.setdefault(salary_slip.employee, {})[salary_slip.name] = salary_slip
+
+	return submitted_salary_slips
+
+
+def get_entries_for_salary_slip(salary_slip) -> list[dict]:
+	return make_entries(
+		salary_slip.name,
+		salary_slip.start_date,
+		salary_slip.end_date,
+		[d.as_dict() for d in salary_slip.earnings],
+		[d.as_dict() for d in salary_slip.deductions],
+	)
+
+
+def get_entries_from_salary_slips(salary_slips: dict) -> list[dict]:
+	if not salary_slips:
+		return []
+
+	SalaryDetail = frappe.qb.DocType("Salary Detail")
+	details = (
+		frappe.qb.from_(SalaryDetail)
+		.select(
+			SalaryDetail.parent,
+			SalaryDetail.parentfield,
+			SalaryDetail.salary_component,
+			SalaryDetail.amount,
+			SalaryDetail.is_tax_applicable,
+			SalaryDetail.is_flexible_benefit,
+			SalaryDetail.exempted_from_income_tax,
+			SalaryDetail.variable_based_on_taxable_salary,
+		)
+		.where(
+			(SalaryDetail.parenttype == "Salary Slip")
+			& (SalaryDetail.parent.isin(list(salary_slips)))
+			& (SalaryDetail.parentfield.isin(["earnings", "deductions"]))
+		)
+	).run(as_dict=True)
+
+	details_by_salary_slip = {}
+	for d in details:
+		details_by_salary_slip.setdefault((d.parent, d.parentfield), []).append(d)
+
+	entries = []
+	for name, salary_slip in salary_slips.items():
+		entries.extend(
+			make_entries(
+				name,
+				salary_slip.start_date,
+				salary_slip.end_date,
+				details_by_salary_slip.get((name, "earnings"), []),
+				details_by_salary_slip.get((name, "deductions"), []),
+			)
+		)
+
+	return entries
+
+
+def make_entries(salary_slip: str, start_date, end_date, earnings: list, deductions: list) -> list[dict]:
+	"""Returns one entry per tax component deducted in the salary slip.
+	Taxable earnings and exemptions of the salary slip are recorded on the first entry."""
+	taxable_earnings = sum(
+		flt(d.amount) for d in earnings if d.is_tax_applicable and not d.is_flexible_benefit
+	)
+	exempted_amount = sum(
+		flt(d.amount) for d in deductions if d.exempted_from_income_tax and not d.is_flexible_benefit
+	)
+
+	# tax deducted in flexible benefit rows is kept apart, as only reports count it as tax paid
+	tax_paid = {}
+	for d in deductions:
+		if d.variable_based_on_taxable_salary:
+			key = (d.salary_component, cint(d.is_flexible_benefit))
+			tax_paid.setdefault(key, 0.0)
+			tax_paid[key] += flt(d.amount)
+
+	entries = []
+	for idx, ((tax_component, is_flexible_benefit), amount) in enumerate(
+		list(tax_paid.items()) or [((None, 0), 0.0)]
+	):
+		entries.append(
+			{
+				"salary_slip": salary_slip,
+				"start_date": start_date,
+				"end_date": end_date,
+				"taxable_earnings": taxable_earnings if idx == 0 else 0.0,
+				"exempted_amount": exempted_amount if idx == 0 else 0.0,
+				"tax_component": tax_component,
+				"is_flexible_benefit": is_flexible_benefit,
+				"tax_paid": amount,
+			}
+		)
+
+	return entries
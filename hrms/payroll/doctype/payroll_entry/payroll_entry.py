@@ -9,13 +9,14 @@ import frappe
 from frappe import _
 from frappe.desk.reportview import get_match_cond
 from frappe.model.document import Document
-from frappe.query_builder.functions import Coalesce, Count
+from frappe.query_builder.functions import Coalesce, Count, Sum
 from frappe.utils import (
 	DATE_FORMAT,
 	add_days,
 	add_to_date,
 	cint,
 	comma_and,
+	create_batch,
 	date_diff,
 	flt,
 	get_link_to_form,
@@ -28,8 +29,13 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 )
 from erpnext.accounts.utils import get_fiscal_year
 
+from hrms.payroll.doctype.payroll_entry.payroll_run_context import PayrollRunContext
 from hrms.payroll.doctype.salary_withholding.salary_withholding import link_bank_entry_in_salary_withholdings
 
+SALARY_SLIP_CHUNK_SIZE = 100
+SIMULATION_LOCK_TIMEOUT = 60
+SIMULATION_TOTAL_FIELDS = ("gross_pay", "total_deduction", "net_pay", "base_net_pay")
+
 
 class PayrollEntry(Document):
 	def onload(self):
@@ -222,30 +228,10 @@ class PayrollEntry(Document):
 		employees = [emp.employee for emp in self.employees]
 
 		if employees:
-			args = frappe._dict(
-				{
-					"salary_slip_based_on_timesheet": self.salary_slip_based_on_timesheet,
-					"payroll_frequency": self.payroll_frequency,
-					"start_date": self.start_date,
-					"end_date": self.end_date,
-					"company": self.company,
-					"posting_date": self.posting_date,
-					"deduct_tax_for_unclaimed_employee_benefits": self.deduct_tax_for_unclaimed_employee_benefits,
-					"deduct_tax_for_unsubmitted_tax_exemption_proof": self.deduct_tax_for_unsubmitted_tax_exemption_proof,
-					"payroll_entry": self.name,
-					"exchange_rate": self.exchange_rate,
-					"currency": self.currency,
-				}
-			)
+			args = self.get_salary_slip_args()
 			if len(employees) > 30 or frappe.flags.enqueue_payroll_entry:
 				self.db_set("status", "Queued")
-				frappe.enqueue(
-					create_salary_slips_for_employees,
-					timeout=3000,
-					employees=employees,
-					args=args,
-					publish_progress=False,
-				)
+				enqueue_salary_slip_creation(self.name, employees, args)
 				frappe.msgprint(
 					_("Salary Slip creation is queued. It may take a few minutes"),
 					alert=True,
@@ -256,6 +242,47 @@ class PayrollEntry(Document):
 				# since this method is called via frm.call this doc needs to be updated manually
 				self.reload()
 
+	@frappe.whitelist()
+	def simulate_payroll(self):
+		"""
+		Computes salary slips for selected employees in memory, without creating them.
+		Large payrolls are simulated in background jobs that stream their results via realtime events
+		"""
+		self.check_permission("read")
+		employees = [emp.employee for emp in self.employees]
+		if not employees:
+			return
+
+		args = self.get_salary_slip_args()
+		if len(employees) > 30 or frappe.flags.enqueue_payroll_entry:
+			simulation = frappe.generate_hash(length=12)
+			enqueue_payroll_simulation(simulation, employees, args)
+			frappe.msgprint(
+				_("Payroll simulation is queued. It may take a few minutes"),
+				alert=True,
+				indicator="blue",
+			)
+			return {"simulation": simulation, "queued": True}
+
+		return simulate_salary_slips_for_employees(employees, args)
+
+	def get_salary_slip_args(self) -> dict:
+		return frappe._dict(
+			{
+				"salary_slip_based_on_timesheet": self.salary_slip_based_on_timesheet,
+				"payroll_frequency": self.payroll_frequency,
+				"start_date": self.start_date,
+				"end_date": self.end_date,
+				"company": self.company,
+				"posting_date": self.posting_date,
+				"deduct_tax_for_unclaimed_employee_benefits": self.deduct_tax_for_unclaimed_employee_benefits,
+				"deduct_tax_for_unsubmitted_tax_exemption_proof": self.deduct_tax_for_unsubmitted_tax_exemption_proof,
+				"payroll_entry": self.name,
+				"exchange_rate": self.exchange_rate,
+				"currency": self.currency,
+			}
+		)
+
 	def get_sal_slip_list(self, ss_status, as_dict=False):
 		"""
 		Returns list of salary slips based on selected criteria
@@ -282,15 +309,11 @@ class PayrollEntry(Document):
 		self.check_permission("write")
 		salary_slips = self.get_sal_slip_list(ss_status=0)
 
-		if len(salary_slips) > 30 or frappe.flags.enqueue_payroll_entry:
+		# with no draft slips there are no chunks to complete a queued submission,
+		# submit inline to make the accrual entry for slips submitted earlier
+		if salary_slips and (len(salary_slips) > 30 or frappe.flags.enqueue_payroll_entry):
 			self.db_set("status", "Queued")
-			frappe.enqueue(
-				submit_salary_slips_for_employees,
-				timeout=3000,
-				payroll_entry=self,
-				salary_slips=salary_slips,
-				publish_progress=False,
-			)
+			enqueue_salary_slip_submission(self, salary_slips)
 			frappe.msgprint(
 				_("Salary Slip submission is queued. It may take a few minutes"),
 				alert=True,
@@ -305,12 +328,15 @@ class PayrollEntry(Document):
 				ss.email_salary_slip()
 
 	def get_salary_component_account(self, salary_component):
-		account = frappe.db.get_value(
-			"Salary Component Account",
-			{"parent": salary_component, "company": self.company},
-			"account",
-			cache=True,
-		)
+		if details := getattr(self, "_salary_component_details", {}).get(salary_component):
+			account = details.account
+		else:
+			account = frappe.db.get_value(
+				"Salary Component Account",
+				{"parent": salary_component, "company": self.company},
+				"account",
+				cache=True,
+			)
 
 		if not account:
 			frappe.throw(
@@ -321,8 +347,11 @@ class PayrollEntry(Document):
 
 		return account
 
-	def get_salary_components(self, component_type):
-		salary_slips = self.get_sal_slip_list(ss_status=1, as_dict=True)
+	def get_salary_components(self, component_type, salary_slips: list[str] | None = None):
+		"""Returns component amounts of submitted salary slips, totalled per employee, salary structure,
+		component and additional salary"""
+		if salary_slips is None:
+			salary_slips = [d.name for d in self.get_sal_slip_list(ss_status=1, as_dict=True)]
 
 		if salary_slips:
 			ss = frappe.qb.DocType("Salary Slip")
@@ -333,13 +362,20 @@ class PayrollEntry(Document):
 				.on(ss.name == ssd.parent)
 				.select(
 					ssd.salary_component,
-					ssd.amount,
+					Sum(ssd.amount).as_("amount"),
 					ssd.parentfield,
 					ssd.additional_salary,
 					ss.salary_structure,
 					ss.employee,
 				)
-				.where((ssd.parentfield == component_type) & (ss.name.isin([d.name for d in salary_slips])))
+				.where((ssd.parentfield == component_type) & (ss.name.isin(salary_slips)))
+				.groupby(
+					ss.employee,
+					ss.salary_structure,
+					ssd.salary_component,
+					ssd.additional_salary,
+					ssd.parentfield,
+				)
 			).run(as_dict=True)
 
 			return salary_components
@@ -348,10 +384,14 @@ class PayrollEntry(Document):
 		self,
 		component_type=None,
 		employee_wise_accounting_enabled=False,
+		salary_components: list | None = None,
 	):
-		salary_components = self.get_salary_components(component_type)
+		if salary_components is None:
+			salary_components = self.get_salary_components(component_type)
+
 		if salary_components:
 			component_dict = {}
+			self.set_accrual_details(salary_components)
 
 			for item in salary_components:
 				if not self.should_add_component_to_accrual_jv(component_type, item):
@@ -382,12 +422,60 @@ class PayrollEntry(Document):
 
 			return account_details
 
+	def set_accrual_details(self, salary_components: list) -> None:
+		"""Bulk-loads cost centers, component accounts and advance references needed
+		to split the aggregated component totals, instead of looking them up row by row"""
+		self.set_payroll_cost_centers_for_employees(
+			list(dict.fromkeys((d.employee, d.salary_structure) for d in salary_components))
+		)
+
+		components = list({d.salary_component for d in salary_components})
+		SalaryComponent = frappe.qb.DocType("Salary Component")
+		SalaryComponentAccount = frappe.qb.DocType("Salary Component Account")
+		component_details = (
+			frappe.qb.from_(SalaryComponent)
+			.left_join(SalaryComponentAccount)
+			.on(
+				(SalaryComponentAccount.parent == SalaryComponent.name)
+				& (SalaryComponentAccount.company == self.company)
+			)
+			.select(
+				SalaryComponent.name,
+				SalaryComponent.is_flexible_benefit,
+				SalaryComponent.only_tax_impact,
+				SalaryComponentAccount.account,
+			)
+			.where(SalaryComponent.name.isin(components))
+		).run(as_dict=True)
+
+		self._salary_component_details = {}
+		for d in component_details:
+			# retain the first account if multiple rows exist for the company
+			if not self._salary_component_details.get(d.name, {}).get("account"):
+				self._salary_component_details[d.name] = d
+
+		self._advance_deductions = {}
+		if additional_salaries := list(
+			{d.additional_salary for d in salary_components if d.additional_salary}
+		):
+			self._advance_deductions = dict(
+				frappe.get_all(
+					"Additional Salary",
+					filters={"name": ("in", additional_salaries), "ref_doctype": "Employee Advance"},
+					fields=["name", "ref_docname"],
+					as_list=True,
+				)
+			)
+
 	def should_add_component_to_accrual_jv(self, component_type: str, item: dict) -> bool:
 		add_component_to_accrual_jv = True
 		if component_type == "earnings":
-			is_flexible_benefit, only_tax_impact = frappe.get_cached_value(
-				"Salary Component", item["salary_component"], ["is_flexible_benefit", "only_tax_impact"]
-			)
+			if details := getattr(self, "_salary_component_details", {}).get(item["salary_component"]):
+				is_flexible_benefit, only_tax_impact = details.is_flexible_benefit, details.only_tax_impact
+			else:
+				is_flexible_benefit, only_tax_impact = frappe.get_cached_value(
+					"Salary Component", item["salary_component"], ["is_flexible_benefit", "only_tax_impact"]
+				)
 			if cint(is_flexible_benefit) and cint(only_tax_impact):
 				add_component_to_accrual_jv = False
 
@@ -395,6 +483,9 @@ class PayrollEntry(Document):
 
 	def get_advance_deduction(self, component_type: str, item: dict) -> str | None:
 		if component_type == "deductions" and item.additional_salary:
+			if (advance_deductions := getattr(self, "_advance_deductions", None)) is not None:
+				return advance_deductions.get(item.additional_salary)
+
 			ref_doctype, ref_docname = frappe.db.get_value(
 				"Additional Salary",
 				item.additional_salary,
@@ -463,6 +554,70 @@ class PayrollEntry(Document):
 		if salary_structure and "salary_structure" not in employee_details:
 			employee_details["salary_structure"] = salary_structure
 
+	def set_payroll_cost_centers_for_employees(self, employee_structures: list[tuple[str, str]]) -> None:
+		"""Sets payroll cost centers for all (employee, salary structure) pairs in a few queries,
+		in the same format as `get_payroll_cost_centers_for_employee`"""
+		if not hasattr(self, "employee_cost_centers"):
+			self.employee_cost_centers = {}
+
+		employee_structures = [d for d in employee_structures if not self.employee_cost_centers.get(d[0])]
+		if not employee_structures:
+			return
+
+		employees = list({employee for employee, _structure in employee_structures})
+		SalaryStructureAssignment = frappe.qb.DocType("Salary Structure Assignment")
+		assignments = (
+			frappe.qb.from_(SalaryStructureAssignment)
+			.select(
+				SalaryStructureAssignment.name,
+				SalaryStructureAssignment.employee,
+				SalaryStructureAssignment.salary_structure,
+			)
+			.where(
+				(SalaryStructureAssignment.employee.isin(employees))
+				& (SalaryStructureAssignment.docstatus == 1)
+				& (SalaryStructureAssignment.from_date <= self.end_date)
+			)
+			.orderby(SalaryStructureAssignment.from_date, order=frappe.qb.desc)
+		).run(as_dict=True)
+
+		# latest assignment for each employee & structure
+		latest_assignment = {}
+		for assignment in assignments:
+			latest_assignment.setdefault((assignment.employee, assignment.salary_structure), assignment.name)
+
+		cost_centers_by_assignment = {}
+		if latest_assignment:
+			EmployeeCostCenter = frappe.qb.DocType("Employee Cost Center")
+			for d in (
+				frappe.qb.from_(EmployeeCostCenter)
+				.select(
+					EmployeeCostCenter.parent, EmployeeCostCenter.cost_center, EmployeeCostCenter.percentage
+				)
+				.where(EmployeeCostCenter.parent.isin(list(latest_assignment.values())))
+			).run(as_dict=True):
+				cost_centers_by_assignment.setdefault(d.parent, {})[d.cost_center] = d.percentage
+
+		Employee = frappe.qb.DocType("Employee")
+		Department = frappe.qb.DocType("Department")
+		default_cost_centers = {
+			employee: employee_cost_center or department_cost_center
+			for employee, employee_cost_center, department_cost_center in (
+				frappe.qb.from_(Employee)
+				.left_join(Department)
+				.on(Employee.department == Department.name)
+				.select(Employee.name, Employee.payroll_cost_center, Department.payroll_cost_center)
+				.where(Employee.name.isin(employees))
+			).run()
+		}
+
+		for employee, salary_structure in employee_structures:
+			cost_centers = cost_centers_by_assignment.get(latest_assignment.get((employee, salary_structure)))
+			if not cost_centers:
+				cost_centers = {default_cost_centers.get(employee) or self.cost_center: 100}
+
+			self.employee_cost_centers.setdefault(employee, cost_centers)
+
 	def get_payroll_cost_centers_for_employee(self, employee, salary_structure):
 		if not hasattr(self, "employee_cost_centers"):
 			self.employee_cost_centers = {}
@@ -520,8 +675,13 @@ class PayrollEntry(Document):
 
 		return account_dict
 
-	def make_accrual_jv_entry(self, submitted_salary_slips):
+	def make_accrual_jv_entry(self, submitted_salary_slips, salary_components: dict | None = None):
+		"""Makes the accrual journal entry for submitted salary slips.
+
+		`salary_components` can hold component totals pre-aggregated by component type,
+		in the format returned by `get_salary_components`"""
 		self.check_permission("write")
+		salary_components = salary_components or {}
 		employee_wise_accounting_enabled = frappe.db.get_single_value(
 			"Payroll Settings", "process_payroll_accounting_entry_based_on_employee"
 		)
@@ -532,6 +692,7 @@ class PayrollEntry(Document):
 			self.get_salary_component_total(
 				component_type="earnings",
 				employee_wise_accounting_enabled=employee_wise_accounting_enabled,
+				salary_components=salary_components.get("earnings"),
 			)
 			or {}
 		)
@@ -540,6 +701,7 @@ class PayrollEntry(Document):
 			self.get_salary_component_total(
 				component_type="deductions",
 				employee_wise_accounting_enabled=employee_wise_accounting_enabled,
+				salary_components=salary_components.get("deductions"),
 			)
 			or {}
 		)
@@ -1383,6 +1545,11 @@ def get_month_details(year, month):
 
 
 def log_payroll_failure(process, payroll_entry, error):
+	error_message = get_payroll_failure_message(process, payroll_entry, error)
+	payroll_entry.db_set({"error_message": error_message, "status": "Failed"})
+
+
+def get_payroll_failure_message(process, payroll_entry, error) -> str:
 	error_log = frappe.log_error(
 		title=_("Salary Slip {0} failed for Payroll Entry {1}").format(process, payroll_entry.name)
 	)
@@ -1400,20 +1567,85 @@ def log_payroll_failure(process, payroll_entry, error):
 		get_link_to_form("Error Log", error_log.name)
 	)
 
-	payroll_entry.db_set({"error_message": error_message, "status": "Failed"})
+	return error_message
+
+
+def enqueue_salary_slip_creation(payroll_entry: str, employees: list[str], args: dict) -> None:
+	"""Shards the employees into chunks processed by separate background jobs, so that
+	salary slip creation is spread across all available workers"""
+	chunks = list(create_batch(employees, SALARY_SLIP_CHUNK_SIZE))
+	frappe.cache().delete_value(get_chunk_status_key(payroll_entry))
+
+	for chunk, chunk_employees in enumerate(chunks):
+		frappe.enqueue(
+			create_salary_slips_for_employees,
+			timeout=3000,
+			employees=chunk_employees,
+			args=args,
+			publish_progress=False,
+			chunk=chunk,
+			total_chunks=len(chunks),
+			enqueue_after_commit=True,
+		)
 
 
-def create_salary_slips_for_employees(employees, args, publish_progress=True):
+def get_chunk_status_key(payroll_entry: str) -> str:
+	return f"payroll_entry_chunk_status:{payroll_entry}"
+
+
+def complete_chunk(
+	payroll_entry, process: str, chunk: int, total_chunks: int, error_message=None, result=None
+) -> frappe._dict | None:
+	"""Records the result of a chunk. Once all chunks have finished, marks the payroll entry as failed
+	if any of them failed, and returns the errors and results of all chunks.
+	Returns None if other chunks are still pending"""
+	key = get_chunk_status_key(payroll_entry.name)
+	frappe.cache().hset(key, str(chunk), frappe._dict(error_message=error_message, result=result))
+
+	# lock the payroll entry so that only the last chunk to finish finalizes it
+	status = frappe.db.get_value("Payroll Entry", payroll_entry.name, "status", for_update=True)
+	chunk_status = frappe.cache().hgetall(key) or {}
+
+	frappe.publish_progress(
+		len(chunk_status) * 100 / total_chunks,
+		title=_("Creating Salary Slips...") if process == "creation" else _("Submitting Salary Slips..."),
+		doctype="Payroll Entry",
+		docname=payroll_entry.name,
+	)
+
+	if status != "Queued" or len(chunk_status) < total_chunks:
+		return None
+
+	frappe.cache().delete_value(key)
+	chunks = frappe._dict(
+		errors=[d.error_message for d in chunk_status.values() if d.error_message],
+		results=[d.result for d in chunk_status.values() if d.result],
+	)
+	if chunks.errors:
+		payroll_entry.db_set({"error_message": "\n\n".join(chunks.errors), "status": "Failed"})
+
+	return chunks
+
+
+def create_salary_slips_for_employees(
+	employees, args, publish_progress=True, chunk: int | None = None, total_chunks: int | None = None
+):
 	payroll_entry = frappe.get_cached_doc("Payroll Entry", args.payroll_entry)
+	error_message = None
 
 	try:
 		salary_slips_exist_for = get_existing_salary_slips(employees, args)
 		count = 0
 
 		employees = list(set(employees) - set(salary_slips_exist_for))
+		# bulk-load employee, assignment, attendance, leave, holiday details etc. for all employees
+		context = PayrollRunContext(employees, args).prefetch() if employees else None
+
 		for emp in employees:
 			args.update({"doctype": "Salary Slip", "employee": emp})
-			frappe.get_doc(args).insert()
+			salary_slip = frappe.get_doc(args)
+			salary_slip._payroll_run_context = context
+			salary_slip.insert()
 
 			count += 1
 			if publish_progress:
@@ -1422,7 +1654,8 @@ def create_salary_slips_for_employees(employees, args, publish_progress=True):
 					title=_("Creating Salary Slips..."),
 				)
 
-		payroll_entry.db_set({"status": "Submitted", "salary_slips_created": 1, "error_message": ""})
+		if chunk is None:
+			payroll_entry.db_set({"status": "Submitted", "salary_slips_created": 1, "error_message": ""})
 
 		if salary_slips_exist_for:
 			frappe.msgprint(
@@ -1435,11 +1668,172 @@ def create_salary_slips_for_employees(employees, args, publish_progress=True):
 
 	except Exception as e:
 		frappe.db.rollback()
-		log_payroll_failure("creation", payroll_entry, e)
+		if chunk is None:
+			log_payroll_failure("creation", payroll_entry, e)
+		else:
+			# only this chunk is rolled back, slips created by other chunks are retained
+			error_message = get_payroll_failure_message("creation", payroll_entry, e)
 
 	finally:
 		frappe.db.commit()  # nosemgrep
-		frappe.publish_realtime("completed_salary_slip_creation", user=frappe.session.user)
+
+		completed = chunk is None
+		if chunk is not None:
+			chunks = complete_chunk(payroll_entry, "creation", chunk, total_chunks, error_message)
+			if chunks and not chunks.errors:
+				payroll_entry.db_set({"status": "Submitted", "salary_slips_created": 1, "error_message": ""})
+
+			frappe.db.commit()  # nosemgrep
+			completed = bool(chunks)
+
+		if completed:
+			frappe.publish_realtime("completed_salary_slip_creation", user=frappe.session.user)
+
+
+def enqueue_payroll_simulation(simulation: str, employees: list[str], args: dict) -> None:
+	chunks = list(create_batch(employees, SALARY_SLIP_CHUNK_SIZE))
+
+	for chunk, chunk_employees in enumerate(chunks):
+		frappe.enqueue(
+			simulate_salary_slips_for_employees,
+			timeout=3000,
+			employees=chunk_employees,
+			args=args,
+			simulation=simulation,
+			chunk=chunk,
+			total_chunks=len(chunks),
+		)
+
+
+def get_simulation_key(simulation: str) -> str:
+	return f"payroll_simulation:{simulation}"
+
+
+def simulate_salary_slips_for_employees(
+	employees,
+	args,
+	simulation: str | None = None,
+	chunk: int | None = None,
+	total_chunks: int | None = None,
+) -> frappe._dict:
+	"""Runs salary slip calculation for the employees without inserting the salary slips.
+	Returns net pay per employee, errors per employee and aggregate totals"""
+	result = frappe._dict(salary_slips=[], errors=[])
+	context = PayrollRunContext(employees, args).prefetch()
+	mute_messages = frappe.flags.mute_messages
+	frappe.flags.mute_messages = True
+	frappe.db.savepoint("payroll_simulation")
+
+	try:
+		for emp in employees:
+			salary_slip = frappe.new_doc("Salary Slip")
+			salary_slip.update(dict(args, employee=emp))
+			salary_slip._payroll_run_context = context
+
+			try:
+				# runs validate hooks of other apps as well, like insert would
+				salary_slip.run_method("validate")
+			except Exception as e:
+				result.errors.append({"employee": emp, "error": str(e)})
+				continue
+
+			result.salary_slips.append(
+				{
+					"employee": emp,
+					"employee_name": salary_slip.employee_name,
+					"salary_structure": salary_slip.salary_structure,
+					"payment_days": salary_slip.payment_days,
+					"gross_pay": salary_slip.gross_pay,
+					"total_deduction": salary_slip.total_deduction,
+					"net_pay": salary_slip.net_pay,
+					"base_net_pay": salary_slip.base_net_pay,
+					"components": {
+						d.salary_component: flt(d.amount)
+						for d in salary_slip.earnings + salary_slip.deductions
+						if not d.do_not_include_in_total
+					},
+				}
+			)
+	finally:
+		frappe.flags.mute_messages = mute_messages
+		# nothing is meant to be written, discard anything a hook may have written
+		frappe.db.rollback(save_point="payroll_simulation")
+
+	result.totals = get_simulation_totals(result.salary_slips, len(result.errors))
+
+	if chunk is not None:
+		frappe.publish_realtime(
+			"payroll_simulation_progress",
+			message={
+				"simulation": simulation,
+				"chunk": chunk,
+				"total_chunks": total_chunks,
+				"result": result,
+			},
+			user=frappe.session.user,
+		)
+		complete_simulation_chunk(simulation, chunk, total_chunks, result)
+
+	return result
+
+
+def complete_simulation_chunk(simulation: str, chunk: int, total_chunks: int, result: dict) -> None:
+	"""Publishes the combined totals of all chunks once the last chunk of the simulation has finished"""
+	key = get_simulation_key(simulation)
+	cache = frappe.cache()
+
+	# serialise chunks finishing together, so that exactly one of them sees all the results
+	with cache.lock(cache.make_key(f"{key}:lock"), timeout=SIMULATION_LOCK_TIMEOUT):
+		cache.hset(key, str(chunk), frappe._dict(totals=result.totals, errors=result.errors))
+
+		chunk_results = cache.hgetall(key) or {}
+		if len(chunk_results) < total_chunks:
+			return
+
+		cache.delete_value(key)
+
+	frappe.publish_realtime(
+		"completed_payroll_simulation",
+		message={
+			"simulation": simulation,
+			"totals": merge_simulation_totals([d.totals for d in chunk_results.values()]),
+			"errors": [error for d in chunk_results.values() for error in d.errors],
+		},
+		user=frappe.session.user,
+	)
+
+
+def get_simulation_totals(salary_slips: list[dict], errors: int = 0) -> frappe._dict:
+	totals = frappe._dict(
+		employees=len(salary_slips),
+		errors=errors,
+		gross_pay=0.0,
+		total_deduction=0.0,
+		net_pay=0.0,
+		base_net_pay=0.0,
+		components={},
+	)
+
+	for salary_slip in salary_slips:
+		for field in SIMULATION_TOTAL_FIELDS:
+			totals[field] += flt(salary_slip[field])
+		for component, amount in salary_slip["components"].items():
+			totals.components[component] = totals.components.get(component, 0.0) + flt(amount)
+
+	return totals
+
+
+def merge_simulation_totals(chunk_totals: list[dict]) -> frappe._dict:
+	totals = get_simulation_totals([])
+	for d in chunk_totals:
+		totals.employees += d["employees"]
+		totals.errors += d["errors"]
+		for field in SIMULATION_TOTAL_FIELDS:
+			totals[field] += flt(d[field])
+		for component, amount in d["components"].items():
+			totals.components[component] = totals.components.get(component, 0.0) + flt(amount)
+
+	return totals
 
 
 def show_payroll_submission_status(submitted, unsubmitted, payroll_entry):
@@ -1485,36 +1879,45 @@ def get_existing_salary_slips(employees, args):
 	).run(pluck=True)
 
 
-def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progress=True):
-	try:
-		submitted = []
-		unsubmitted = []
-		frappe.flags.via_payroll_entry = True
-		count = 0
+def enqueue_salary_slip_submission(payroll_entry, salary_slips: list) -> None:
+	"""Shards the salary slips into chunks submitted by separate background jobs.
+	Each chunk commits on its own, the accrual journal entry is made once all chunks finish"""
+	chunks = list(create_batch(salary_slips, SALARY_SLIP_CHUNK_SIZE))
+	frappe.cache().delete_value(get_chunk_status_key(payroll_entry.name))
+
+	for chunk, chunk_salary_slips in enumerate(chunks):
+		frappe.enqueue(
+			submit_salary_slips_for_employees,
+			timeout=3000,
+			payroll_entry=payroll_entry,
+			salary_slips=chunk_salary_slips,
+			publish_progress=False,
+			chunk=chunk,
+			total_chunks=len(chunks),
+			enqueue_after_commit=True,
+		)
 
-		for entry in salary_slips:
-			salary_slip = frappe.get_doc("Salary Slip", entry[0])
-			if salary_slip.net_pay < 0:
-				unsubmitted.append(entry[0])
-			else:
-				try:
-					salary_slip.submit()
-					submitted.append(salary_slip)
-				except frappe.ValidationError:
-					unsubmitted.append(entry[0])
 
-			count += 1
-			if publish_progress:
-				frappe.publish_progress(
-					count * 100 / len(salary_slips), title=_("Submitting Salary Slips...")
-				)
+def submit_salary_slips_for_employees(
+	payroll_entry,
+	salary_slips,
+	publish_progress=True,
+	chunk: int | None = None,
+	total_chunks: int | None = None,
+):
+	if chunk is not None:
+		return submit_salary_slips_chunk(payroll_entry, salary_slips, chunk, total_chunks)
+
+	try:
+		frappe.flags.via_payroll_entry = True
+		submitted, unsubmitted = submit_draft_salary_slips(salary_slips, publish_progress)
 
+		# also picks up slips submitted by earlier chunked runs that failed before the accrual entry
+		accrued = make_accrual_jv_for_submitted_salary_slips(payroll_entry)
 		if submitted:
-			payroll_entry.make_accrual_jv_entry(submitted)
 			payroll_entry.email_salary_slip(submitted)
-			payroll_entry.db_set({"salary_slips_submitted": 1, "status": "Submitted", "error_message": ""})
 
-		show_payroll_submission_status(submitted, unsubmitted, payroll_entry)
+		show_payroll_submission_status(accrued, unsubmitted, payroll_entry)
 
 	except Exception as e:
 		frappe.db.rollback()
@@ -1527,6 +1930,114 @@ def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progr
 	frappe.flags.via_payroll_entry = False
 
 
+def submit_draft_salary_slips(salary_slips, publish_progress=True) -> tuple[list, list]:
+	submitted = []
+	unsubmitted = []
+	count = 0
+
+	for entry in salary_slips:
+		salary_slip = frappe.get_doc("Salary Slip", entry[0])
+		if salary_slip.net_pay < 0:
+			unsubmitted.append(entry[0])
+		else:
+			try:
+				salary_slip.submit()
+				submitted.append(salary_slip)
+			except frappe.ValidationError:
+				unsubmitted.append(entry[0])
+
+		count += 1
+		if publish_progress:
+			frappe.publish_progress(count * 100 / len(salary_slips), title=_("Submitting Salary Slips..."))
+
+	return submitted, unsubmitted
+
+
+def submit_salary_slips_chunk(payroll_entry, salary_slips, chunk: int, total_chunks: int):
+	"""Submits a chunk of salary slips and commits, so that a failure in one chunk only rolls back that chunk.
+	Component totals of the chunk are aggregated right away for the accrual journal entry"""
+	error_message = result = None
+
+	try:
+		frappe.flags.via_payroll_entry = True
+		submitted, unsubmitted = submit_draft_salary_slips(salary_slips, publish_progress=False)
+
+		submitted_names = [d.name for d in submitted]
+		result = frappe._dict(
+			submitted=submitted_names,
+			unsubmitted=unsubmitted,
+			earnings=(payroll_entry.get_salary_components("earnings", submitted_names) or []),
+			deductions=(payroll_entry.get_salary_components("deductions", submitted_names) or []),
+		)
+		frappe.db.commit()  # nosemgrep
+
+		payroll_entry.email_salary_slip(submitted)
+
+	except Exception as e:
+		frappe.db.rollback()
+		result = None
+		error_message = get_payroll_failure_message("submission", payroll_entry, e)
+
+	finally:
+		frappe.db.commit()  # nosemgrep
+		frappe.flags.via_payroll_entry = False
+
+	chunks = complete_chunk(payroll_entry, "submission", chunk, total_chunks, error_message, result)
+	frappe.db.commit()  # nosemgrep
+
+	if chunks is None:
+		return
+
+	try:
+		if not chunks.errors:
+			frappe.flags.via_payroll_entry = True
+			accrued = make_accrual_jv_for_submitted_salary_slips(
+				payroll_entry,
+				salary_components={
+					component_type: [row for result in chunks.results for row in result[component_type]]
+					for component_type in ("earnings", "deductions")
+				},
+				aggregated_salary_slips=[name for result in chunks.results for name in result.submitted],
+			)
+			if not accrued:
+				payroll_entry.db_set({"status": "Submitted", "error_message": ""})
+
+			unsubmitted = [name for result in chunks.results for name in result.unsubmitted]
+			show_payroll_submission_status(accrued, unsubmitted, payroll_entry)
+
+	except Exception as e:
+		frappe.db.rollback()
+		log_payroll_failure("submission", payroll_entry, e)
+
+	finally:
+		frappe.db.commit()  # nosemgrep
+		frappe.publish_realtime("completed_salary_slip_submission", user=frappe.session.user)
+		frappe.flags.via_payroll_entry = False
+
+
+def make_accrual_jv_for_submitted_salary_slips(
+	payroll_entry, salary_components: dict | None = None, aggregated_salary_slips: list | None = None
+) -> list:
+	"""Makes the accrual journal entry for all submitted salary slips of the payroll entry
+	that are not yet linked to one. Returns the salary slips that were accrued.
+
+	Pre-aggregated `salary_components` are used only if they cover exactly those salary slips,
+	else the component totals are read from the salary slips"""
+	pending_salary_slips = [d.name for d in payroll_entry.get_sal_slip_list(ss_status=1, as_dict=True)]
+	if not pending_salary_slips:
+		return []
+
+	if aggregated_salary_slips is None or set(aggregated_salary_slips) != set(pending_salary_slips):
+		salary_components = None
+
+	payroll_entry.make_accrual_jv_entry(
+		[frappe._dict(name=name) for name in pending_salary_slips], salary_components=salary_components
+	)
+	payroll_entry.db_set({"salary_slips_submitted": 1, "status": "Submitted", "error_message": ""})
+
+	return pending_salary_slips
+
+
 @frappe.whitelist()
 @frappe.validate_and_sanitize_search_inputs
 def get_payroll_entries_for_jv(doctype, txt, searchfield, start, page_len, filters):
@@ -0,0 +1,193 @@
+# Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.query_builder import Order
+from frappe.utils import getdate
+
+from hrms.utils.holiday_list import get_holiday_dates_for_lists, resolve_holiday_lists
+
+
+class PayrollRunContext:
+	"""Bulk-loads the data needed to process salary slips of a payroll run for all employees
+	in a handful of set-based queries. Salary slips attached to the context (`_payroll_run_context`)
+	read from it instead of fetching records one employee at a time.
+
+	The context only applies to slips for the same company and period, see `applies_to`.
+	"""
+
+	def __init__(self, employees: list[str], args: dict):
+		self.employees = list(employees)
+		self.company = args.company
+		self.start_date = getdate(args.start_date)
+		self.end_date = getdate(args.end_date)
+		self.payroll_frequency = args.payroll_frequency
+		self.salary_slip_based_on_timesheet = args.salary_slip_based_on_timesheet
+
+	def prefetch(self) -> "PayrollRunContext":
+		from hrms.payroll.doctype.payroll_period.payroll_period import get_payroll_period
+
+		self.payroll_period = get_payroll_period(self.start_date, self.end_date, self.company)
+
+		self.load_employees()
+		self.load_salary_structure_assignments()
+		self.load_holidays()
+		self.load_attendance()
+		self.load_leave_applications()
+		self.load_additional_salaries()
+		self.load_year_to_date_totals()
+		self.load_tax_ledgers()
+
+		return self
+
+	def applies_to(self, salary_slip) -> bool:
+		return (
+			salary_slip.employee in self.employee_details
+			and salary_slip.company == self.company
+			and getdate(salary_slip.start_date) == self.start_date
+			and getdate(salary_slip.end_date) == self.end_date
+		)
+
+	def load_employees(self):
+		employees = frappe.get_all("Employee", filters={"name": ("in", self.employees)}, fields=["*"])
+		self.employee_details = {}
+		for employee in employees:
+			employee.doctype = "Employee"
+			self.employee_details[employee.name] = employee
+
+	def load_salary_structure_assignments(self):
+		ss = frappe.qb.DocType("Salary Structure")
+		ssa = frappe.qb.DocType("Salary Structure Assignment")
+
+		assignments = (
+			frappe.qb.from_(ssa)
+			.join(ss)
+			.on(ssa.salary_structure == ss.name)
+			.select(
+				ssa.star,
+				ss.docstatus.as_("structure_docstatus"),
+				ss.is_active.as_("structure_is_active"),
+				ss.payroll_frequency.as_("structure_payroll_frequency"),
+			)
+			.where((ssa.docstatus == 1) & (ssa.employee.isin(self.employees)))
+			.orderby(ssa.from_date, order=Order.desc)
+		).run(as_dict=True)
+
+		self.salary_structure_assignments = {}
+		for assignment in assignments:
+			self.salary_structure_assignments.setdefault(assignment.employee, []).append(assignment)
+
+	def load_holidays(self):
+		self.holiday_list_for_employee = resolve_holiday_lists(list(self.employee_details))
+		self.holidays = get_holiday_dates_for_lists(
+			set(filter(None, self.holiday_list_for_employee.values())), self.start_date, self.end_date
+		)
+
+	def load_attendance(self):
+		Attendance = frappe.qb.DocType("Attendance")
+
+		attendance = (
+			frappe.qb.from_(Attendance)
+			.select(Attendance.employee, Attendance.attendance_date, Attendance.status, Attendance.leave_type)
+			.where(
+				(Attendance.employee.isin(self.employees))
+				& (Attendance.docstatus == 1)
+				& (Attendance.attendance_date.between(self.start_date, self.end_date))
+			)
+		).run(as_dict=True)
+
+		self.attendance = {}
+		for row in attendance:
+			self.attendance.setdefault(row.employee, []).append(row)
+
+	def load_leave_applications(self):
+		from hrms.payroll.doctype.salary_slip.salary_slip import get_lwp_or_ppl_leave_applications
+
+		self.leave_applications = {employee: [] for employee in self.employees}
+		for leave in get_lwp_or_ppl_leave_applications(self.employees, self.start_date, self.end_date):
+			self.leave_applications[leave.employee].append(leave)
+
+	def load_additional_salaries(self):
+		from hrms.payroll.doctype.additional_salary.additional_salary import get_additional_salary_records
+
+		self.additional_salaries = {}
+		for component_type in ("earnings", "deductions"):
+			for record in get_additional_salary_records(
+				self.employees, self.start_date, self.end_date, component_type
+			):
+				self.additional_salaries.setdefault((record.employee, component_type), []).append(record)
+
+	def load_year_to_date_totals(self):
+		from hrms.payroll.doctype.salary_slip.salary_slip import (
+			get_year_to_date_period,
+			get_year_to_date_totals,
+		)
+
+		period_start_date, period_end_date = get_year_to_date_period(
+			self.start_date, self.company, self.payroll_period
+		)
+		self.year_to_date_key = (getdate(period_start_date), getdate(period_end_date), self.start_date)
+		self.year_to_date_totals = get_year_to_date_totals(
+			self.employees, period_start_date, period_end_date, self.start_date
+		)
+
+	def load_tax_ledgers(self):
+		from hrms.payroll.doctype.employee_tax_ledger.employee_tax_ledger import get_tax_ledger_entries
+
+		self.tax_ledger_entries = {}
+		if self.payroll_period:
+			self.tax_ledger_entries = get_tax_ledger_entries(self.employees, self.payroll_period.name)
+
+	def get_employee(self, employee: str) -> dict:
+		return self.employee_details[employee]
+
+	def get_active_salary_structure(self, employee: str, on_or_before, payroll_frequency=None) -> str | None:
+		"""Returns the latest active salary structure assigned on or before the given date"""
+		for assignment in self.salary_structure_assignments.get(employee, []):
+			if (
+				assignment.structure_docstatus == 1
+				and assignment.structure_is_active == "Yes"
+				and getdate(assignment.from_date) <= getdate(on_or_before)
+				and (not payroll_frequency or assignment.structure_payroll_frequency == payroll_frequency)
+			):
+				return assignment.salary_structure
+
+	def get_salary_structure_assignment(self, employee: str, salary_structure: str, on_or_before):
+		for assignment in self.salary_structure_assignments.get(employee, []):
+			if assignment.salary_structure == salary_structure and getdate(assignment.from_date) <= getdate(
+				on_or_before
+			):
+				return assignment
+
+	def get_holidays(self, employee: str, start_date, end_date) -> list | None:
+		"""Returns holidays for the employee between the given dates,
+		or None if the dates fall outside the payroll run or no holiday list is set"""
+		start_date, end_date = getdate(start_date), getdate(end_date)
+		holiday_list = self.holiday_list_for_employee.get(employee)
+		if not holiday_list or start_date < self.start_date or end_date > self.end_date:
+			return None
+
+		return [
+			holiday for holiday in self.holidays.get(holiday_list, []) if start_date <= holiday <= end_date
+		]
+
+	def get_attendance(self, employee: str, start_date, end_date) -> list:
+		start_date, end_date = getdate(start_date), getdate(end_date)
+		return [
+			row
+			for row in self.attendance.get(employee, [])
+			if start_date <= getdate(row.attendance_date) <= end_date
+		]
+
+	def get_leave_applications(self, employee: str) -> list:
+		return self.leave_applications.get(employee, [])
+
+	def get_additional_salaries(self, employee: str, component_type: str) -> list:
+		return self.additional_salaries.get((employee, component_type), [])
+
+	def get_year_to_date_totals(self, employee: str, key: tuple) -> dict | None:
+		if key == self.year_to_date_key:
+			return self.year_to_date_totals.get(employee)
+
+	def get_tax_ledger_entries(self, employee: str) -> list | None:
+		return self.tax_ledger_entries.get(employee)
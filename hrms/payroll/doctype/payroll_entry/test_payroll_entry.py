@@ -5,7 +5,7 @@ from dateutil.relativedelta import relativedelta
 
 import frappe
 from frappe.tests import IntegrationTestCase, change_settings
-from frappe.utils import add_days, add_months, cstr
+from frappe.utils import add_days, add_months, cstr, flt
 
 import erpnext
 from erpnext.accounts.utils import get_fiscal_year, getdate, nowdate
@@ -20,9 +20,13 @@ from hrms.hr.doctype.employee_advance.test_employee_advance import (
 )
 from hrms.payroll.doctype.payroll_entry.payroll_entry import (
 	PayrollEntry,
+	create_salary_slips_for_employees,
 	get_end_date,
 	get_start_end_dates,
+	simulate_salary_slips_for_employees,
+	submit_salary_slips_for_employees,
 )
+from hrms.payroll.doctype.payroll_entry.payroll_run_context import PayrollRunContext
 from hrms.payroll.doctype.salary_component.test_salary_component import create_salary_component
 from hrms.payroll.doctype.salary_slip.salary_slip_loan_utils import if_lending_app_installed
 from hrms.payroll.doctype.salary_slip.test_salary_slip import (
@@ -90,6 +94,38 @@ class TestPayrollEntry(IntegrationTestCase):
 			company=company.name,
 		)
 
+	def test_salary_slip_with_payroll_run_context(self):
+		company = frappe.get_doc("Company", "_Test Company")
+		employee = frappe.db.get_value("Employee", {"company": "_Test Company"})
+		setup_salary_structure(employee, company)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		args = frappe._dict(
+			doctype="Salary Slip",
+			employee=employee,
+			company=company.name,
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			posting_date=dates.end_date,
+			payroll_frequency="Monthly",
+			salary_slip_based_on_timesheet=0,
+			currency=company.default_currency,
+			exchange_rate=1,
+		)
+		context = PayrollRunContext([employee], args).prefetch()
+
+		def get_salary_slip(context=None):
+			salary_slip = frappe.get_doc(args)
+			salary_slip._payroll_run_context = context
+			salary_slip.validate()
+			return salary_slip
+
+		# slips processed with the prefetched context match the ones computed record by record
+		expected, actual = get_salary_slip(), get_salary_slip(context)
+		self.assertTrue(context.applies_to(actual))
+		for field in ("salary_structure", "payment_days", "gross_pay", "net_pay", "year_to_date"):
+			self.assertEqual(expected.get(field), actual.get(field))
+
 	def test_multi_currency_payroll_entry(self):
 		company = frappe.get_doc("Company", "_Test Company")
 		create_department("Accounts")
@@ -233,6 +269,75 @@ class TestPayrollEntry(IntegrationTestCase):
 		cost_centers = pe.get_payroll_cost_centers_for_employee(employee, "_Test Salary Structure 2")
 		self.assertEqual(cost_centers, COST_CENTERS)
 
+	def test_bulk_loaded_accrual_details(self):
+		"""Test accrual details loaded for all employees match the ones looked up per employee"""
+		department = create_department("Accrual Details Test")
+		frappe.db.set_value("Department", department, "payroll_cost_center", "_Test Cost Center 2 - _TC")
+
+		employee1 = make_employee(
+			"test_accrual_emp1@example.com",
+			payroll_cost_center="_Test Cost Center - _TC",
+			department=department,
+			company="_Test Company",
+		)
+		# split across multiple cost centers in the salary structure assignment
+		employee2 = make_employee(
+			"test_accrual_emp2@example.com", department=department, company="_Test Company"
+		)
+		# takes the cost center of the department
+		employee3 = make_employee(
+			"test_accrual_emp3@example.com", department=department, company="_Test Company"
+		)
+
+		create_assignments_with_cost_centers(employee1, employee2)
+		setup_salary_structure(
+			employee3, frappe.get_doc("Company", "_Test Company"), salary_structure="_Test Salary Structure 3"
+		)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		pe = make_payroll_entry(
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			payable_account="_Test Payroll Payable - _TC",
+			currency="INR",
+			department=department,
+			company="_Test Company",
+			payment_account="Cash - _TC",
+			cost_center="Main - _TC",
+		)
+
+		salary_components = pe.get_salary_components("earnings") + pe.get_salary_components("deductions")
+		self.assertEqual({d.employee for d in salary_components}, {employee1, employee2, employee3})
+
+		bulk_loaded = frappe.get_doc("Payroll Entry", pe.name)
+		bulk_loaded.set_accrual_details(salary_components)
+		per_employee = frappe.get_doc("Payroll Entry", pe.name)
+
+		for d in salary_components:
+			self.assertEqual(
+				bulk_loaded.employee_cost_centers[d.employee],
+				per_employee.get_payroll_cost_centers_for_employee(d.employee, d.salary_structure),
+			)
+			self.assertEqual(
+				bulk_loaded.get_salary_component_account(d.salary_component),
+				per_employee.get_salary_component_account(d.salary_component),
+			)
+			for component_type in ("earnings", "deductions"):
+				self.assertEqual(
+					bulk_loaded.should_add_component_to_accrual_jv(component_type, d),
+					per_employee.should_add_component_to_accrual_jv(component_type, d),
+				)
+				self.assertEqual(
+					bulk_loaded.get_advance_deduction(component_type, d),
+					per_employee.get_advance_deduction(component_type, d),
+				)
+
+		self.assertEqual(
+			bulk_loaded.employee_cost_centers[employee2],
+			{"_Test Cost Center - _TC": 60, "_Test Cost Center 2 - _TC": 40},
+		)
+		self.assertEqual(bulk_loaded.employee_cost_centers[employee3], {"_Test Cost Center 2 - _TC": 100})
+
 	def test_get_end_date(self):
 		self.assertEqual(get_end_date("2017-01-01", "monthly"), {"end_date": "2017-01-31"})
 		self.assertEqual(get_end_date("2017-02-01", "monthly"), {"end_date": "2017-02-28"})
@@ -344,6 +449,103 @@ class TestPayrollEntry(IntegrationTestCase):
 		self.assertEqual(payroll_entry.status, "Queued")
 		frappe.flags.enqueue_payroll_entry = False
 
+	def test_chunked_salary_slip_creation_and_submission(self):
+		company_doc = frappe.get_doc("Company", "_Test Company")
+		employees = [
+			make_employee(f"test_chunked_creation_{i}@payroll.com", company=company_doc.name)
+			for i in range(2)
+		]
+		for employee in employees:
+			setup_salary_structure(employee, company_doc)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		payroll_entry = get_payroll_entry(
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			payable_account=company_doc.default_payroll_payable_account,
+			currency=company_doc.default_currency,
+			company=company_doc.name,
+			cost_center="Main - _TC",
+		)
+		frappe.flags.enqueue_payroll_entry = True
+		payroll_entry.submit()
+		frappe.flags.enqueue_payroll_entry = False
+		self.assertEqual(frappe.db.get_value("Payroll Entry", payroll_entry.name, "status"), "Queued")
+
+		# process each chunk as a separate job would
+		args = payroll_entry.get_salary_slip_args()
+		create_salary_slips_for_employees([employees[0]], args, chunk=0, total_chunks=2)
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.status, "Queued")
+		self.assertFalse(payroll_entry.salary_slips_created)
+
+		create_salary_slips_for_employees([employees[1]], args, chunk=1, total_chunks=2)
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.status, "Submitted")
+		self.assertTrue(payroll_entry.salary_slips_created)
+		self.assertEqual(frappe.db.count("Salary Slip", {"payroll_entry": payroll_entry.name}), 2)
+
+		# each chunk is submitted & committed on its own, the accrual entry is made after the last chunk
+		salary_slips = payroll_entry.get_sal_slip_list(ss_status=0)
+		payroll_entry.db_set("status", "Queued")
+		submit_salary_slips_for_employees(payroll_entry, salary_slips[:1], chunk=0, total_chunks=2)
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.status, "Queued")
+		self.assertFalse(payroll_entry.salary_slips_submitted)
+		self.assertEqual(frappe.db.get_value("Salary Slip", salary_slips[0][0], "docstatus"), 1)
+
+		submit_salary_slips_for_employees(payroll_entry, salary_slips[1:], chunk=1, total_chunks=2)
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.status, "Submitted")
+		self.assertTrue(payroll_entry.salary_slips_submitted)
+
+		journal_entries = {
+			frappe.db.get_value("Salary Slip", salary_slip[0], "journal_entry")
+			for salary_slip in salary_slips
+		}
+		self.assertEqual(len(journal_entries), 1)
+		self.assertEqual(
+			journal_entries, {d.parent for d in get_linked_journal_entries(payroll_entry.name, docstatus=1)}
+		)
+
+	def test_payroll_simulation(self):
+		company_doc = frappe.get_doc("Company", "_Test Company")
+		employees = [
+			make_employee(f"test_simulation_{i}@payroll.com", company=company_doc.name) for i in range(2)
+		]
+		for employee in employees:
+			setup_salary_structure(employee, company_doc)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		payroll_entry = get_payroll_entry(
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			payable_account=company_doc.default_payroll_payable_account,
+			currency=company_doc.default_currency,
+			company=company_doc.name,
+			cost_center="Main - _TC",
+		)
+
+		result = payroll_entry.simulate_payroll()
+		self.assertEqual(frappe.db.count("Salary Slip", {"payroll_entry": payroll_entry.name}), 0)
+		self.assertEqual(result.totals.employees + result.totals.errors, len(payroll_entry.employees))
+
+		# a chunk simulated in a background job returns the same results
+		args = payroll_entry.get_salary_slip_args()
+		chunk_result = simulate_salary_slips_for_employees(
+			employees, args, simulation="test", chunk=0, total_chunks=1
+		)
+		self.assertEqual(chunk_result.totals.employees, 2)
+		self.assertFalse(chunk_result.errors)
+
+		# simulated net pay matches the created salary slips
+		create_salary_slips_for_employees(employees, args, publish_progress=False)
+		for d in chunk_result.salary_slips:
+			net_pay = frappe.db.get_value(
+				"Salary Slip", {"employee": d["employee"], "payroll_entry": payroll_entry.name}, "net_pay"
+			)
+			self.assertEqual(flt(d["net_pay"]), flt(net_pay))
+
 	def test_salary_slip_operation_failure(self):
 		company = "_Test Company"
 		company_doc = frappe.get_doc("Company", company)
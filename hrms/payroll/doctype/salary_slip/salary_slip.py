@@ -3,12 +3,14 @@
 
 
 import unicodedata
+from bisect import bisect_right
+from collections import OrderedDict
 from datetime import date
 
 import frappe
 from frappe import _, msgprint
 from frappe.model.naming import make_autoname
-from frappe.query_builder import Order
+from frappe.query_builder import Case, Order
 from frappe.query_builder.functions import Count, Sum
 from frappe.utils import (
 	add_days,
@@ -30,7 +32,6 @@ from frappe.utils.background_jobs import enqueue
 
 import erpnext
 from erpnext.accounts.utils import get_fiscal_year
-from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
 from erpnext.utilities.transaction_base import TransactionBase
 
 from hrms.hr.utils import validate_active_employee
@@ -42,6 +43,11 @@ from hrms.payroll.doctype.employee_benefit_claim.employee_benefit_claim import (
 	get_benefit_claim_amount,
 	get_last_payroll_period_benefits,
 )
+from hrms.payroll.doctype.employee_tax_ledger.employee_tax_ledger import (
+	get_tax_ledger_entries,
+	get_tax_ledger_totals,
+	update_tax_ledger,
+)
 from hrms.payroll.doctype.payroll_entry.payroll_entry import get_salary_withholdings, get_start_end_dates
 from hrms.payroll.doctype.payroll_period.payroll_period import (
 	get_payroll_period,
@@ -52,15 +58,19 @@ from hrms.payroll.doctype.salary_slip.salary_slip_loan_utils import (
 	make_loan_repayment_entry,
 	set_loan_repayment,
 )
-from hrms.payroll.utils import sanitize_expression
-from hrms.utils.holiday_list import get_holiday_dates_between
+from hrms.payroll.utils import get_referenced_names, sanitize_expression
+from hrms.utils.holiday_list import get_holiday_dates_between, get_holiday_list_for_employee
 
 # cache keys
-HOLIDAYS_BETWEEN_DATES = "holidays_between_dates"
 LEAVE_TYPE_MAP = "leave_type_map"
 SALARY_COMPONENT_VALUES = "salary_component_values"
 TAX_COMPONENTS_BY_COMPANY = "tax_components_by_company"
 
+# process-local LRU cache of values derived from a salary structure version
+# (site, structure, key) -> (modified, value)
+SALARY_STRUCTURE_CACHE_SIZE = 256
+_salary_structure_cache = OrderedDict()
+
 
 class SalarySlip(TransactionBase):
 	def __init__(self, *args, **kwargs):
@@ -86,29 +96,38 @@ class SalarySlip(TransactionBase):
 	@property
 	def joining_date(self):
 		if not hasattr(self, "__joining_date"):
-			self.__joining_date = frappe.get_cached_value(
-				"Employee",
-				self.employee,
-				"date_of_joining",
-			)
+			if context := self.get_payroll_run_context():
+				self.__joining_date = context.get_employee(self.employee).date_of_joining
+			else:
+				self.__joining_date = frappe.get_cached_value(
+					"Employee",
+					self.employee,
+					"date_of_joining",
+				)
 
 		return self.__joining_date
 
 	@property
 	def relieving_date(self):
 		if not hasattr(self, "__relieving_date"):
-			self.__relieving_date = frappe.get_cached_value(
-				"Employee",
-				self.employee,
-				"relieving_date",
-			)
+			if context := self.get_payroll_run_context():
+				self.__relieving_date = context.get_employee(self.employee).relieving_date
+			else:
+				self.__relieving_date = frappe.get_cached_value(
+					"Employee",
+					self.employee,
+					"relieving_date",
+				)
 
 		return self.__relieving_date
 
 	@property
 	def payroll_period(self):
 		if not hasattr(self, "__payroll_period"):
-			self.__payroll_period = get_payroll_period(self.start_date, self.end_date, self.company)
+			if context := self.get_payroll_run_context():
+				self.__payroll_period = context.payroll_period
+			else:
+				self.__payroll_period = get_payroll_period(self.start_date, self.end_date, self.company)
 
 		return self.__payroll_period
 
@@ -134,6 +153,12 @@ class SalarySlip(TransactionBase):
 
 		return self.__actual_end_date
 
+	def get_payroll_run_context(self):
+		"""Returns the prefetched payroll run context if the slip is being processed via a payroll run"""
+		context = getattr(self, "_payroll_run_context", None)
+		if context and context.applies_to(self):
+			return context
+
 	def validate(self):
 		self.check_salary_withholding()
 		self.status = self.get_status()
@@ -152,9 +177,11 @@ class SalarySlip(TransactionBase):
 
 		self.set_salary_structure_assignment()
 		self.calculate_net_pay()
-		self.compute_year_to_date()
-		self.compute_month_to_date()
-		self.compute_component_wise_year_to_date()
+
+		year_to_date_totals = self.get_year_to_date_totals()
+		self.compute_year_to_date(year_to_date_totals)
+		self.compute_month_to_date(year_to_date_totals)
+		self.compute_component_wise_year_to_date(year_to_date_totals)
 
 		self.add_leave_balances()
 
@@ -197,6 +224,7 @@ class SalarySlip(TransactionBase):
 			self.update_status(self.name)
 
 			make_loan_repayment_entry(self)
+			update_tax_ledger(self)
 
 			if not frappe.flags.via_payroll_entry and not frappe.flags.in_patch:
 				email_salary_slip = cint(
@@ -231,6 +259,7 @@ class SalarySlip(TransactionBase):
 		self.update_payment_status_for_gratuity()
 
 		cancel_loan_repayment_entry(self)
+		update_tax_ledger(self)
 		self.publish_update()
 
 	def publish_update(self):
@@ -357,6 +386,21 @@ class SalarySlip(TransactionBase):
 				self.append("timesheets", {"time_sheet": data.name, "working_hours": data.total_hours})
 
 	def check_sal_struct(self):
+		if context := self.get_payroll_run_context():
+			self.salary_structure = context.get_active_salary_structure(
+				self.employee,
+				max(filter(None, (getdate(self.start_date), getdate(self.end_date), self.joining_date))),
+				payroll_frequency=(
+					self.payroll_frequency
+					if not self.salary_slip_based_on_timesheet and self.payroll_frequency
+					else None
+				),
+			)
+			if not self.salary_structure:
+				self.show_salary_structure_missing_message()
+
+			return self.salary_structure
+
 		ss = frappe.qb.DocType("Salary Structure")
 		ssa = frappe.qb.DocType("Salary Structure Assignment")
 
@@ -391,12 +435,15 @@ class SalarySlip(TransactionBase):
 
 		else:
 			self.salary_structure = None
-			frappe.msgprint(
-				_("No active or default Salary Structure found for employee {0} for the given dates").format(
-					self.employee
-				),
-				title=_("Salary Structure Missing"),
-			)
+			self.show_salary_structure_missing_message()
+
+	def show_salary_structure_missing_message(self):
+		frappe.msgprint(
+			_("No active or default Salary Structure found for employee {0} for the given dates").format(
+				self.employee
+			),
+			title=_("Salary Structure Missing"),
+		)
 
 	def pull_sal_struct(self):
 		from hrms.payroll.doctype.salary_structure.salary_structure import make_salary_slip
@@ -551,6 +598,17 @@ class SalarySlip(TransactionBase):
 		return no_of_holidays
 
 	def _get_marked_attendance_days(self, holidays: list | None = None) -> float:
+		if context := self.get_payroll_run_context():
+			return len(
+				[
+					d
+					for d in context.get_attendance(
+						self.employee, self.actual_start_date, self.actual_end_date
+					)
+					if not holidays or d.attendance_date not in holidays
+				]
+			)
+
 		Attendance = frappe.qb.DocType("Attendance")
 		query = (
 			frappe.qb.from_(Attendance)
@@ -572,7 +630,10 @@ class SalarySlip(TransactionBase):
 			return 0
 
 		if self.relieving_date:
-			employee_status = frappe.db.get_value("Employee", self.employee, "status")
+			if context := self.get_payroll_run_context():
+				employee_status = context.get_employee(self.employee).status
+			else:
+				employee_status = frappe.db.get_value("Employee", self.employee, "status")
 			if self.relieving_date < getdate(self.start_date) and employee_status != "Left":
 				frappe.throw(
 					_("Employee {0} relieved on {1} must be set as 'Left'").format(
@@ -589,25 +650,26 @@ class SalarySlip(TransactionBase):
 		return payment_days
 
 	def get_holidays_for_employee(self, start_date, end_date):
-		holiday_list = get_holiday_list_for_employee(self.employee)
-		key = f"{holiday_list}:{start_date}:{end_date}"
-		holiday_dates = frappe.cache().hget(HOLIDAYS_BETWEEN_DATES, key)
-
-		if not holiday_dates:
-			holiday_dates = get_holiday_dates_between(holiday_list, start_date, end_date)
-			frappe.cache().hset(HOLIDAYS_BETWEEN_DATES, key, holiday_dates)
+		if context := self.get_payroll_run_context():
+			holidays = context.get_holidays(self.employee, start_date, end_date)
+			if holidays is not None:
+				return holidays
 
-		return holiday_dates
+		holiday_list = get_holiday_list_for_employee(self.employee)
+		return get_holiday_dates_between(holiday_list, start_date, end_date)
 
 	def calculate_lwp_or_ppl_based_on_leave_application(
 		self, holidays, working_days_list, daily_wages_fraction_for_half_day
 	):
 		lwp = 0
-		leaves = get_lwp_or_ppl_for_date_range(
-			self.employee,
-			self.start_date,
-			self.end_date,
-		)
+		if context := self.get_payroll_run_context():
+			leaves = get_leave_date_mapper(context.get_leave_applications(self.employee))
+		else:
+			leaves = get_lwp_or_ppl_for_date_range(
+				self.employee,
+				self.start_date,
+				self.end_date,
+			)
 
 		for d in working_days_list:
 			if self.relieving_date and d > self.relieving_date:
@@ -653,6 +715,13 @@ class SalarySlip(TransactionBase):
 		return frappe.cache().get_value(LEAVE_TYPE_MAP, _get_leave_type_map)
 
 	def get_employee_attendance(self, start_date, end_date):
+		if context := self.get_payroll_run_context():
+			return [
+				d
+				for d in context.get_attendance(self.employee, start_date, end_date)
+				if d.status in ("Absent", "Half Day", "On Leave")
+			]
+
 		attendance = frappe.qb.DocType("Attendance")
 
 		attendance_details = (
@@ -744,7 +813,25 @@ class SalarySlip(TransactionBase):
 			doc.append("earnings", wages_row)
 
 	def set_salary_structure_assignment(self):
-		self._salary_structure_assignment = frappe.db.get_value(
+		if context := self.get_payroll_run_context():
+			self._salary_structure_assignment = context.get_salary_structure_assignment(
+				self.employee, self.salary_structure, self.actual_start_date
+			)
+		else:
+			self._salary_structure_assignment = self.fetch_salary_structure_assignment()
+
+		if not self._salary_structure_assignment:
+			frappe.throw(
+				_(
+					"Please assign a Salary Structure for Employee {0} applicable from or before {1} first"
+				).format(
+					frappe.bold(self.employee_name),
+					frappe.bold(formatdate(self.actual_start_date)),
+				)
+			)
+
+	def fetch_salary_structure_assignment(self):
+		return frappe.db.get_value(
 			"Salary Structure Assignment",
 			{
 				"employee": self.employee,
@@ -757,16 +844,6 @@ class SalarySlip(TransactionBase):
 			as_dict=True,
 		)
 
-		if not self._salary_structure_assignment:
-			frappe.throw(
-				_(
-					"Please assign a Salary Structure for Employee {0} applicable from or before {1} first"
-				).format(
-					frappe.bold(self.employee_name),
-					frappe.bold(formatdate(self.actual_start_date)),
-				)
-			)
-
 	def calculate_net_pay(self, skip_tax_breakup_computation: bool = False):
 		def set_gross_pay_and_base_gross_pay():
 			self.gross_pay = self.get_component_totals("earnings", depends_on_payment_days=1)
@@ -1105,11 +1182,31 @@ class SalarySlip(TransactionBase):
 				row.condition = sanitize_expression(row.condition)
 				row.formula = sanitize_expression(row.formula)
 
+		self._compiled_formulas = get_compiled_formulas(self._salary_structure_doc)
+		self._evaluation_order = get_evaluation_order(self._salary_structure_doc)
+
 	def add_structure_components(self, component_type):
 		self.data, self.default_data = self.get_data_for_eval()
 
-		for struct_row in self._salary_structure_doc.get(component_type):
-			self.add_structure_component(struct_row, component_type)
+		rows = self._salary_structure_doc.get(component_type)
+		evaluation_order = (getattr(self, "_evaluation_order", None) or {}).get(component_type)
+		if not evaluation_order or len(evaluation_order) != len(rows):
+			evaluation_order = range(len(rows))
+
+		# components are evaluated after the components referenced in their condition / formula
+		existing_rows = {id(row) for row in self.get(component_type)}
+		for position in evaluation_order:
+			self.add_structure_component(rows[position], component_type)
+
+		# while rows are added to the slip in the order of the structure
+		structure_position = {row.salary_component: position for position, row in enumerate(rows)}
+		table = self.get(component_type)
+		added_rows = [row for row in table if id(row) not in existing_rows]
+		table[:] = [row for row in table if id(row) in existing_rows] + sorted(
+			added_rows, key=lambda d: structure_position.get(d.salary_component, len(rows))
+		)
+		for idx, row in enumerate(table, 1):
+			row.idx = idx
 
 	def add_structure_component(self, struct_row, component_type):
 		if (
@@ -1159,7 +1256,10 @@ class SalarySlip(TransactionBase):
 	def get_data_for_eval(self):
 		"""Returns data for evaluating formula"""
 		data = frappe._dict()
-		employee = frappe.get_cached_doc("Employee", self.employee).as_dict()
+		if context := self.get_payroll_run_context():
+			employee = context.get_employee(self.employee)
+		else:
+			employee = frappe.get_cached_doc("Employee", self.employee).as_dict()
 
 		if not hasattr(self, "_salary_structure_assignment"):
 			self.set_salary_structure_assignment()
@@ -1192,11 +1292,11 @@ class SalarySlip(TransactionBase):
 	def eval_condition_and_formula(self, struct_row, data):
 		try:
 			condition, formula, amount = struct_row.condition, struct_row.formula, struct_row.amount
-			if condition and not _safe_eval(condition, self.whitelisted_globals, data):
+			if condition and not self.eval_expression(struct_row, "condition", data):
 				return None
 			if struct_row.amount_based_on_formula and formula:
 				amount = flt(
-					_safe_eval(formula, self.whitelisted_globals, data), struct_row.precision("amount")
+					self.eval_expression(struct_row, "formula", data), struct_row.precision("amount")
 				)
 			if amount:
 				data[struct_row.abbr] = amount
@@ -1226,6 +1326,17 @@ class SalarySlip(TransactionBase):
 			)
 			raise
 
+	def eval_expression(self, struct_row, fieldname, data):
+		"""Evaluates the condition or formula of a structure row, using the precompiled code if available"""
+		expression = struct_row.get(fieldname)
+		compiled = (getattr(self, "_compiled_formulas", None) or {}).get(
+			(struct_row.parentfield, struct_row.idx, fieldname)
+		)
+		if not compiled or compiled[0] != expression:
+			return _safe_eval(expression, self.whitelisted_globals, data)
+
+		return _eval_compiled(compiled[1], self.whitelisted_globals, data)
+
 	def add_employee_benefits(self):
 		for struct_row in self._salary_structure_doc.get("earnings"):
 			if struct_row.is_flexible_benefit == 1:
@@ -1271,8 +1382,15 @@ class SalarySlip(TransactionBase):
 						self.update_component_row(frappe._dict(last_benefit.struct_row), amount, "earnings")
 
 	def add_additional_salary_components(self, component_type):
+		context = self.get_payroll_run_context()
 		additional_salaries = get_additional_salaries(
-			self.employee, self.start_date, self.end_date, component_type
+			self.employee,
+			self.start_date,
+			self.end_date,
+			component_type,
+			additional_salary_list=(
+				context.get_additional_salaries(self.employee, component_type) if context else None
+			),
 		)
 
 		for additional_salary in additional_salaries:
@@ -1558,19 +1676,43 @@ class SalarySlip(TransactionBase):
 
 	def get_taxable_earnings_for_prev_period(self, start_date, end_date, allow_tax_exemption=False):
 		exempted_amount = 0
-		taxable_earnings = self.get_salary_slip_details(
-			start_date, end_date, parentfield="earnings", is_tax_applicable=1
-		)
-
-		if allow_tax_exemption:
-			exempted_amount = self.get_salary_slip_details(
-				start_date, end_date, parentfield="deductions", exempted_from_income_tax=1
+		if ledger_totals := self.get_tax_ledger_totals(start_date, end_date):
+			taxable_earnings = ledger_totals.taxable_earnings
+			if allow_tax_exemption:
+				exempted_amount = ledger_totals.exempted_amount
+		else:
+			taxable_earnings = self.get_salary_slip_details(
+				start_date, end_date, parentfield="earnings", is_tax_applicable=1
 			)
 
+			if allow_tax_exemption:
+				exempted_amount = self.get_salary_slip_details(
+					start_date, end_date, parentfield="deductions", exempted_from_income_tax=1
+				)
+
 		opening_taxable_earning = self.get_opening_for("taxable_earnings_till_date", start_date, end_date)
 
 		return (taxable_earnings + opening_taxable_earning) - exempted_amount, exempted_amount
 
+	def get_tax_ledger_totals(self, start_date, end_date, tax_component=None):
+		"""Returns totals of prior salary slips from the employee's tax ledger,
+		or None if the ledger cannot be used for the given dates"""
+		if not self.payroll_period or getdate(start_date) < getdate(self.payroll_period.start_date):
+			return None
+
+		if not hasattr(self, "_tax_ledger_entries"):
+			if context := self.get_payroll_run_context():
+				self._tax_ledger_entries = context.get_tax_ledger_entries(self.employee)
+			else:
+				self._tax_ledger_entries = get_tax_ledger_entries(
+					[self.employee], self.payroll_period.name
+				).get(self.employee)
+
+		if self._tax_ledger_entries is None:
+			return None
+
+		return get_tax_ledger_totals(self._tax_ledger_entries, start_date, end_date, tax_component)
+
 	def get_opening_for(self, field_to_select, start_date, end_date):
 		return self._salary_structure_assignment.get(field_to_select) or 0
 
@@ -1625,13 +1767,16 @@ class SalarySlip(TransactionBase):
 
 	def get_tax_paid_in_period(self, start_date, end_date, tax_component):
 		# find total_tax_paid, tax paid for benefit, additional_salary
-		total_tax_paid = self.get_salary_slip_details(
-			start_date,
-			end_date,
-			parentfield="deductions",
-			salary_component=tax_component,
-			variable_based_on_taxable_salary=1,
-		)
+		if ledger_totals := self.get_tax_ledger_totals(start_date, end_date, tax_component):
+			total_tax_paid = ledger_totals.tax_paid
+		else:
+			total_tax_paid = self.get_salary_slip_details(
+				start_date,
+				end_date,
+				parentfield="deductions",
+				salary_component=tax_component,
+				variable_based_on_taxable_salary=1,
+			)
 
 		tax_deducted_till_date = self.get_opening_for("tax_deducted_till_date", start_date, end_date)
 
@@ -1979,89 +2124,47 @@ class SalarySlip(TransactionBase):
 				self.gross_pay += flt(self.earnings[i].amount, earning.precision("amount"))
 		self.net_pay = flt(self.gross_pay) - flt(self.total_deduction)
 
-	def compute_year_to_date(self):
-		year_to_date = 0
-		period_start_date, period_end_date = self.get_year_to_date_period()
-
-		salary_slip_sum = frappe.get_list(
-			"Salary Slip",
-			fields=["sum(net_pay) as net_sum", "sum(gross_pay) as gross_sum"],
-			filters={
-				"employee": self.employee,
-				"start_date": [">=", period_start_date],
-				"end_date": ["<", period_end_date],
-				"name": ["!=", self.name],
-				"docstatus": 1,
-			},
-		)
+	def compute_year_to_date(self, totals: dict | None = None):
+		totals = totals or self.get_year_to_date_totals()
 
-		year_to_date = flt(salary_slip_sum[0].net_sum) if salary_slip_sum else 0.0
-		gross_year_to_date = flt(salary_slip_sum[0].gross_sum) if salary_slip_sum else 0.0
+		self.year_to_date = totals.net_pay + flt(self.net_pay)
+		self.gross_year_to_date = totals.gross_pay + flt(self.gross_pay)
 
-		year_to_date += self.net_pay
-		gross_year_to_date += self.gross_pay
-		self.year_to_date = year_to_date
-		self.gross_year_to_date = gross_year_to_date
+	def compute_month_to_date(self, totals: dict | None = None):
+		totals = totals or self.get_year_to_date_totals()
 
-	def compute_month_to_date(self):
-		month_to_date = 0
-		first_day_of_the_month = get_first_day(self.start_date)
-		salary_slip_sum = frappe.get_list(
-			"Salary Slip",
-			fields=["sum(net_pay) as sum"],
-			filters={
-				"employee": self.employee,
-				"start_date": [">=", first_day_of_the_month],
-				"end_date": ["<", self.start_date],
-				"name": ["!=", self.name],
-				"docstatus": 1,
-			},
-		)
+		self.month_to_date = totals.month_to_date + flt(self.net_pay)
 
-		month_to_date = flt(salary_slip_sum[0].sum) if salary_slip_sum else 0.0
+	def compute_component_wise_year_to_date(self, totals: dict | None = None):
+		totals = totals or self.get_year_to_date_totals()
 
-		month_to_date += self.net_pay
-		self.month_to_date = month_to_date
+		for key in ("earnings", "deductions"):
+			for component in self.get(key):
+				component.year_to_date = flt(totals.components.get(component.salary_component)) + flt(
+					component.amount
+				)
 
-	def compute_component_wise_year_to_date(self):
+	def get_year_to_date_totals(self) -> dict:
+		"""Returns totals of previously submitted salary slips for the year-to-date and month-to-date fields.
+		Uses totals prefetched for the whole payroll run if available, else fetches them for this employee"""
 		period_start_date, period_end_date = self.get_year_to_date_period()
+		key = (getdate(period_start_date), getdate(period_end_date), getdate(self.start_date))
 
-		ss = frappe.qb.DocType("Salary Slip")
-		sd = frappe.qb.DocType("Salary Detail")
-
-		for key in ("earnings", "deductions"):
-			for component in self.get(key):
-				year_to_date = 0
-				component_sum = (
-					frappe.qb.from_(sd)
-					.inner_join(ss)
-					.on(sd.parent == ss.name)
-					.select(Sum(sd.amount).as_("sum"))
-					.where(
-						(ss.employee == self.employee)
-						& (sd.salary_component == component.salary_component)
-						& (ss.start_date >= period_start_date)
-						& (ss.end_date < period_end_date)
-						& (ss.name != self.name)
-						& (ss.docstatus == 1)
-					)
-				).run()
+		if (context := self.get_payroll_run_context()) and (
+			totals := context.get_year_to_date_totals(self.employee, key[:3])
+		):
+			return totals
 
-				year_to_date = flt(component_sum[0][0]) if component_sum else 0.0
-				year_to_date += component.amount
-				component.year_to_date = year_to_date
+		return get_year_to_date_totals(
+			[self.employee],
+			period_start_date,
+			period_end_date,
+			self.start_date,
+			exclude_salary_slip=self.name,
+		)[self.employee]
 
 	def get_year_to_date_period(self):
-		if self.payroll_period:
-			period_start_date = self.payroll_period.start_date
-			period_end_date = self.payroll_period.end_date
-		else:
-			# get dates based on fiscal year if no payroll period exists
-			fiscal_year = get_fiscal_year(date=self.start_date, company=self.company, as_dict=1)
-			period_start_date = fiscal_year.year_start_date
-			period_end_date = fiscal_year.year_end_date
-
-		return period_start_date, period_end_date
+		return get_year_to_date_period(self.start_date, self.company, self.payroll_period)
 
 	def add_leave_balances(self):
 		self.set("leave_details", [])
@@ -2085,6 +2188,76 @@ class SalarySlip(TransactionBase):
 				)
 
 
+def get_year_to_date_period(start_date, company, payroll_period=None) -> tuple:
+	if payroll_period:
+		return payroll_period.start_date, payroll_period.end_date
+
+	# get dates based on fiscal year if no payroll period exists
+	fiscal_year = get_fiscal_year(date=start_date, company=company, as_dict=1)
+	return fiscal_year.year_start_date, fiscal_year.year_end_date
+
+
+def get_year_to_date_totals(
+	employees: list[str],
+	period_start_date,
+	period_end_date,
+	start_date,
+	exclude_salary_slip: str | None = None,
+) -> dict:
+	"""Returns totals of submitted salary slips for each employee in 2 grouped queries:
+	- net_pay, gross_pay: year to date, for slips within the year-to-date period
+	- month_to_date: net pay of slips from the start of the month till `start_date`
+	- components: year to date amount for each salary component
+	"""
+	totals = {
+		employee: frappe._dict(net_pay=0.0, gross_pay=0.0, month_to_date=0.0, components={})
+		for employee in employees
+	}
+	if not employees:
+		return totals
+
+	ss = frappe.qb.DocType("Salary Slip")
+	sd = frappe.qb.DocType("Salary Detail")
+
+	year_to_date_condition = (ss.start_date >= period_start_date) & (ss.end_date < period_end_date)
+	month_to_date_condition = (ss.start_date >= get_first_day(start_date)) & (ss.end_date < start_date)
+
+	conditions = (ss.employee.isin(employees)) & (ss.docstatus == 1)
+	if exclude_salary_slip:
+		conditions &= ss.name != exclude_salary_slip
+
+	slip_totals = (
+		frappe.qb.from_(ss)
+		.select(
+			ss.employee,
+			Sum(Case().when(year_to_date_condition, ss.net_pay).else_(0)).as_("net_pay"),
+			Sum(Case().when(year_to_date_condition, ss.gross_pay).else_(0)).as_("gross_pay"),
+			Sum(Case().when(month_to_date_condition, ss.net_pay).else_(0)).as_("month_to_date"),
+		)
+		.where(conditions & (year_to_date_condition | month_to_date_condition))
+		.groupby(ss.employee)
+	).run(as_dict=True)
+
+	for row in slip_totals:
+		totals[row.employee].update(
+			net_pay=flt(row.net_pay), gross_pay=flt(row.gross_pay), month_to_date=flt(row.month_to_date)
+		)
+
+	component_totals = (
+		frappe.qb.from_(sd)
+		.inner_join(ss)
+		.on(sd.parent == ss.name)
+		.select(ss.employee, sd.salary_component, Sum(sd.amount).as_("amount"))
+		.where(conditions & year_to_date_condition)
+		.groupby(ss.employee, sd.salary_component)
+	).run(as_dict=True)
+
+	for row in component_totals:
+		totals[row.employee].components[row.salary_component] = flt(row.amount)
+
+	return totals
+
+
 def unlink_ref_doc_from_salary_slip(doc, method=None):
 	"""Unlinks accrual Journal Entry from Salary Slips on cancellation"""
 	linked_ss = frappe.get_all(
@@ -2136,11 +2309,70 @@ def get_payroll_payable_account(company, payroll_entry):
 
 def calculate_tax_by_tax_slab(annual_taxable_earning, tax_slab, eval_globals=None, eval_locals=None):
 	eval_locals.update({"annual_taxable_earning": annual_taxable_earning})
+	slabs = [
+		slab
+		for slab in tax_slab.slabs
+		if not cstr(slab.condition).strip()
+		or eval_tax_slab_condition(cstr(slab.condition).strip(), eval_globals, eval_locals)
+	]
+
+	tax_amount = get_tax_for_slabs(annual_taxable_earning, slabs)
+	return apply_other_taxes_and_charges(tax_amount, annual_taxable_earning, tax_slab)
+
+
+def calculate_tax_by_tax_slab_for_employees(
+	annual_taxable_earnings: list[float], tax_slab, eval_globals=None, eval_locals: list[dict] | None = None
+) -> list[float]:
+	"""
+	Returns the tax for each of the annual taxable earnings as per the tax slab, computed in one pass.
+
+	`eval_locals` holds the data for evaluating slab conditions, one dict per taxable earning,
+	and is only required if the tax slab has conditional slabs. Conditions are evaluated once
+	per distinct value of the names they reference, and the tax for all earnings with the same
+	applicable slabs is looked up from a single bracket table.
+	"""
+	conditions = [cstr(slab.condition).strip() for slab in tax_slab.slabs]
+	referenced_names = {condition: get_referenced_names(condition) for condition in conditions if condition}
+	evaluated_conditions = {}
+
+	earnings_by_applicable_slabs = {}
+	for idx, annual_taxable_earning in enumerate(annual_taxable_earnings):
+		applicable_slabs = []
+		for slab_idx, condition in enumerate(conditions):
+			if condition:
+				data = dict(eval_locals[idx], annual_taxable_earning=annual_taxable_earning)
+				key = (condition, get_hashable_context(data, referenced_names[condition]))
+				if key not in evaluated_conditions:
+					evaluated_conditions[key] = eval_tax_slab_condition(condition, eval_globals, data)
+				if not evaluated_conditions[key]:
+					continue
+
+			applicable_slabs.append(slab_idx)
+
+		earnings_by_applicable_slabs.setdefault(tuple(applicable_slabs), []).append(idx)
+
+	tax_amounts = [0.0] * len(annual_taxable_earnings)
+	for applicable_slabs, indices in earnings_by_applicable_slabs.items():
+		slabs = [tax_slab.slabs[slab_idx] for slab_idx in applicable_slabs]
+		lower_limits, base_taxes, rates = get_tax_brackets(slabs)
+
+		for idx in indices:
+			annual_taxable_earning = annual_taxable_earnings[idx]
+			bracket = bisect_right(lower_limits, annual_taxable_earning) - 1
+			tax_amount = 0.0
+			if bracket >= 0:
+				tax_amount = base_taxes[bracket] + rates[bracket] * (
+					annual_taxable_earning - lower_limits[bracket]
+				)
+
+			tax_amounts[idx] = apply_other_taxes_and_charges(tax_amount, annual_taxable_earning, tax_slab)
+
+	return tax_amounts
+
+
+def get_tax_for_slabs(annual_taxable_earning, slabs) -> float:
 	tax_amount = 0
-	for slab in tax_slab.slabs:
-		cond = cstr(slab.condition).strip()
-		if cond and not eval_tax_slab_condition(cond, eval_globals, eval_locals):
-			continue
+	for slab in slabs:
 		if not slab.to_amount and annual_taxable_earning >= slab.from_amount:
 			tax_amount += (annual_taxable_earning - slab.from_amount + 1) * slab.percent_deduction * 0.01
 			continue
@@ -2150,6 +2382,31 @@ def calculate_tax_by_tax_slab(annual_taxable_earning, tax_slab, eval_globals=Non
 		elif annual_taxable_earning >= slab.from_amount and annual_taxable_earning >= slab.to_amount:
 			tax_amount += (slab.to_amount - slab.from_amount + 1) * slab.percent_deduction * 0.01
 
+	return tax_amount
+
+
+def get_tax_brackets(slabs) -> tuple[list, list, list]:
+	"""
+	Returns the slabs as brackets of (lower limit, tax at lower limit, marginal rate),
+	so that the tax on any amount within a bracket is `tax + rate * (amount - lower limit)`
+	"""
+	lower_limits = sorted(
+		{flt(slab.from_amount) for slab in slabs} | {flt(slab.to_amount) for slab in slabs if slab.to_amount}
+	)
+	base_taxes = [get_tax_for_slabs(limit, slabs) for limit in lower_limits]
+	rates = [
+		sum(
+			flt(slab.percent_deduction) * 0.01
+			for slab in slabs
+			if flt(slab.from_amount) <= limit and (not slab.to_amount or limit < flt(slab.to_amount))
+		)
+		for limit in lower_limits
+	]
+
+	return lower_limits, base_taxes, rates
+
+
+def apply_other_taxes_and_charges(tax_amount, annual_taxable_earning, tax_slab) -> float:
 	# other taxes and charges on income tax
 	for d in tax_slab.other_taxes_and_charges:
 		if flt(d.min_taxable_income) and flt(d.min_taxable_income) > annual_taxable_earning:
@@ -2163,6 +2420,20 @@ def calculate_tax_by_tax_slab(annual_taxable_earning, tax_slab, eval_globals=Non
 	return tax_amount
 
 
+def get_hashable_context(data: dict, names: set[str]) -> tuple:
+	"""Returns the values of the given names in `data` as a hashable key"""
+	context = []
+	for name in sorted(names):
+		value = data.get(name)
+		try:
+			hash(value)
+		except TypeError:
+			value = repr(value)
+		context.append((name, value))
+
+	return tuple(context)
+
+
 def eval_tax_slab_condition(condition, eval_globals=None, eval_locals=None):
 	if not eval_globals:
 		eval_globals = {
@@ -2193,15 +2464,23 @@ def eval_tax_slab_condition(condition, eval_globals=None, eval_locals=None):
 
 
 def get_lwp_or_ppl_for_date_range(employee, start_date, end_date):
+	leaves = get_lwp_or_ppl_leave_applications([employee], start_date, end_date)
+	return get_leave_date_mapper(leaves)
+
+
+def get_lwp_or_ppl_leave_applications(employees, start_date, end_date):
+	"""Returns approved leave applications of leave types without pay / partially paid
+	for all the given employees between the dates, that are not yet linked to a salary slip"""
 	LeaveApplication = frappe.qb.DocType("Leave Application")
 	LeaveType = frappe.qb.DocType("Leave Type")
 
-	leaves = (
+	return (
 		frappe.qb.from_(LeaveApplication)
 		.inner_join(LeaveType)
 		.on(LeaveType.name == LeaveApplication.leave_type)
 		.select(
 			LeaveApplication.name,
+			LeaveApplication.employee,
 			LeaveType.is_ppl,
 			LeaveType.fraction_of_daily_salary_per_leave,
 			LeaveType.include_holiday,
@@ -2214,12 +2493,14 @@ def get_lwp_or_ppl_for_date_range(employee, start_date, end_date):
 			((LeaveType.is_lwp == 1) | (LeaveType.is_ppl == 1))
 			& (LeaveApplication.docstatus == 1)
 			& (LeaveApplication.status == "Approved")
-			& (LeaveApplication.employee == employee)
+			& (LeaveApplication.employee.isin(employees))
 			& ((LeaveApplication.salary_slip.isnull()) | (LeaveApplication.salary_slip == ""))
 			& ((LeaveApplication.from_date <= end_date) & (LeaveApplication.to_date >= start_date))
 		)
 	).run(as_dict=True)
 
+
+def get_leave_date_mapper(leaves) -> dict:
 	leave_date_mapper = frappe._dict()
 	for leave in leaves:
 		if leave.from_date == leave.to_date:
@@ -2288,17 +2569,93 @@ def _safe_eval(code: str, eval_globals: dict | None = None, eval_locals: dict |
 
 	WARNING: DO NOT use this function anywhere else outside of this file.
 	"""
+	return _eval_compiled(_compile_expression(code), eval_globals, eval_locals)
+
+
+def _compile_expression(code: str):
+	"""Validates and compiles an expression for `_eval_compiled`"""
 	code = unicodedata.normalize("NFKC", code)
 
 	_check_attributes(code)
 
+	return compile(code, "<string>", "eval")
+
+
+def _eval_compiled(compiled, eval_globals: dict | None = None, eval_locals: dict | None = None):
+	# validation / compilation errors are deferred till the expression is evaluated,
+	# raised afresh so that cached errors do not accumulate tracebacks
+	if isinstance(compiled, tuple):
+		exc_type, args = compiled
+		raise exc_type(*args)
+
 	whitelisted_globals = {"int": int, "float": float, "long": int, "round": round}
 	if not eval_globals:
 		eval_globals = {}
 
 	eval_globals["__builtins__"] = {}
 	eval_globals.update(whitelisted_globals)
-	return eval(code, eval_globals, eval_locals)  # nosemgrep
+	return eval(compiled, eval_globals, eval_locals)  # nosemgrep
+
+
+def get_compiled_formulas(salary_structure) -> dict:
+	"""Returns code objects for all conditions and formulas in the salary structure,
+	keyed by (parentfield, idx, fieldname). Compiled once per structure version (name + modified)
+	and kept in a process-local cache, since code objects cannot be stored in redis.
+	Expressions failing validation are kept as (exception type, exception args).
+
+	Expects condition and formula fields to be sanitized already."""
+
+	def _compile_formulas():
+		compiled_formulas = {}
+		for table in ("earnings", "deductions"):
+			for row in salary_structure.get(table):
+				for fieldname in ("condition", "formula"):
+					if not (expression := row.get(fieldname)):
+						continue
+
+					try:
+						compiled = _compile_expression(expression)
+					except Exception as e:
+						compiled = (type(e), e.args)
+
+					compiled_formulas[(table, row.idx, fieldname)] = (expression, compiled)
+
+		return compiled_formulas
+
+	return _get_cached_for_structure_version(salary_structure, "compiled_formulas", _compile_formulas)
+
+
+def get_evaluation_order(salary_structure) -> dict:
+	"""Returns the row positions of earnings and deductions in dependency order, per structure version"""
+	from hrms.payroll.doctype.salary_structure.salary_structure import get_component_evaluation_order
+
+	def _get_evaluation_order():
+		return {
+			table: get_component_evaluation_order(salary_structure.get(table))
+			for table in ("earnings", "deductions")
+		}
+
+	return _get_cached_for_structure_version(salary_structure, "evaluation_order", _get_evaluation_order)
+
+
+def _get_cached_for_structure_version(salary_structure, cache_key: str, generator):
+	key = (getattr(frappe.local, "site", None), salary_structure.name, cache_key)
+	version = cstr(salary_structure.modified)
+
+	cached = _salary_structure_cache.get(key)
+	if cached and cached[0] == version:
+		_salary_structure_cache.move_to_end(key)
+		return cached[1]
+
+	value = generator()
+	if salary_structure.name and salary_structure.modified:
+		_salary_structure_cache[key] = (version, value)
+		_salary_structure_cache.move_to_end(key)
+
+		while len(_salary_structure_cache) > SALARY_STRUCTURE_CACHE_SIZE:
+			_salary_structure_cache.popitem(last=False)
+
+	return value
 
 
 def _check_attributes(code: str) -> None:
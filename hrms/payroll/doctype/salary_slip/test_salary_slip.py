@@ -6,6 +6,7 @@ import random
 
 import frappe
 from frappe.model.document import Document
+from frappe.query_builder.functions import Sum
 from frappe.tests import IntegrationTestCase, change_settings
 from frappe.utils import (
 	add_days,
@@ -36,17 +37,22 @@ from hrms.payroll.doctype.employee_tax_exemption_declaration.test_employee_tax_e
 )
 from hrms.payroll.doctype.payroll_entry.payroll_entry import get_month_details
 from hrms.payroll.doctype.salary_slip.salary_slip import (
-	HOLIDAYS_BETWEEN_DATES,
 	LEAVE_TYPE_MAP,
 	SALARY_COMPONENT_VALUES,
 	TAX_COMPONENTS_BY_COMPANY,
 	SalarySlip,
+	_eval_compiled,
 	_safe_eval,
+	calculate_tax_by_tax_slab,
+	calculate_tax_by_tax_slab_for_employees,
+	get_compiled_formulas,
+	get_year_to_date_totals,
 	make_salary_slip_from_timesheet,
 )
 from hrms.payroll.doctype.salary_slip.salary_slip_loan_utils import if_lending_app_installed
 from hrms.payroll.doctype.salary_structure.salary_structure import make_salary_slip
 from hrms.tests.test_utils import get_email_by_subject, get_first_sunday
+from hrms.utils.holiday_list import clear_holiday_calendar_cache
 
 
 class TestSalarySlip(IntegrationTestCase):
@@ -1052,6 +1058,67 @@ class TestSalarySlip(IntegrationTestCase):
 				year_to_date[entry.salary_component] += entry.amount
 				self.assertEqual(year_to_date[entry.salary_component], entry.year_to_date)
 
+	def test_batched_year_to_date_totals(self):
+		from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
+
+		payroll_period = create_payroll_period(name="_Test Payroll Period", company="_Test Company")
+		create_tax_slab(
+			payroll_period,
+			allow_tax_exemption=True,
+			currency="INR",
+			effective_date=getdate("2019-04-01"),
+			company="_Test Company",
+		)
+
+		employees = []
+		for idx, num in enumerate([3, 2]):
+			employee_name = f"test_batched_ytd_{idx}@salary.com"
+			employee = make_employee(employee_name, company="_Test Company")
+			salary_structure = make_salary_structure(
+				f"Monthly Salary Structure Test for Batched YTD {idx}",
+				"Monthly",
+				employee=employee,
+				company="_Test Company",
+				currency="INR",
+				payroll_period=payroll_period,
+			)
+			frappe.db.delete("Salary Slip", {"employee": employee})
+			create_salary_slips_for_payroll_period(
+				employee, salary_structure.name, payroll_period, deduct_random=False, num=num
+			)
+			employees.append(employee)
+
+		# one query for all the employees gives the same totals as the queries per slip
+		start_date = add_months(get_first_day(add_days(payroll_period.start_date, 25)), 3)
+		totals = get_year_to_date_totals(
+			employees, payroll_period.start_date, payroll_period.end_date, start_date
+		)
+		for employee in employees:
+			expected = get_year_to_date_totals_per_slip(
+				employee, payroll_period.start_date, payroll_period.end_date, start_date
+			)
+			self.assertEqual(totals[employee], expected)
+			self.assertTrue(totals[employee].components)
+
+		# excluding the slip being computed
+		last_slip = frappe.get_last_doc("Salary Slip", filters={"employee": employees[0], "docstatus": 1})
+		self.assertEqual(
+			get_year_to_date_totals(
+				[employees[0]],
+				payroll_period.start_date,
+				payroll_period.end_date,
+				last_slip.start_date,
+				exclude_salary_slip=last_slip.name,
+			)[employees[0]],
+			get_year_to_date_totals_per_slip(
+				employees[0],
+				payroll_period.start_date,
+				payroll_period.end_date,
+				last_slip.start_date,
+				exclude_salary_slip=last_slip.name,
+			),
+		)
+
 	def test_tax_for_payroll_period(self):
 		data = {}
 		# test the impact of tax exemption declaration, tax exemption proof submission
@@ -1158,6 +1225,115 @@ class TestSalarySlip(IntegrationTestCase):
 		# undelete fixture data
 		frappe.db.rollback()
 
+	def test_tax_ledger_for_payroll_period(self):
+		from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
+
+		frappe.db.sql("""delete from `tabPayroll Period`""")
+		frappe.db.sql("""delete from `tabSalary Component`""")
+
+		payroll_period = create_payroll_period()
+		create_tax_slab(payroll_period, allow_tax_exemption=True)
+
+		employee = make_employee("test_tax_ledger@salary.slip")
+		salary_structure = make_salary_structure(
+			"Stucture to test tax ledger",
+			"Monthly",
+			test_tax=True,
+			employee=employee,
+			payroll_period=payroll_period,
+		)
+		create_salary_slips_for_payroll_period(
+			employee, salary_structure.name, payroll_period, deduct_random=False, num=3
+		)
+
+		ledger = frappe.get_doc(
+			"Employee Tax Ledger", {"employee": employee, "payroll_period": payroll_period.name}
+		)
+		salary_slips = frappe.get_all(
+			"Salary Slip",
+			filters={"employee": employee, "docstatus": 1},
+			order_by="start_date desc",
+			pluck="name",
+		)
+		self.assertEqual({d.salary_slip for d in ledger.entries}, set(salary_slips))
+		self.assertEqual(ledger.tax_paid, get_tax_paid_in_period(employee))
+
+		# ledger totals match the totals computed from salary slips
+		salary_slip = frappe.get_doc("Salary Slip", salary_slips[0])
+		ledger_totals = salary_slip.get_tax_ledger_totals(payroll_period.start_date, salary_slip.end_date)
+		self.assertEqual(
+			ledger_totals.taxable_earnings,
+			salary_slip.get_salary_slip_details(
+				payroll_period.start_date, salary_slip.end_date, parentfield="earnings", is_tax_applicable=1
+			),
+		)
+		self.assertEqual(ledger.taxable_earnings, ledger_totals.taxable_earnings)
+
+		salary_slip.cancel()
+		ledger.reload()
+		self.assertEqual({d.salary_slip for d in ledger.entries}, set(salary_slips[1:]))
+		self.assertEqual(ledger.tax_paid, get_tax_paid_in_period(employee))
+
+	def test_flexible_benefit_tax_in_tax_ledger(self):
+		from hrms.payroll.doctype.employee_tax_ledger.employee_tax_ledger import (
+			get_tax_ledger_totals,
+			make_entries,
+		)
+
+		earnings = [frappe._dict(salary_component="Basic", amount=50000, is_tax_applicable=1)]
+		deductions = [
+			frappe._dict(salary_component="TDS", amount=2000, variable_based_on_taxable_salary=1),
+			frappe._dict(
+				salary_component="TDS", amount=300, variable_based_on_taxable_salary=1, is_flexible_benefit=1
+			),
+		]
+		entries = [
+			frappe._dict(entry)
+			for entry in make_entries("Salary Slip 1", "2024-04-01", "2024-04-30", earnings, deductions)
+		]
+		self.assertEqual(len(entries), 2)
+
+		# salary slips leave out tax deducted in flexible benefit rows, the income tax report counts it
+		totals = get_tax_ledger_totals(entries, "2024-04-01", "2024-04-30", "TDS")
+		self.assertEqual(totals.taxable_earnings, 50000)
+		self.assertEqual(totals.tax_paid, 2000)
+		self.assertEqual(
+			get_tax_ledger_totals(
+				entries, "2024-04-01", "2024-04-30", include_flexible_benefits=True
+			).tax_paid,
+			2300,
+		)
+
+	def test_tax_by_tax_slab_for_employees(self):
+		tax_slab = frappe._dict(
+			slabs=[
+				frappe._dict(from_amount=0, to_amount=250000, percent_deduction=0, condition=None),
+				frappe._dict(from_amount=250000, to_amount=500000, percent_deduction=5, condition=None),
+				frappe._dict(from_amount=500000, to_amount=1000000, percent_deduction=20, condition=None),
+				frappe._dict(from_amount=1000000, to_amount=0, percent_deduction=30, condition=None),
+				frappe._dict(
+					from_amount=750000,
+					to_amount=0,
+					percent_deduction=2,
+					condition="annual_taxable_earning > 800000 and age >= 60",
+				),
+			],
+			other_taxes_and_charges=[
+				frappe._dict(min_taxable_income=500000, max_taxable_income=0, percent=4),
+			],
+		)
+		earnings = [0, 100000, 250000, 300000, 500000, 750000, 900000, 900000, 1000000, 2500000]
+		eval_locals = [{"age": 30 if i % 2 else 65} for i in range(len(earnings))]
+
+		expected = [
+			calculate_tax_by_tax_slab(earning, tax_slab, eval_locals=dict(data))
+			for earning, data in zip(earnings, eval_locals, strict=True)
+		]
+		tax_amounts = calculate_tax_by_tax_slab_for_employees(earnings, tax_slab, eval_locals=eval_locals)
+
+		for tax_amount, expected_amount in zip(tax_amounts, expected, strict=True):
+			self.assertAlmostEqual(tax_amount, expected_amount, places=6)
+
 	@change_settings(
 		"Payroll Settings",
 		{
@@ -1716,6 +1892,37 @@ class TestSalarySlipSafeEval(IntegrationTestCase):
 		self.assertTrue(_safe_eval("'x' != 'Information Techonology'"))
 		self.assertRaises(SyntaxError, _safe_eval, "'blah'.format(1)")
 
+	def test_compiled_formulas_for_salary_structure(self):
+		structure = frappe._dict(name="_Test Compiled Structure", modified="2024-01-01 00:00:00")
+		structure.earnings = [
+			frappe._dict(idx=1, condition="base > 1000", formula="base * 0.5"),
+			frappe._dict(idx=2, condition=None, formula="(x := 42)"),
+			frappe._dict(idx=3, condition=None, formula="base *"),
+		]
+		structure.deductions = []
+
+		compiled = get_compiled_formulas(structure)
+		self.assertEqual(_eval_compiled(compiled[("earnings", 1, "formula")][1], {}, {"base": 5000}), 2500)
+		self.assertNotIn(("earnings", 2, "condition"), compiled)
+		# validation errors are raised only when the expression is evaluated
+		# and a new exception is raised each time
+		errors = []
+		for _i in range(2):
+			with self.assertRaises(SyntaxError) as error:
+				_eval_compiled(compiled[("earnings", 2, "formula")][1])
+			errors.append(error.exception)
+		self.assertIsNot(*errors)
+
+		# with the position of syntax errors
+		with self.assertRaises(SyntaxError) as error:
+			_eval_compiled(compiled[("earnings", 3, "formula")][1])
+		self.assertEqual(error.exception.lineno, 1)
+
+		# same version is served from cache, new version is recompiled
+		self.assertIs(get_compiled_formulas(structure), compiled)
+		structure.modified = "2024-01-02 00:00:00"
+		self.assertIsNot(get_compiled_formulas(structure), compiled)
+
 
 def make_income_tax_components():
 	tax_components = [
@@ -1985,6 +2192,63 @@ def make_deduction_salary_component(setup=False, test_tax=False, company_list=No
 	return data
 
 
+def get_year_to_date_totals_per_slip(
+	employee, period_start_date, period_end_date, start_date, exclude_salary_slip=None
+):
+	"""Year to date totals computed the way salary slips did before they were batched"""
+	filters = {"employee": employee, "docstatus": 1}
+	if exclude_salary_slip:
+		filters["name"] = ["!=", exclude_salary_slip]
+
+	year_to_date = frappe.get_list(
+		"Salary Slip",
+		fields=["sum(net_pay) as net_sum", "sum(gross_pay) as gross_sum"],
+		filters={**filters, "start_date": [">=", period_start_date], "end_date": ["<", period_end_date]},
+	)
+	month_to_date = frappe.get_list(
+		"Salary Slip",
+		fields=["sum(net_pay) as sum"],
+		filters={**filters, "start_date": [">=", get_first_day(start_date)], "end_date": ["<", start_date]},
+	)
+
+	ss = frappe.qb.DocType("Salary Slip")
+	sd = frappe.qb.DocType("Salary Detail")
+	components = {}
+	for component in frappe.get_all(
+		"Salary Detail",
+		filters={
+			"parenttype": "Salary Slip",
+			"parent": ["in", frappe.get_all("Salary Slip", filters, pluck="name")],
+		},
+		pluck="salary_component",
+		distinct=True,
+	):
+		query = (
+			frappe.qb.from_(sd)
+			.inner_join(ss)
+			.on(sd.parent == ss.name)
+			.select(Sum(sd.amount))
+			.where(
+				(ss.employee == employee)
+				& (sd.salary_component == component)
+				& (ss.start_date >= period_start_date)
+				& (ss.end_date < period_end_date)
+				& (ss.docstatus == 1)
+			)
+		)
+		if exclude_salary_slip:
+			query = query.where(ss.name != exclude_salary_slip)
+		if (amount := query.run()) and amount[0][0] is not None:
+			components[component] = flt(amount[0][0])
+
+	return frappe._dict(
+		net_pay=flt(year_to_date[0].net_sum),
+		gross_pay=flt(year_to_date[0].gross_sum),
+		month_to_date=flt(month_to_date[0].sum),
+		components=components,
+	)
+
+
 def get_tax_paid_in_period(employee):
 	tax_paid_amount = frappe.db.sql(
 		"""select sum(sd.amount) from `tabSalary Detail`
@@ -2679,8 +2943,8 @@ def create_ss_email_template():
 
 
 def clear_cache():
+	clear_holiday_calendar_cache()
 	for key in [
-		HOLIDAYS_BETWEEN_DATES,
 		LEAVE_TYPE_MAP,
 		SALARY_COMPONENT_VALUES,
 		TAX_COMPONENTS_BY_COMPANY,
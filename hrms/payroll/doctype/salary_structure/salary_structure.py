@@ -1,6 +1,7 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import heapq
 import re
 
 import frappe
@@ -11,7 +12,7 @@ from frappe.utils import cint, cstr, flt
 
 import erpnext
 
-from hrms.payroll.utils import sanitize_expression
+from hrms.payroll.utils import get_referenced_names, sanitize_expression
 
 
 class SalaryStructure(Document):
@@ -29,6 +30,7 @@ class SalaryStructure(Document):
 		self.validate_payment_days_based_dependent_component()
 		self.validate_timesheet_component()
 		self.validate_formula_setup()
+		self.validate_component_dependencies()
 
 	def on_update(self):
 		self.reset_condition_and_formula_fields()
@@ -113,6 +115,21 @@ class SalaryStructure(Document):
 					).format(frappe.bold(_("Depends On Payment Days")), frappe.bold(row.salary_component))
 					frappe.throw(message, title=_("Payment Days Dependency"))
 
+	def validate_component_dependencies(self):
+		for component_type in ("earnings", "deductions"):
+			rows = self.get(component_type)
+			cycle = get_dependency_cycle(get_component_dependency_graph(rows))
+			if not cycle:
+				continue
+
+			components = [frappe.bold(rows[idx].salary_component) for idx in cycle]
+			frappe.throw(
+				_(
+					"{0}: Circular dependency found between the conditions / formulas of components {1}"
+				).format(_(component_type.capitalize()), " → ".join(components)),
+				title=_("Circular Dependency"),
+			)
+
 	def get_component_abbreviations(self):
 		abbr = [d.abbr for d in self.earnings if d.depends_on_payment_days]
 		abbr += [d.abbr for d in self.deductions if d.depends_on_payment_days]
@@ -243,6 +260,78 @@ class SalaryStructure(Document):
 			frappe.msgprint(_("No Employee Found"))
 
 
+def get_component_dependency_graph(rows) -> dict[int, list[int]]:
+	"""Returns the position of each row mapped to the positions of the other rows
+	whose abbreviations are referenced in its condition or formula.
+	A row referencing its own abbreviation reads its value before evaluation, so it is not a dependency"""
+	positions_by_abbr = {}
+	for position, row in enumerate(rows):
+		if row.abbr:
+			positions_by_abbr.setdefault(row.abbr, []).append(position)
+
+	graph = {}
+	for position, row in enumerate(rows):
+		referenced = get_referenced_names(row.condition) | get_referenced_names(row.formula)
+		graph[position] = [
+			dependency
+			for abbr in referenced
+			for dependency in positions_by_abbr.get(abbr, [])
+			if dependency != position
+		]
+
+	return graph
+
+
+def get_dependency_cycle(graph: dict[int, list[int]]) -> list[int] | None:
+	"""Returns the first cycle found in the graph as a list of row positions, if any"""
+	VISITING, VISITED = 1, 2
+	state = {}
+
+	def visit(node, path):
+		state[node] = VISITING
+		path.append(node)
+		for dependency in sorted(graph[node]):
+			if state.get(dependency) == VISITING:
+				return [*path[path.index(dependency) :], dependency]
+			if not state.get(dependency) and (cycle := visit(dependency, path)):
+				return cycle
+
+		path.pop()
+		state[node] = VISITED
+
+	for node in graph:
+		if not state.get(node) and (cycle := visit(node, [])):
+			return cycle
+
+
+def get_component_evaluation_order(rows) -> list[int]:
+	"""Returns row positions ordered so that every component is evaluated after the components it depends on.
+	Row order is retained wherever dependencies don't force otherwise, and rows in a cycle are left in row order."""
+	graph = get_component_dependency_graph(rows)
+	if get_dependency_cycle(graph):
+		return list(range(len(rows)))
+
+	pending_dependencies = {node: len(set(dependencies)) for node, dependencies in graph.items()}
+	dependents = {node: [] for node in graph}
+	for node, dependencies in graph.items():
+		for dependency in set(dependencies):
+			dependents[dependency].append(node)
+
+	ready = [node for node, count in pending_dependencies.items() if not count]
+	heapq.heapify(ready)
+
+	order = []
+	while ready:
+		node = heapq.heappop(ready)
+		order.append(node)
+		for dependent in dependents[node]:
+			pending_dependencies[dependent] -= 1
+			if not pending_dependencies[dependent]:
+				heapq.heappush(ready, dependent)
+
+	return order
+
+
 def assign_salary_structure_for_employees(
 	employees,
 	salary_structure,
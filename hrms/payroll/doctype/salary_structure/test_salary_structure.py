@@ -18,7 +18,12 @@ from hrms.payroll.doctype.salary_slip.test_salary_slip import (
 	make_earning_salary_component,
 	make_employee_salary_slip,
 )
-from hrms.payroll.doctype.salary_structure.salary_structure import make_salary_slip
+from hrms.payroll.doctype.salary_structure.salary_structure import (
+	get_component_dependency_graph,
+	get_component_evaluation_order,
+	get_dependency_cycle,
+	make_salary_slip,
+)
 from hrms.tests.test_utils import create_employee_grade
 
 test_dependencies = ["Fiscal Year"]
@@ -149,6 +154,54 @@ class TestSalaryStructure(IntegrationTestCase):
 		self.assertEqual(structure, salary_structure.name)
 		self.assertEqual(base, 50000)
 
+	def test_component_evaluation_order(self):
+		rows = [
+			frappe._dict(abbr="HRA", formula="BS * 0.4"),
+			frappe._dict(abbr="BS", formula="base * 0.5"),
+			frappe._dict(abbr="SA", condition="base > 1000", formula="base - BS - HRA"),
+			frappe._dict(abbr="CA", amount=100),
+		]
+		self.assertEqual(get_component_evaluation_order(rows), [1, 0, 2, 3])
+
+		# a component referencing its own abbreviation does not depend on itself
+		rows[3].formula = "CA + 100"
+		self.assertIsNone(get_dependency_cycle(get_component_dependency_graph(rows)))
+		self.assertEqual(get_component_evaluation_order(rows), [1, 0, 2, 3])
+
+		rows[1].formula = "HRA * 2"
+		self.assertEqual(get_dependency_cycle(get_component_dependency_graph(rows)), [0, 1, 0])
+
+	def test_salary_slip_rows_in_structure_order(self):
+		emp = make_employee("test_structure_order@salary.com")
+
+		sal_struct = make_salary_structure("Salary Structure Order", "Monthly", dont_submit=True)
+		sal_struct.earnings = sal_struct.earnings[:3]
+		# Basic Salary is evaluated after HRA, which follows it in the structure
+		sal_struct.earnings[0].condition = None
+		sal_struct.earnings[0].formula = f"{sal_struct.earnings[1].abbr} * 2"
+		sal_struct.earnings[1].amount_based_on_formula = 1
+		sal_struct.earnings[1].formula = "base * 0.1"
+		sal_struct.submit()
+
+		create_salary_structure_assignment(emp, sal_struct.name)
+		ss = make_salary_slip(sal_struct.name, employee=emp)
+
+		self.assertEqual(
+			[(d.idx, d.salary_component) for d in ss.earnings],
+			[(idx, d.salary_component) for idx, d in enumerate(sal_struct.earnings, 1)],
+		)
+		# evaluated in row order, HRA would still be 0 for Basic Salary
+		self.assertTrue(ss.earnings[0].amount)
+
+	def test_circular_dependency_in_formulas(self):
+		sal_struct = make_salary_structure("Salary Structure Circular", "Monthly", dont_submit=True)
+		sal_struct.earnings[0].amount_based_on_formula = 1
+		sal_struct.earnings[0].formula = f"{sal_struct.earnings[1].abbr} * 2"
+		sal_struct.earnings[1].amount_based_on_formula = 1
+		sal_struct.earnings[1].formula = f"{sal_struct.earnings[0].abbr} / 2"
+
+		self.assertRaises(frappe.ValidationError, sal_struct.save)
+
 	def test_multi_currency_salary_structure(self):
 		make_employee("test_muti_currency_employee@salary.com")
 		sal_struct = make_salary_structure("Salary Structure Multi Currency", "Monthly", currency="USD")
@@ -4,10 +4,14 @@
 import frappe
 from frappe import _, scrub
 from frappe.query_builder.functions import Sum
-from frappe.utils import add_days, flt, getdate, rounded
+from frappe.utils import add_days, cstr, flt, getdate, rounded
 
+from hrms.payroll.doctype.employee_tax_ledger.employee_tax_ledger import (
+	get_tax_ledger_entries,
+	get_tax_ledger_totals,
+)
 from hrms.payroll.doctype.payroll_entry.payroll_entry import get_start_end_dates
-from hrms.payroll.doctype.salary_slip.salary_slip import calculate_tax_by_tax_slab
+from hrms.payroll.doctype.salary_slip.salary_slip import calculate_tax_by_tax_slab_for_employees
 
 
 def execute(filters=None):
@@ -415,23 +419,34 @@ class IncomeTaxComputationReport:
 			"round_to_the_nearest_integer",
 		)
 
+		employees_by_tax_slab = {}
 		for emp, emp_details in self.employees.items():
-			tax_slab = emp_details.get("income_tax_slab")
-			if tax_slab:
-				tax_slab = frappe.get_cached_doc("Income Tax Slab", tax_slab)
-				eval_globals, eval_locals = self.get_data_for_eval(emp, emp_details)
-				tax_amount = calculate_tax_by_tax_slab(
-					emp_details["total_taxable_amount"],
-					tax_slab,
-					eval_globals=eval_globals,
-					eval_locals=eval_locals,
-				)
-			else:
-				tax_amount = 0.0
+			emp_details["applicable_tax"] = 0.0
+			if emp_details.get("income_tax_slab"):
+				employees_by_tax_slab.setdefault(emp_details.income_tax_slab, []).append(emp)
+
+		for tax_slab, employees in employees_by_tax_slab.items():
+			tax_slab = frappe.get_cached_doc("Income Tax Slab", tax_slab)
+
+			# data for evaluating conditions is only needed for conditional slabs
+			eval_globals, eval_locals = None, None
+			if any(cstr(slab.condition).strip() for slab in tax_slab.slabs):
+				eval_locals = []
+				for emp in employees:
+					eval_globals, data = self.get_data_for_eval(emp, self.employees[emp])
+					eval_locals.append(data)
+
+			tax_amounts = calculate_tax_by_tax_slab_for_employees(
+				[self.employees[emp]["total_taxable_amount"] for emp in employees],
+				tax_slab,
+				eval_globals=eval_globals,
+				eval_locals=eval_locals,
+			)
 
-			if is_tax_rounded:
-				tax_amount = rounded(tax_amount)
-			emp_details["applicable_tax"] = tax_amount
+			for emp, tax_amount in zip(employees, tax_amounts, strict=True):
+				if is_tax_rounded:
+					tax_amount = rounded(tax_amount)
+				self.employees[emp]["applicable_tax"] = tax_amount
 
 	def get_data_for_eval(self, emp: str, emp_details: dict) -> tuple:
 		last_ss = self.get_last_salary_slip(emp)
@@ -458,6 +473,24 @@ class IncomeTaxComputationReport:
 	def get_total_deducted_tax(self):
 		self.add_column("Total Tax Deducted")
 
+		employees = list(self.employees.keys())
+		tax_ledger_entries = get_tax_ledger_entries(employees, self.filters.payroll_period)
+		for employee, entries in tax_ledger_entries.items():
+			self.employees[employee].setdefault(
+				"total_tax_deducted",
+				get_tax_ledger_totals(
+					entries,
+					self.payroll_period_start_date,
+					self.payroll_period_end_date,
+					include_flexible_benefits=True,
+				).tax_paid,
+			)
+
+		# employees without a tax ledger
+		employees = [employee for employee in employees if employee not in tax_ledger_entries]
+		if not employees:
+			return
+
 		ss = frappe.qb.DocType("Salary Slip")
 		ss_ded = frappe.qb.DocType("Salary Detail")
 
@@ -467,7 +500,7 @@ class IncomeTaxComputationReport:
 			.on(ss.name == ss_ded.parent)
 			.select(ss.employee, Sum(ss_ded.amount).as_("amount"))
 			.where(ss.docstatus == 1)
-			.where(ss.employee.isin(list(self.employees.keys())))
+			.where(ss.employee.isin(employees))
 			.where(ss_ded.parentfield == "deductions")
 			.where(ss_ded.variable_based_on_taxable_salary == 1)
 			.where(ss.start_date >= self.payroll_period_start_date)
@@ -1,3 +1,5 @@
+import ast
+
 import frappe
 
 
@@ -26,6 +28,27 @@ def sanitize_expression(string: str | None = None) -> str | None:
 	return string
 
 
+def get_referenced_names(expression: str | None = None) -> set[str]:
+	"""
+	Returns the variable names referenced in a condition or formula expression.
+	Invalid expressions return an empty set, since they are reported when evaluated.
+
+	Example:
+	    get_referenced_names("base * 0.5 if BS > 1000 else 0")
+	    # {"base", "BS"}
+	"""
+
+	if not expression:
+		return set()
+
+	try:
+		tree = ast.parse(expression, mode="eval")
+	except SyntaxError:
+		return set()
+
+	return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+
+
 @frappe.whitelist()
 def get_payroll_settings_for_payment_days() -> dict:
 	return frappe.get_cached_value(
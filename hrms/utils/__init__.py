@@ -3,7 +3,8 @@ from collections.abc import Generator
 import requests
 
 import frappe
-from frappe.utils import add_days, date_diff
+from frappe.model.naming import parse_naming_series
+from frappe.utils import add_days, cint, date_diff
 
 country_info = {}
 
@@ -60,3 +61,51 @@ def get_employee_email(employee_id: str) -> str | None:
 		or employee_emails.company_email
 		or employee_emails.personal_email
 	)
+
+
+def has_doc_events(doctype: str) -> bool:
+	"""Returns True if any app hooks into the document events of the doctype.
+	Bulk inserts skip the document lifecycle, so such doctypes are to be inserted one document at a time"""
+	return bool(frappe.get_hooks("doc_events").get(doctype))
+
+
+def get_names_from_series(naming_series: str, count: int) -> list[str]:
+	"""Reserves `count` consecutive names from a document's naming series in one update.
+	Names are numbered with as many digits as the `#`s in the series, or five if it has none,
+	same as names set from the naming series on insert"""
+	prefix, digits = split_naming_series(naming_series)
+	Series = frappe.qb.DocType("Series")
+
+	current = frappe.qb.from_(Series).select(Series.current).where(Series.name == prefix).for_update().run()
+	if current and current[0][0] is not None:
+		current = cint(current[0][0])
+		frappe.qb.update(Series).set(Series.current, current + count).where(Series.name == prefix).run()
+	else:
+		current = 0
+		frappe.qb.into(Series).columns(Series.name, Series.current).insert(prefix, count).run()
+
+	return [f"{prefix}{current + i:0{digits}d}" for i in range(1, count + 1)]
+
+
+def release_names_from_series(naming_series: str, count: int) -> None:
+	"""Gives back the last `count` names reserved by `get_names_from_series`.
+	The series stays locked till the transaction ends, so no other names have been taken since"""
+	if not count:
+		return
+
+	Series = frappe.qb.DocType("Series")
+	(
+		frappe.qb.update(Series)
+		.set(Series.current, Series.current - count)
+		.where(Series.name == split_naming_series(naming_series)[0])
+	).run()
+
+
+def split_naming_series(naming_series: str) -> tuple[str, int]:
+	"""Returns the parsed prefix of the naming series and the number of digits names are numbered with"""
+	if "#" not in naming_series:
+		# frappe numbers series without a `#` part with five digits
+		naming_series += ".#####"
+
+	prefix, digits = naming_series.rsplit(".", 1)
+	return parse_naming_series(prefix), digits.count("#")
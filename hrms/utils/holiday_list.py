@@ -1,4 +1,174 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+
 import frappe
+from frappe import _
+from frappe.utils import getdate, today
+
+HOLIDAY_CALENDAR = "holiday_calendar"
+HOLIDAY_CALENDAR_LRU_SIZE = 256
+HOLIDAY_CALENDAR_EXPIRY = 24 * 60 * 60
+
+
+class HolidayCalendar:
+	"""Holidays of a holiday list in a calendar year, as bitsets over the days of the year.
+	Bit `n` is set if the `n`th day of the year (counting from 0) is a holiday,
+	in `holidays` for holidays and in `weekly_offs` for weekly offs."""
+
+	def __init__(self, year: int, holidays: int = 0, weekly_offs: int = 0):
+		self.year = year
+		self.year_start = date(year, 1, 1)
+		self.holidays = holidays
+		self.weekly_offs = weekly_offs
+
+	def get_bits(self, skip_weekly_offs: bool = False) -> int:
+		return self.holidays if skip_weekly_offs else self.holidays | self.weekly_offs
+
+	def get_day(self, for_date: date) -> int:
+		return (for_date - self.year_start).days
+
+	def get_range(self, start_date: date, end_date: date) -> int:
+		"""Returns a mask of the days between the given dates that fall in this year"""
+		start = max(self.get_day(start_date), 0)
+		end = min(self.get_day(end_date), self.get_day(date(self.year, 12, 31)))
+		if end < start:
+			return 0
+
+		return ((1 << (end - start + 1)) - 1) << start
+
+	def is_holiday(self, for_date: date, skip_weekly_offs: bool = False) -> bool:
+		return bool(self.get_bits(skip_weekly_offs) >> self.get_day(for_date) & 1)
+
+	def is_weekly_off(self, for_date: date) -> bool:
+		"""A date that is both a weekly off and a holiday is considered a holiday"""
+		day = self.get_day(for_date)
+		return bool((self.weekly_offs & ~self.holidays) >> day & 1)
+
+	def count(self, start_date: date, end_date: date, skip_weekly_offs: bool = False) -> int:
+		return (self.get_bits(skip_weekly_offs) & self.get_range(start_date, end_date)).bit_count()
+
+	def get_dates(self, start_date: date, end_date: date, skip_weekly_offs: bool = False) -> list[date]:
+		bits = self.get_bits(skip_weekly_offs) & self.get_range(start_date, end_date)
+
+		dates = []
+		while bits:
+			lowest = bits & -bits
+			dates.append(self.year_start + timedelta(days=lowest.bit_length() - 1))
+			bits ^= lowest
+
+		return dates
+
+
+def get_holiday_calendar_key(holiday_list: str, year: int | None = None) -> str:
+	"""Returns the cache key of the holiday list's calendar for the year,
+	or the prefix of the keys of all its calendars if no year is given"""
+	return f"{HOLIDAY_CALENDAR}:{holiday_list}:{year if year is not None else ''}"
+
+
+def get_local_holiday_calendars() -> OrderedDict:
+	"""Calendars read in the current request or job, least recently used first"""
+	if not hasattr(frappe.local, "holiday_calendars"):
+		frappe.local.holiday_calendars = OrderedDict()
+
+	return frappe.local.holiday_calendars
+
+
+def get_holiday_calendars(holiday_lists: list | set, years: list | range) -> dict[tuple, HolidayCalendar]:
+	"""Returns the holiday calendar of each holiday list for each year, keyed by (holiday list, year).
+
+	Calendars are looked up in a per request LRU, then in the holiday calendar cache,
+	and the ones missing from both are built from a single query."""
+	local_calendars = get_local_holiday_calendars()
+	calendars, missing = {}, []
+
+	for holiday_list in holiday_lists:
+		for year in years:
+			key = (holiday_list, year)
+			if key in local_calendars:
+				local_calendars.move_to_end(key)
+				calendars[key] = local_calendars[key]
+				continue
+
+			bits = frappe.cache().get_value(get_holiday_calendar_key(holiday_list, year), expires=True)
+			if bits is None:
+				missing.append(key)
+			else:
+				calendars[key] = HolidayCalendar(year, *bits)
+
+	if missing:
+		for key, calendar in build_holiday_calendars(missing).items():
+			frappe.cache().set_value(
+				get_holiday_calendar_key(*key),
+				(calendar.holidays, calendar.weekly_offs),
+				expires_in_sec=HOLIDAY_CALENDAR_EXPIRY,
+			)
+			calendars[key] = calendar
+
+	for key, calendar in calendars.items():
+		local_calendars[key] = calendar
+		local_calendars.move_to_end(key)
+
+	while len(local_calendars) > HOLIDAY_CALENDAR_LRU_SIZE:
+		local_calendars.popitem(last=False)
+
+	return calendars
+
+
+def build_holiday_calendars(keys: list[tuple]) -> dict[tuple, HolidayCalendar]:
+	calendars = {(holiday_list, year): HolidayCalendar(year) for holiday_list, year in keys}
+	years = [year for holiday_list, year in keys]
+
+	Holiday = frappe.qb.DocType("Holiday")
+	holidays = (
+		frappe.qb.from_(Holiday)
+		.select(Holiday.parent, Holiday.holiday_date, Holiday.weekly_off)
+		.where(
+			(Holiday.parent.isin(list({holiday_list for holiday_list, year in keys})))
+			& (Holiday.holiday_date.between(date(min(years), 1, 1), date(max(years), 12, 31)))
+		)
+	).run(as_dict=True)
+
+	for holiday in holidays:
+		holiday_date = getdate(holiday.holiday_date)
+		calendar = calendars.get((holiday.parent, holiday_date.year))
+		if not calendar:
+			continue
+
+		bit = 1 << calendar.get_day(holiday_date)
+		if holiday.weekly_off:
+			calendar.weekly_offs |= bit
+		else:
+			calendar.holidays |= bit
+
+	return calendars
+
+
+def get_holiday_calendars_between(
+	holiday_lists: list | set, start_date, end_date
+) -> dict[tuple, HolidayCalendar]:
+	return get_holiday_calendars(holiday_lists, range(getdate(start_date).year, getdate(end_date).year + 1))
+
+
+def is_holiday(holiday_list: str, for_date=None, skip_weekly_offs: bool = False) -> bool:
+	if not holiday_list:
+		return False
+
+	for_date = getdate(for_date or today())
+	calendar = get_holiday_calendars([holiday_list], [for_date.year])[(holiday_list, for_date.year)]
+	return calendar.is_holiday(for_date, skip_weekly_offs)
+
+
+def get_holiday_count_between(
+	holiday_list: str, start_date: str, end_date: str, skip_weekly_offs: bool = False
+) -> int:
+	if not holiday_list:
+		return 0
+
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	return sum(
+		calendar.count(start_date, end_date, skip_weekly_offs)
+		for calendar in get_holiday_calendars_between([holiday_list], start_date, end_date).values()
+	)
 
 
 def get_holiday_dates_between(
@@ -7,21 +177,77 @@ def get_holiday_dates_between(
 	end_date: str,
 	skip_weekly_offs: bool = False,
 ) -> list:
-	Holiday = frappe.qb.DocType("Holiday")
-	query = (
-		frappe.qb.from_(Holiday)
-		.select(Holiday.holiday_date)
-		.where((Holiday.parent == holiday_list) & (Holiday.holiday_date.between(start_date, end_date)))
-		.orderby(Holiday.holiday_date)
+	return get_holiday_dates_for_lists([holiday_list], start_date, end_date, skip_weekly_offs).get(
+		holiday_list, []
 	)
 
-	if skip_weekly_offs:
-		query = query.where(Holiday.weekly_off == 0)
 
-	return query.run(pluck=True)
+def get_holiday_dates_for_lists(
+	holiday_lists: list | set, start_date: str, end_date: str, skip_weekly_offs: bool = False
+) -> dict:
+	"""Returns holiday dates between the given dates for each holiday list"""
+	holidays = {holiday_list: [] for holiday_list in holiday_lists if holiday_list}
+	if not holidays:
+		return holidays
+
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	calendars = get_holiday_calendars_between(list(holidays), start_date, end_date)
+	for (holiday_list, _year), calendar in sorted(calendars.items()):
+		holidays[holiday_list].extend(calendar.get_dates(start_date, end_date, skip_weekly_offs))
+
+	return holidays
 
 
 def invalidate_cache(doc, method=None):
-	from hrms.payroll.doctype.salary_slip.salary_slip import HOLIDAYS_BETWEEN_DATES
+	"""Drops the calendars of the holiday list, and again once the transaction is committed,
+	as calendars built by other jobs till then are built from the holidays before the change"""
+	clear_holiday_list_calendars(doc.name)
+	frappe.db.after_commit.add(lambda: clear_holiday_list_calendars(doc.name))
+
+
+def clear_holiday_list_calendars(holiday_list: str):
+	frappe.cache().delete_keys(get_holiday_calendar_key(holiday_list))
+
+	local_calendars = get_local_holiday_calendars()
+	for key in [key for key in local_calendars if key[0] == holiday_list]:
+		del local_calendars[key]
+
+
+def clear_holiday_calendar_cache():
+	frappe.cache().delete_keys(HOLIDAY_CALENDAR)
+	get_local_holiday_calendars().clear()
+
+
+def resolve_holiday_lists(employees: list | set) -> dict[str, str | None]:
+	"""Returns the holiday list of each employee, falling back to the default holiday list
+	of the employee's company, in a single query"""
+	if not employees:
+		return {}
+
+	Employee = frappe.qb.DocType("Employee")
+	Company = frappe.qb.DocType("Company")
+
+	rows = (
+		frappe.qb.from_(Employee)
+		.left_join(Company)
+		.on(Employee.company == Company.name)
+		.select(Employee.name, Employee.holiday_list, Company.default_holiday_list)
+		.where(Employee.name.isin(list(employees)))
+	).run(as_dict=True)
+
+	return {row.name: row.holiday_list or row.default_holiday_list or None for row in rows}
+
+
+def get_holiday_list_for_employee(employee: str, raise_exception: bool = True) -> str | None:
+	"""Returns the holiday list of the employee, or the default holiday list of the employee's company"""
+	if not employee:
+		from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+
+		return get_holiday_list_for_employee(employee, raise_exception)
+
+	holiday_list = resolve_holiday_lists([employee]).get(employee)
+	if not holiday_list and raise_exception:
+		company = frappe.db.get_value("Employee", employee, "company")
+		frappe.throw(_("Please set a default Holiday List for Company {0}").format(frappe.bold(company)))
 
-	frappe.cache().delete_value(HOLIDAYS_BETWEEN_DATES)
+	return holiday_list